@@ -1,16 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+import json
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import select, func
+from sqlalchemy import delete
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Literal, Optional, Tuple
+from .change_log import ChangeFeedExpired, read_changes
 from .database import get_session
-from .models import Movie, MovieResponse, PaginatedResponse, MovieCreate, User
-from .services.omdb_service import OMDBService, get_omdb_service
-from datetime import timedelta
+from .event_bus import TooManySubscribers, event_bus
+from .idempotency import IDEMPOTENCY_HEADER, IdempotentRequest, request_fingerprint
+from .read_routing import get_read_session, pin_reads_to_primary
+from .models import ChangeFeed, JobResponse, Movie, MovieGenre, MovieResponse, MovieSuggestion, MovieViews, PaginatedResponse, MovieCreate, PopularMovie, ScoredMovie, User
+from .jobs import JobQueueFull, job_queue
+from .metrics import record_cache_lookup
+from .services.movie_service import MovieImportError, import_movie
+from .services.omdb_service import OMDBService, get_omdb_service, normalize_genre
 from fastapi.security import OAuth2PasswordRequestForm
-from .auth import get_current_user, authenticate_user, create_access_token, get_password_hash
-from .models import Token, UserCreate
-from .config import settings
-from loguru import logger
+from .auth import get_current_user, authenticate_user, get_password_hash, issue_tokens, use_refresh_token
+from .models import RefreshTokenRequest, Token, UserCreate
+from .services.plot_index import embed_movie, embed_text, plot_index
+from .services.title_search import best_title_match, prefix_index, title_index
+from .services.views import view_counter
+from .timing import TimedRoute, phase
 
 # Definir los tags y su orden
 tags_metadata = [
@@ -29,10 +41,34 @@ tags_metadata = [
     {
         "name": "auth",
         "description": "Operaciones de autenticación"
+    },
+    {
+        "name": "jobs",
+        "description": "Trabajos en segundo plano"
+    },
+    {
+        "name": "health",
+        "description": "Sondas de salud y diagnóstico"
     }
 ]
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+# Candidatos del índice de títulos que se comprueban en la base de datos
+TITLE_CANDIDATES = 5
+# Filas que se ordenan cuando hay que recurrir a ILIKE
+TITLE_FALLBACK_LIMIT = 50
+
+# Vecinos extra que se piden al índice de argumentos por si alguno ya no existe
+SIMILAR_OVERFETCH = 5
+
+# Columnas por las que se puede ordenar el listado
+SORT_COLUMNS = {
+    "title": Movie.title,
+    "rating": Movie.imdb_rating,
+    "runtime": Movie.runtime,
+    "year": Movie.year_start
+}
 
 @router.get("/movies/", response_model=PaginatedResponse[MovieResponse], tags=["read"])
 async def list_movies(
@@ -47,31 +83,72 @@ async def list_movies(
         le=100,
         description="Número de registros a retornar por página (máximo 100)"
     ),
-    session: AsyncSession = Depends(get_session)
+    genre: Optional[str] = Query(default=None, description="Género (p.ej. sci-fi)"),
+    director: Optional[str] = Query(default=None, description="Director (coincidencia parcial)"),
+    type: Optional[str] = Query(default=None, description="Tipo OMDB: movie, series, episode"),
+    min_rating: Optional[float] = Query(default=None, ge=0, le=10, description="Rating IMDB mínimo"),
+    min_runtime: Optional[int] = Query(default=None, ge=0, description="Duración mínima en minutos"),
+    max_runtime: Optional[int] = Query(default=None, ge=0, description="Duración máxima en minutos"),
+    year_from: Optional[int] = Query(default=None, description="Año de estreno mínimo"),
+    year_to: Optional[int] = Query(default=None, description="Año de estreno máximo"),
+    sort: Literal["title", "rating", "runtime", "year"] = Query(default="title", description="Campo de ordenación"),
+    order: Literal["asc", "desc"] = Query(default="asc", description="Sentido de la ordenación"),
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Lista todas las películas de la base de datos con paginación.
     
-    Los resultados están ordenados por título alfabéticamente.
+    Por defecto los resultados están ordenados por título alfabéticamente.
+    Los filtros usan las columnas indexadas con los metadatos de OMDB.
     
     Parámetros:
 
         - skip: Número de registros a saltar (para paginación)
         - limit: Número de registros a retornar (tamaño de página)
+        - genre, director, type, min_rating, min_runtime, max_runtime: Filtros opcionales
+        - year_from, year_to: Rango de año de estreno (inclusive)
+        - sort: title, rating, runtime o year
+        - order: asc o desc
     
     Ejemplo de uso:
 
         - Obtener primeras 10 películas: /movies/
         - Obtener siguientes 10 películas: /movies/?skip=10
         - Obtener 20 películas por página: /movies/?limit=20
+        - Ciencia ficción mejor valorada: /movies/?genre=sci-fi&sort=rating&order=desc
+        - Películas de los 90 por año: /movies/?year_from=1990&year_to=1999&sort=year
     """
-    # Consulta para obtener películas ordenadas por título
-    query = select(Movie).order_by(Movie.title).offset(skip).limit(limit)
+    filters = []
+    if genre:
+        filters.append(Movie.id.in_(
+            select(MovieGenre.movie_id).where(MovieGenre.genre == normalize_genre(genre))
+        ))
+    if director:
+        filters.append(Movie.director.ilike(f"%{director}%"))
+    if type:
+        filters.append(Movie.type == type)
+    if min_rating is not None:
+        filters.append(Movie.imdb_rating >= min_rating)
+    if min_runtime is not None:
+        filters.append(Movie.runtime >= min_runtime)
+    if max_runtime is not None:
+        filters.append(Movie.runtime <= max_runtime)
+    if year_from is not None:
+        filters.append(Movie.year_start >= year_from)
+    if year_to is not None:
+        filters.append(Movie.year_start <= year_to)
+
+    # Consulta para obtener películas ordenadas; el id desempata para paginar de forma estable
+    sort_column = SORT_COLUMNS[sort]
+    sort_clause = sort_column.desc() if order == "desc" else sort_column.asc()
+    if sort != "title":
+        sort_clause = sort_clause.nulls_last()
+    query = select(Movie).where(*filters).order_by(sort_clause, Movie.id).offset(skip).limit(limit)
     result = await session.execute(query)
     movies = result.scalars().all()
     
     # Consulta eficiente para el conteo total
-    count_query = select(func.count()).select_from(Movie)
+    count_query = select(func.count()).select_from(Movie).where(*filters)
     total = await session.scalar(count_query)
     
     return PaginatedResponse(
@@ -81,10 +158,111 @@ async def list_movies(
         limit=limit
     )
 
+@router.get("/movies/changes", response_model=ChangeFeed, tags=["read"])
+async def movie_changes(
+    since: int = Query(default=0, ge=0, description="Token `next_since` de la respuesta anterior (0: catálogo entero)"),
+    limit: int = Query(default=100, ge=1, le=1000, description="Número máximo de cambios"),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    Cambios del catálogo desde un token, para sincronizar sin volver a
+    descargar el listado entero: altas y modificaciones con la película
+    actual y bajas (`op=delete`, sin película).
+
+    La primera sincronización usa `since=0`; después se pasa el `next_since`
+    de la respuesta anterior hasta que `has_more` sea false. Cada película
+    aparece como mucho una vez, con su último cambio. Si el token es
+    anterior a las bajas que ya se han borrado del registro responde 410 y
+    hay que volver a sincronizar desde 0.
+
+    Ejemplo de uso:
+
+        - /movies/changes?since=0&limit=500
+        - /movies/changes?since=1234
+    """
+    try:
+        return await read_changes(session, since, limit)
+    except ChangeFeedExpired:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Sync token expired, resync from since=0"
+        )
+
+@router.get("/movies/events", tags=["read"], response_class=StreamingResponse)
+async def movie_events():
+    """
+    Stream (Server-Sent Events) de los cambios del catálogo en este
+    proceso: eventos `create`, `update` y `delete` con `movie_id` y, salvo en
+    las bajas, la película. Sustituye a sondear `GET /movies/` cada pocos
+    segundos.
+
+    Un cliente que no consume los eventos a tiempo recibe `overflow` y se le
+    cierra el stream: debe reconectar y, si necesita no perder cambios,
+    ponerse al día con `GET /movies/changes`. Con demasiados clientes
+    conectados responde 503.
+
+    Ejemplo de uso:
+
+        - new EventSource("/api/v1/movies/events")
+    """
+    try:
+        subscription = event_bus.subscribe()
+    except TooManySubscribers:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many event stream subscribers, retry later",
+            headers={"Retry-After": "5"}
+        )
+    return StreamingResponse(
+        event_bus.stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/movies/suggest", response_model=List[MovieSuggestion], tags=["read"])
+async def suggest_movies(
+    prefix: str = Query(min_length=1, max_length=100, description="Comienzo del título"),
+    limit: int = Query(default=10, ge=1, le=20, description="Número máximo de sugerencias")
+):
+    """
+    Sugerencias de autocompletado para la caja de búsqueda.
+
+    Se sirven desde un índice de prefijos en memoria, sin consultar la base
+    de datos. Ignora mayúsculas, acentos y el artículo inicial ("matr"
+    sugiere "The Matrix").
+
+    Ejemplo de uso:
+
+        - /movies/suggest?prefix=star&limit=5
+    """
+    return [
+        MovieSuggestion(id=movie_id, title=title)
+        for movie_id, title in prefix_index.suggest(prefix, limit)
+    ]
+
+@router.get("/movies/popular", response_model=List[PopularMovie], tags=["read"])
+async def popular_movies(
+    limit: int = Query(default=10, ge=1, le=100, description="Número máximo de películas")
+):
+    """
+    Películas más vistas (consultas a `GET /movies/{movie_id}`), de más a
+    menos visitas.
+
+    Se sirve desde un ranking en memoria que se recalcula cada vez que se
+    vuelcan los contadores de visitas (`VIEW_FLUSH_INTERVAL_SECONDS`), así
+    que las visitas más recientes tardan ese tiempo en contar. El ranking
+    tiene como mucho `POPULAR_MOVIES_SIZE` películas.
+
+    Ejemplo de uso:
+
+        - /movies/popular?limit=20
+    """
+    return view_counter.top(limit)
+
 @router.get("/movies/{movie_id}", response_model=MovieResponse, tags=["read"])
 async def get_movie_by_id(
     movie_id: int,
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Obtiene una película específica por su ID.
@@ -109,15 +287,106 @@ async def get_movie_by_id(
     if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
 
+    # Solo un contador en memoria: la escritura se hace por lotes en segundo plano
+    view_counter.record(movie.id)
     return movie
 
+async def load_scored_movies(
+    session: AsyncSession,
+    ranked: List[Tuple[int, float]],
+    limit: int
+) -> List[ScoredMovie]:
+    """Lee de la base de datos las películas de un ranking, conservando el orden y descartando las que ya no existen."""
+    if not ranked:
+        return []
+    result = await session.execute(select(Movie).where(Movie.id.in_([movie_id for movie_id, _ in ranked])))
+    movies = {movie.id: movie for movie in result.scalars().all()}
+    scored = [
+        ScoredMovie(**movies[movie_id].model_dump(), score=round(score, 4))
+        for movie_id, score in ranked
+        if movie_id in movies
+    ]
+    return scored[:limit]
+
+@router.get("/movies/search/plot", response_model=List[ScoredMovie], tags=["read"])
+async def search_movies_by_plot(
+    q: str = Query(min_length=2, max_length=500, description="Descripción libre del argumento"),
+    limit: int = Query(default=10, ge=1, le=50, description="Número máximo de resultados"),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    Búsqueda de películas por argumento con texto libre.
+
+    La consulta se vectoriza igual que los argumentos (localmente, sin
+    servicios externos) y se compara con todo el índice de argumentos.
+
+    Ejemplo de uso:
+
+        - /movies/search/plot?q=hackers discover reality is simulated
+    """
+    vector = embed_text(q, dim=plot_index.dim)
+    if not vector.any():
+        return []
+
+    with phase("vector-search"):
+        ranked = await run_in_threadpool(plot_index.nearest, vector, limit + SIMILAR_OVERFETCH)
+    return await load_scored_movies(session, ranked, limit)
+
+@router.get("/movies/{movie_id}/similar", response_model=List[ScoredMovie], tags=["read"])
+async def similar_movies(
+    movie_id: int,
+    limit: int = Query(default=10, ge=1, le=50, description="Número de películas similares"),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    Películas con argumento (y géneros) más parecidos al de una película dada.
+
+    Usa los vectores precalculados del índice de argumentos: la similitud con
+    todo el catálogo se calcula en una sola operación matricial.
+
+    Args:
+
+        - movie_id (int): ID de la película de referencia
+        - limit (int): Número máximo de resultados
+
+    Returns:
+
+        - List[ScoredMovie]: Películas ordenadas de más a menos similar
+
+    Raises:
+
+        - HTTPException: Si la película no se encuentra (404)
+    """
+    result = await session.execute(select(Movie).where(Movie.id == movie_id))
+    movie = result.scalar_one_or_none()
+    if not movie:
+        raise HTTPException(status_code=404, detail="Movie not found")
+
+    vector = plot_index.vector(movie_id)
+    record_cache_lookup("plot_index", hit=vector is not None)
+    if vector is None:
+        # Película que el índice de este worker aún no tiene
+        vector = embed_movie(movie.model_dump(), plot_index.dim)
+    if vector is None:
+        return []
+
+    with phase("vector-search"):
+        ranked = await run_in_threadpool(
+            plot_index.nearest, vector, limit + SIMILAR_OVERFETCH, {movie_id}
+        )
+    return await load_scored_movies(session, ranked, limit)
+
 @router.get("/movies/title/{title}", response_model=MovieResponse, tags=["read"])
 async def get_movie_by_title(
     title: str,
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
-    Obtiene una película específica por su título.
+    Obtiene la película cuyo título mejor coincide con el buscado.
+
+    Orden de preferencia: coincidencia exacta (ignorando mayúsculas, acentos
+    y el artículo inicial), prefijo, título que contiene el texto y, por
+    último, similitud de trigramas para tolerar erratas.
 
     Args:
 
@@ -132,93 +401,141 @@ async def get_movie_by_title(
 
         - HTTPException: Si la película no se encuentra (404)
     """
-    # Usamos ilike para hacer la búsqueda case-insensitive
-    query = select(Movie).where(Movie.title.ilike(f"%{title}%"))
-    result = await session.execute(query)
-    movies = result.scalars().all()
+    movie = None
+    candidates = [match.movie_id for match in title_index.search(title, limit=TITLE_CANDIDATES)]
+    if candidates:
+        # El índice puede estar desactualizado: se puntúan las filas actuales
+        result = await session.execute(select(Movie).where(Movie.id.in_(candidates)))
+        movie = best_title_match(title, result.scalars().all())
+    record_cache_lookup("title_index", hit=movie is not None)
+
+    if movie is None:
+        # Películas que el índice de este worker aún no conoce (creadas por otro proceso)
+        query = (
+            select(Movie)
+            .where(Movie.title.ilike(f"%{title}%"))
+            .order_by(func.length(Movie.title), Movie.id)
+            .limit(TITLE_FALLBACK_LIMIT)
+        )
+        result = await session.execute(query)
+        rows = result.scalars().all()
+        # Si ninguna fila se puede puntuar, la más corta que contiene el texto buscado
+        movie = best_title_match(title, rows) or next(iter(rows), None)
 
-    if not movies:
+    if not movie:
         raise HTTPException(status_code=404, detail="No movies found with that title")
-    
-    # Si hay múltiples coincidencias, devolvemos la primera
-    if len(movies) > 1:
-        return movies[0]
-    
-    return movies[0]
 
-@router.post("/movies/", response_model=MovieResponse, tags=["write"])
+    return movie
+
+@router.post(
+    "/movies/",
+    response_model=MovieResponse,
+    tags=["write"],
+    responses={202: {"model": JobResponse, "description": "Trabajo de creación encolado"}}
+)
 async def create_movie(
     movie: MovieCreate,
+    request: Request,
+    response: Response,
+    background: bool = Query(default=False, alias="async", description="Crear en segundo plano (202 + trabajo)"),
+    idempotency_key: Optional[str] = Header(
+        default=None,
+        alias=IDEMPOTENCY_HEADER,
+        max_length=255,
+        description="Clave única del cliente: los reintentos con la misma clave repiten la primera respuesta"
+    ),
     session: AsyncSession = Depends(get_session),
     omdb_service: OMDBService = Depends(get_omdb_service)
 ):
-    """Crear una nueva película buscando sus datos en OMDB."""
-    # Buscar película por título
-    search_result = await omdb_service.search_movies(movie.title)
-    logger.info(f"Search result for '{movie.title}': {search_result}")
-
-    if not search_result:
-        raise HTTPException(
-            status_code=404,
-            detail="Error connecting to OMDB API"
-        )
-
-    if search_result.get("Response") == "False":
-        error_message = search_result.get("Error", "Movie not found in OMDB")
-        raise HTTPException(
-            status_code=404,
-            detail=error_message
-        )
-
-    movies_found = search_result.get("Search", [])
-    if not movies_found:
-        raise HTTPException(
-            status_code=404,
-            detail=f"No movies found with title: {movie.title}"
-        )
+    """
+    Crear una nueva película buscando sus datos en OMDB.
 
-    # Intentar encontrar una coincidencia exacta primero
-    exact_match = next(
-        (m for m in movies_found if m["Title"].lower() == movie.title.lower()),
-        movies_found[0]  # Si no hay coincidencia exacta, usar el primer resultado
-    )
+    Con `?async=true` no espera a OMDB: responde 202 con un trabajo cuyo
+    estado y resultado se consultan en `GET /jobs/{job_id}` (cabecera
+    Location). Si la cola de trabajos está llena responde 503.
 
-    # Verificar si la película ya existe
-    existing_movie = await session.execute(
-        select(Movie).where(Movie.imdb_id == exact_match["imdbID"])
-    )
-    if existing_movie.scalar_one_or_none():
-        raise HTTPException(
-            status_code=400,
-            detail=f"Movie with IMDB ID {exact_match['imdbID']} already exists in database"
+    Con la cabecera `Idempotency-Key`, repetir la petición (p.ej. tras un
+    timeout) devuelve la respuesta guardada sin volver a consultar OMDB ni
+    encolar otro trabajo. Reutilizar la clave para otra petición da 422 y
+    mientras la primera sigue en curso, 409.
+    """
+    if idempotency_key is None:
+        return await _create_movie(movie, request, response, background, session, omdb_service)
+
+    fingerprint = request_fingerprint(request.method, request.url.path, {"title": movie.title, "async": background})
+    idempotent = await IdempotentRequest.begin(session, idempotency_key, fingerprint)
+    if idempotent.replay is not None:
+        pin_reads_to_primary(request, idempotent.replay)
+        return idempotent.replay
+
+    try:
+        result = await _create_movie(movie, request, response, background, session, omdb_service)
+    except HTTPException as e:
+        await idempotent.finish(e.status_code, {"detail": e.detail})
+        raise
+    except BaseException:
+        await idempotent.release()
+        raise
+
+    if isinstance(result, JSONResponse):
+        location = result.headers.get("location")
+        await idempotent.finish(
+            result.status_code, json.loads(result.body), {"Location": location} if location else None
         )
+    else:
+        await idempotent.finish(status.HTTP_200_OK, MovieResponse.model_validate(result).model_dump(mode="json"))
+    return result
 
-    # Obtener detalles completos
-    movie_details = await omdb_service.get_movie_details(exact_match["imdbID"])
-    if not movie_details:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Could not fetch details for movie: {exact_match['Title']}"
+async def _create_movie(
+    movie: MovieCreate,
+    request: Request,
+    response: Response,
+    background: bool,
+    session: AsyncSession,
+    omdb_service: OMDBService
+):
+    if background:
+        try:
+            job = await job_queue.submit("create_movie", {"title": movie.title}, omdb_service=omdb_service)
+        except JobQueueFull:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Job queue is full, retry later",
+                headers={"Retry-After": "5"}
+            )
+        accepted = JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=JobResponse.model_validate(job).model_dump(mode="json"),
+            headers={"Location": str(request.url_for("get_job", job_id=job.id))}
         )
+        pin_reads_to_primary(request, accepted)
+        return accepted
+
+    try:
+        db_movie = await import_movie(movie.title, session, omdb_service)
+    except MovieImportError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    pin_reads_to_primary(request, response)
+    return db_movie
 
-    # Crear película con datos completos
-    db_movie = Movie(
-        title=movie_details["Title"],
-        year=movie_details["Year"],
-        imdb_id=movie_details["imdbID"],
-        plot=movie_details.get("Plot"),
-        poster=movie_details.get("Poster")
-    )
-
-    session.add(db_movie)
-    await session.commit()
-    await session.refresh(db_movie)
+@router.get("/jobs/{job_id}", response_model=JobResponse, tags=["jobs"])
+async def get_job(job_id: str):
+    """
+    Estado de un trabajo en segundo plano: queued, running, succeeded o failed.
 
-    return db_movie
+    Si terminó bien, `result` contiene la película creada; si falló, `error`
+    contiene el código HTTP y el detalle que habría devuelto la petición síncrona.
+    """
+    job = await job_queue.store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 @router.delete("/movies/{movie_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["delete"])
 async def delete_movie(
     movie_id: int,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
@@ -253,8 +570,11 @@ async def delete_movie(
             detail="Movie not found"
         )
 
+    await session.execute(delete(MovieGenre).where(MovieGenre.movie_id == movie_id))
+    await session.execute(delete(MovieViews).where(MovieViews.movie_id == movie_id))
     await session.delete(movie)
     await session.commit()
+    pin_reads_to_primary(request, response)
     
     return None
 
@@ -317,7 +637,7 @@ async def login_for_access_token(
 
     Returns:
 
-        - Token: Token de acceso JWT y tipo de token
+        - Token: Token de acceso JWT, tipo de token y refresh token para renovarlo
 
     Raises:
 
@@ -332,8 +652,41 @@ async def login_for_access_token(
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return issue_tokens(user.username)
+
+@router.post("/token/refresh", response_model=Token, tags=["auth"])
+async def refresh_access_token(
+    body: RefreshTokenRequest,
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Renueva el token de acceso con el refresh token de la respuesta anterior,
+    sin contraseña (bcrypt). El refresh token se puede usar una vez: la
+    respuesta trae uno nuevo, que caduca cuando caducaba la sesión del login
+    (`REFRESH_TOKEN_EXPIRE_DAYS`), no en otros tantos días.
+
+    Args:
+
+        - body (RefreshTokenRequest): refresh token
+        - session (AsyncSession): Sesión de base de datos
+
+    Returns:
+
+        - Token: Token de acceso nuevo y el siguiente refresh token
+
+    Raises:
+
+        HTTPException:
+
+            - 401 si el refresh token no es válido, ha caducado o ya se usó, o
+              si el usuario ya no existe o está desactivado
+    """
+    refreshed = await use_refresh_token(body.refresh_token, session)
+    if refreshed is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user, session_expires = refreshed
+    return issue_tokens(user.username, session_expires=session_expires)
\ No newline at end of file
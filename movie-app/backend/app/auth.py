@@ -1,5 +1,8 @@
+import heapq
+import time
+import uuid
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
@@ -7,7 +10,8 @@ from passlib.context import CryptContext
 from sqlmodel import select
 from .models import User
 from .database import get_session
-from .config import settings
+from .config import get_settings
+from .timing import phase
 
 # Configuración de seguridad
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -27,8 +31,9 @@ async def authenticate_user(username: str, password: str, session) -> Optional[U
     
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
-        return None
+    with phase("auth"):
+        if not verify_password(password, user.hashed_password):
+            return None
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -37,10 +42,102 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm="HS256")
+    to_encode.update({"exp": expire, "type": "access"})
+    encoded_jwt = jwt.encode(to_encode, get_settings().secret_key, algorithm="HS256")
     return encoded_jwt
 
+def create_refresh_token(
+    username: str,
+    expires_delta: Optional[timedelta] = None,
+    expires_at: Optional[datetime] = None
+) -> str:
+    """
+    Refresh token de un solo uso (su `jti` se invalida al usarlo) para renovar
+    el access token sin contraseña. `expires_at` es la caducidad de la sesión:
+    al rotar se conserva la del login en lugar de empezar otra vez.
+    """
+    expire = expires_at or datetime.utcnow() + (expires_delta or timedelta(days=get_settings().refresh_token_expire_days))
+    to_encode = {"sub": username, "exp": expire, "type": "refresh", "jti": uuid.uuid4().hex}
+    return jwt.encode(to_encode, get_settings().secret_key, algorithm="HS256")
+
+def issue_tokens(username: str, session_expires: Optional[datetime] = None) -> dict:
+    """Access token y refresh token nuevos para un usuario ya autenticado."""
+    access_token_expires = timedelta(minutes=get_settings().access_token_expire_minutes)
+    return {
+        "access_token": create_access_token(data={"sub": username}, expires_delta=access_token_expires),
+        "refresh_token": create_refresh_token(username, expires_at=session_expires),
+        "token_type": "bearer"
+    }
+
+class TokenDenylist:
+    """
+    `jti` de los refresh tokens ya usados, cada uno hasta que caduca su token
+    (después la firma ya lo rechaza). Los caducados se descartan por orden de
+    caducidad, así que el tamaño no pasa del número de tokens vivos. Es de
+    cada proceso: con varios workers, un token podría reutilizarse una vez
+    por worker.
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._expires: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        self._evict()
+        return len(self._expires)
+
+    def __contains__(self, jti: str) -> bool:
+        self._evict()
+        return jti in self._expires
+
+    def add(self, jti: str, expires_at: float) -> None:
+        self._evict()
+        if expires_at > self.clock():
+            self._expires[jti] = expires_at
+            heapq.heappush(self._heap, (expires_at, jti))
+
+    def _evict(self) -> None:
+        now = self.clock()
+        while self._heap and self._heap[0][0] <= now:
+            _, jti = heapq.heappop(self._heap)
+            self._expires.pop(jti, None)
+
+refresh_denylist = TokenDenylist()
+
+async def use_refresh_token(token: str, session) -> Optional[Tuple[User, datetime]]:
+    """
+    Valida un refresh token con su firma (sin bcrypt) y lo invalida para que
+    no se pueda volver a usar. El usuario se vuelve a leer: si se ha borrado o
+    desactivado, la sesión termina. Devuelve el usuario y la caducidad de la
+    sesión, o None si no es válido, está caducado o ya se usó.
+    """
+    try:
+        with phase("auth"):
+            payload = jwt.decode(token, get_settings().secret_key, algorithms=["HS256"])
+    except JWTError:
+        return None
+    jti, username = payload.get("jti"), payload.get("sub")
+    if payload.get("type") != "refresh" or not jti or not username:
+        return None
+    if jti in refresh_denylist:
+        return None
+    refresh_denylist.add(jti, float(payload["exp"]))
+
+    result = await session.execute(select(User).where(User.username == username))
+    user = result.scalar_one_or_none()
+    if user is None or not user.is_active:
+        return None
+    return user, datetime.utcfromtimestamp(payload["exp"])
+
+def token_subject(token: str) -> Optional[str]:
+    """Usuario (`sub`) de un token válido, sin consultar la base de datos; None si no es válido."""
+    try:
+        payload = jwt.decode(token, get_settings().secret_key, algorithms=["HS256"])
+    except JWTError:
+        return None
+    return payload.get("sub")
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     session=Depends(get_session)
@@ -51,9 +148,11 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=["HS256"])
+        with phase("auth"):
+            payload = jwt.decode(token, get_settings().secret_key, algorithms=["HS256"])
         username: str = payload.get("sub")
-        if username is None:
+        # Los refresh tokens solo sirven para renovar, no para llamar a la API
+        if username is None or payload.get("type", "access") != "access":
             raise credentials_exception
     except JWTError:
         raise credentials_exception
@@ -64,4 +163,12 @@ async def get_current_user(
     
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    return user
+
+async def get_current_admin(user: User = Depends(get_current_user)) -> User:
+    if not user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    return user
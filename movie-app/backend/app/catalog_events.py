@@ -0,0 +1,88 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Literal
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .models import Movie
+
+_PENDING_KEY = "catalog_changes"
+
+
+@dataclass(frozen=True)
+class CatalogChange:
+    """Alta, modificación o baja de una película, con una copia de sus campos."""
+    op: Literal["create", "update", "delete"]
+    movie_id: int
+    data: Dict
+
+
+CatalogListener = Callable[[List[CatalogChange]], None]
+
+_listeners: List[CatalogListener] = []
+
+
+def add_catalog_listener(listener: CatalogListener) -> None:
+    """Registra una función que recibe los cambios del catálogo tras cada commit."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def remove_catalog_listener(listener: CatalogListener) -> None:
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def snapshot(op: str, movie: Movie) -> CatalogChange:
+    return CatalogChange(op=op, movie_id=movie.id, data=movie.model_dump())
+
+
+def record_changes(session: Session, changes: List[CatalogChange]) -> None:
+    """
+    Añade cambios que la sesión no ve como objetos ORM (p.ej. sentencias
+    insert/delete de Core); se publican con el siguiente commit.
+    """
+    session.info.setdefault(_PENDING_KEY, []).extend(changes)
+
+
+def pending_changes(session: Session) -> List[CatalogChange]:
+    """Cambios registrados en la transacción en curso que aún no se han publicado."""
+    return session.info.get(_PENDING_KEY, [])
+
+
+def publish(changes: List[CatalogChange]) -> None:
+    """Entrega los cambios a los listeners; un listener que falla no afecta al resto."""
+    for listener in list(_listeners):
+        try:
+            listener(changes)
+        except Exception:
+            logger.exception(f"Catalog listener {getattr(listener, '__qualname__', listener)} failed")
+
+
+@event.listens_for(Session, "after_flush")
+def _capture_changes(session: Session, flush_context) -> None:
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, Movie):
+            changes.append(snapshot("create", obj))
+    for obj in session.dirty:
+        if isinstance(obj, Movie) and session.is_modified(obj, include_collections=False):
+            changes.append(snapshot("update", obj))
+    for obj in session.deleted:
+        if isinstance(obj, Movie):
+            changes.append(snapshot("delete", obj))
+    if changes:
+        record_changes(session, changes)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_changes(session: Session) -> None:
+    changes = session.info.pop(_PENDING_KEY, None)
+    if changes:
+        publish(changes)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_changes(session: Session, previous_transaction) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,113 @@
+from datetime import timedelta
+from typing import Dict
+
+from loguru import logger
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .catalog_events import pending_changes
+from .config import get_settings
+from .coordination import get_state, set_state
+from .models import ChangeFeed, Movie, MovieChange, MovieChangeLog, MovieResponse, utcnow
+
+# Token a partir del cual hay bajas borradas: un cliente con un token anterior debe resincronizar
+HORIZON_STATE_KEY = "change_log_horizon"
+
+
+class ChangeFeedExpired(Exception):
+    """El token es anterior a las bajas que ya se han borrado del registro."""
+
+
+@event.listens_for(Session, "before_commit")
+def _write_change_log(session: Session) -> None:
+    """
+    Escribe los cambios del catálogo en `moviechangelog` dentro de la misma
+    transacción. Compacta sobre la marcha: se borran las entradas anteriores
+    de cada película, así que el registro crece con el catálogo y no con el
+    número de cambios.
+    """
+    # El commit hace el último flush después de este evento: se adelanta para ver todos los cambios
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    changes = pending_changes(session)
+    if not changes:
+        return
+
+    latest: Dict[int, str] = {}
+    for change in changes:
+        latest.pop(change.movie_id, None)
+        latest[change.movie_id] = change.op
+    now = utcnow()
+    connection = session.connection()
+    connection.execute(delete(MovieChangeLog).where(MovieChangeLog.movie_id.in_(list(latest))))
+    connection.execute(
+        insert(MovieChangeLog),
+        [{"movie_id": movie_id, "op": op, "changed_at": now} for movie_id, op in latest.items()]
+    )
+
+
+async def read_changes(session: AsyncSession, since: int, limit: int) -> ChangeFeed:
+    """
+    Cambios posteriores al token `since`, con la versión actual de cada
+    película. Con `since=0` devuelve el catálogo entero (la sincronización
+    inicial). Los cambios de hace menos de `change_feed_settle_seconds` se
+    dejan para la siguiente llamada: los ids se asignan al insertar, y una
+    transacción que aún no ha hecho commit podría aparecer después con un id
+    menor que el último ya servido.
+    """
+    if since:
+        horizon = await get_state(session, HORIZON_STATE_KEY) or 0
+        if since < horizon:
+            raise ChangeFeedExpired()
+
+    settled_before = utcnow() - timedelta(seconds=get_settings().change_feed_settle_seconds)
+    result = await session.execute(
+        select(MovieChangeLog)
+        .where(MovieChangeLog.id > since, MovieChangeLog.changed_at <= settled_before)
+        .order_by(MovieChangeLog.id)
+        .limit(limit + 1)
+    )
+    entries = result.scalars().all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    alive = [entry.movie_id for entry in entries if entry.op != "delete"]
+    movies = {}
+    if alive:
+        result = await session.execute(select(Movie).where(Movie.id.in_(alive)))
+        movies = {movie.id: movie for movie in result.scalars().all()}
+
+    changes = []
+    for entry in entries:
+        movie = movies.get(entry.movie_id)
+        # Borrada después de este cambio: su baja llegará con un token posterior
+        op = entry.op if entry.op == "delete" or movie is not None else "delete"
+        changes.append(MovieChange(
+            token=entry.id,
+            op=op,
+            movie_id=entry.movie_id,
+            movie=MovieResponse.model_validate(movie) if op != "delete" else None
+        ))
+    return ChangeFeed(
+        changes=changes,
+        next_since=entries[-1].id if entries else since,
+        has_more=has_more
+    )
+
+
+async def compact_change_log(session: AsyncSession, retention: timedelta) -> int:
+    """Borra las bajas más antiguas que `retention` y avanza el horizonte. Devuelve cuántas borra."""
+    cutoff = utcnow() - retention
+    horizon = await session.scalar(
+        select(func.max(MovieChangeLog.id))
+        .where(MovieChangeLog.op == "delete", MovieChangeLog.changed_at < cutoff)
+    )
+    if horizon is None:
+        return 0
+    result = await session.execute(
+        delete(MovieChangeLog).where(MovieChangeLog.op == "delete", MovieChangeLog.id <= horizon)
+    )
+    await set_state(session, HORIZON_STATE_KEY, max(horizon, await get_state(session, HORIZON_STATE_KEY) or 0))
+    logger.info(f"Removed {result.rowcount} tombstones from the change log (horizon {horizon})")
+    return result.rowcount
@@ -0,0 +1,10 @@
+from starlette.requests import HTTPConnection
+
+
+def client_key(request: HTTPConnection) -> str:
+    """
+    Identificador del cliente: su IP tal como la ve el servidor ASGI. Detrás
+    de un proxy (Cloud Run, un balanceador) hay que arrancar uvicorn con
+    `--forwarded-allow-ips` para que la tome de X-Forwarded-For.
+    """
+    return request.client.host if request.client else "unknown"
@@ -1,13 +1,86 @@
+from functools import lru_cache
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     database_url: str
+    # Réplica de lectura opcional para los GET: retraso máximo admitido y cuánto tiempo
+    # leen del primario los clientes que acaban de escribir (read-your-writes)
+    read_database_url: Optional[str] = None
+    replica_max_lag_seconds: float = 5.0
+    replica_lag_check_seconds: float = 1.0
+    read_your_writes_seconds: float = 5.0
+    # Una o varias keys separadas por comas; se alternan y cada una tiene su cuota diaria
     omdb_api_key: str
+    omdb_daily_quota: int = 1000
+    omdb_base_url: str = "http://www.omdbapi.com/"
+    # Páginas de una búsqueda de OMDB que se piden a la vez
+    omdb_search_concurrency: int = 5
     google_cloud_project: str
     secret_key: str = "your-secret-key-here"  # En producción, usar una clave secreta segura
     access_token_expire_minutes: int = 30
+    # Validez de los refresh tokens (cada uno se puede usar una sola vez)
+    refresh_token_expire_days: int = 7
+    # Diagnóstico SQL: echo completo, umbral de consulta lenta y repeticiones para avisar de N+1
+    sql_echo: bool = False
+    slow_query_threshold_ms: float = 200.0
+    n_plus_one_threshold: int = 10
+    # Cabecera Server-Timing y access log estructurado con el desglose por fases
+    server_timing_enabled: bool = True
+    access_log_enabled: bool = True
+    # Índice de vectores de argumentos (películas similares): instantánea en disco y tamaño del espacio de hashing
+    plot_index_dir: str = "data/plot_index"
+    plot_vector_dim: int = 262144
+    # Trabajos en segundo plano: almacén (database o memory), workers y tamaño máximo de la cola
+    job_backend: str = "database"
+    job_workers: int = 4
+    job_queue_size: int = 100
+    # Trabajos terminados que se conservan y trabajos "running" que se dan por abandonados
+    job_retention_seconds: int = 3600
+    job_stale_after_seconds: int = 300
+    # Refresco de películas desde OMDB: cada cuánto (0 lo desactiva), a partir de qué antigüedad,
+    # tamaño de lote y llamadas a OMDB como máximo por pasada
+    refresh_interval_seconds: int = 3600
+    refresh_max_age_days: int = 30
+    refresh_batch_size: int = 20
+    refresh_omdb_budget: int = 100
+    # Cambios del catálogo (GET /movies/changes): días que se guardan las bajas y segundos
+    # que se espera antes de servir un cambio, por si una transacción anterior aún no ha hecho commit
+    change_log_retention_days: int = 30
+    change_feed_settle_seconds: float = 1.0
+    # Stream de eventos del catálogo (SSE): suscriptores por proceso, eventos pendientes por
+    # suscriptor antes de descartarlo y segundos entre heartbeats
+    sse_max_subscribers: int = 1000
+    sse_queue_size: int = 100
+    sse_heartbeat_seconds: float = 15.0
+    # Contadores de visitas: segundos entre volcados a la base de datos (0 lo desactiva) y
+    # películas del ranking de populares que se recalcula en cada volcado
+    view_flush_interval_seconds: float = 30.0
+    popular_movies_size: int = 100
+    # Segundos que se reutiliza el resultado de /readyz (comprobación de la base de datos)
+    # y segundos que se espera a la base de datos antes de darla por no lista
+    readiness_cache_seconds: float = 5.0
+    readiness_timeout_seconds: float = 2.0
+    # Horas que se guardan las respuestas de las peticiones con Idempotency-Key
+    idempotency_key_ttl_hours: int = 24
+
+    # Límites por cliente (usuario del JWT o IP) con token bucket: peticiones por minuto y ráfaga
+    rate_limit_enabled: bool = True
+    rate_limit_read_per_minute: int = 600
+    rate_limit_read_burst: int = 100
+    rate_limit_write_per_minute: int = 30
+    rate_limit_write_burst: int = 10
+    rate_limit_auth_per_minute: int = 10
+    rate_limit_auth_burst: int = 5
+    # Peticiones simultáneas por tipo en cada proceso; las que sobran se rechazan con 503
+    max_concurrent_reads: int = 100
+    max_concurrent_writes: int = 20
+    max_concurrent_auth: int = 10
 
     class Config:
         env_file = ".env"
 
-settings = Settings()
\ No newline at end of file
+@lru_cache
+def get_settings() -> Settings:
+    """Configuración de la aplicación. Se lee al primer uso, no al importar, para que importar no exija las variables de entorno."""
+    return Settings()
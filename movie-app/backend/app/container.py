@@ -0,0 +1,141 @@
+import time
+from datetime import timedelta
+from contextlib import AsyncExitStack, contextmanager
+from functools import cached_property
+from typing import Dict, Iterator
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from .change_log import compact_change_log
+from .config import Settings, get_settings
+from .coordination import process_lock
+from .database import create_db_and_tables, get_engine
+from .event_bus import event_bus
+from .jobs import job_queue
+from .metrics import STARTUP_DURATION
+from .runtime import loop_monitor
+from .services.movie_service import seed_catalog
+from .services.omdb_service import OMDBService, get_omdb_service
+from .services.plot_index import plot_index
+from .services.refresher import MovieRefresher
+from .services.title_search import load_title_indexes
+from .services.views import view_counter
+
+
+class StartupReport:
+    """
+    Cuánto cuesta cada paso del arranque (importaciones incluidas), para ver
+    en qué se va el arranque en frío. Para el detalle de las importaciones
+    módulo a módulo: `python -X importtime -c "import app.main"`.
+    """
+
+    def __init__(self):
+        self.steps: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.steps[name] = self.steps.get(name, 0.0) + seconds
+        STARTUP_DURATION.labels(step=name).set(self.steps[name])
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    @property
+    def total(self) -> float:
+        return sum(self.steps.values())
+
+    def as_dict(self) -> Dict:
+        return {
+            "total_ms": round(self.total * 1000, 1),
+            "steps": {name: round(seconds * 1000, 1) for name, seconds in self.steps.items()}
+        }
+
+    def log(self) -> None:
+        breakdown = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.steps.items())
+        logger.info(f"Startup finished in {self.total * 1000:.0f} ms ({breakdown})")
+
+
+class AppContainer:
+    """
+    Dependencias de la aplicación. Se construyen al primer uso (no al
+    importar) y el lifespan de FastAPI las arranca y las cierra.
+    """
+
+    def __init__(self, report: StartupReport):
+        self.report = report
+
+    @cached_property
+    def settings(self) -> Settings:
+        return get_settings()
+
+    @cached_property
+    def engine(self) -> AsyncEngine:
+        return get_engine()
+
+    @cached_property
+    def omdb_service(self) -> OMDBService:
+        return get_omdb_service()
+
+    @cached_property
+    def refresher(self) -> MovieRefresher:
+        return MovieRefresher.from_settings(self.settings)
+
+    async def startup(self) -> None:
+        with self.report.step("settings"):
+            self.settings
+        with self.report.step("engine"):
+            self.engine
+
+        # Con varios workers o instancias, solo uno crea las tablas y hace la carga inicial;
+        # el resto espera al bloqueo y se la salta
+        async with AsyncExitStack() as stack:
+            with self.report.step("startup lock"):
+                await stack.enter_async_context(process_lock(self.engine, "startup"))
+            with self.report.step("schema"):
+                migrated = await create_db_and_tables(self.engine)
+            if not migrated:
+                logger.info("Database schema is up to date")
+            session = await stack.enter_async_context(AsyncSession(self.engine))
+            with self.report.step("initial movies"):
+                await seed_catalog(session, self.omdb_service)
+            # La instantánea de vectores está en disco compartido: se sincroniza por turnos
+            with self.report.step("plot index"):
+                await plot_index.sync(session)
+            # Las bajas antiguas del registro de cambios (la compactación por película es continua)
+            with self.report.step("change log"):
+                await compact_change_log(session, timedelta(days=self.settings.change_log_retention_days))
+
+        async with AsyncSession(self.engine) as session:
+            with self.report.step("title indexes"):
+                await load_title_indexes(session)
+            with self.report.step("popular movies"):
+                await view_counter.load(session)
+
+        # Workers de trabajos en segundo plano (y trabajos pendientes de un arranque anterior)
+        with self.report.step("job queue"):
+            await job_queue.start()
+        # Refresco periódico de las películas con datos de OMDB antiguos
+        self.refresher.start()
+        # Volcado periódico de los contadores de visitas (y ranking de populares)
+        view_counter.start()
+        # Retraso del event loop para /debug/runtime y las métricas
+        loop_monitor.start()
+
+        self.report.log()
+
+    async def shutdown(self) -> None:
+        # Cierra los streams SSE abiertos para que el servidor no espere a que los clientes se vayan
+        event_bus.close()
+        await loop_monitor.stop()
+        if "refresher" in self.__dict__:
+            await self.refresher.stop()
+        await job_queue.stop()
+        # Último volcado de las visitas pendientes, antes de cerrar el motor
+        await view_counter.stop()
+        if "engine" in self.__dict__:
+            await self.engine.dispose()
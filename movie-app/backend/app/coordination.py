@@ -0,0 +1,121 @@
+import asyncio
+import os
+import re
+import tempfile
+import zlib
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from .models import AppState, utcnow
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo de ficheros
+    fcntl = None
+
+
+def advisory_key(name: str) -> int:
+    """Clave numérica estable para `pg_advisory_lock` a partir de un nombre."""
+    return zlib.crc32(name.encode("utf-8"))
+
+
+def lock_file_path(engine: AsyncEngine, name: str) -> str:
+    """Fichero de bloqueo junto a la base de SQLite (o en el directorio temporal si es en memoria)."""
+    database = engine.url.database
+    safe_name = re.sub(r"[^0-9A-Za-z_.-]", "_", name)
+    if database and database != ":memory:" and not database.startswith("file:"):
+        return f"{os.path.abspath(database)}.{safe_name}.lock"
+    return os.path.join(tempfile.gettempdir(), f"movie-app.{safe_name}.lock")
+
+
+@asynccontextmanager
+async def _postgres_lock(engine: AsyncEngine, name: str, wait: bool) -> AsyncIterator[bool]:
+    key = advisory_key(name)
+    # El bloqueo es de sesión: vive mientras esta conexión siga abierta
+    async with engine.connect() as connection:
+        if wait:
+            await connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": key})
+            acquired = True
+        else:
+            result = await connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key})
+            acquired = bool(result.scalar())
+        await connection.commit()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                await connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+                await connection.commit()
+
+
+@asynccontextmanager
+async def _file_lock(path: str, wait: bool) -> AsyncIterator[bool]:
+    if fcntl is None:
+        logger.warning(f"File locks are not supported on this platform, not locking {path}")
+        yield True
+        return
+
+    handle = open(path, "a")
+    try:
+        if wait:
+            # flock bloquea el hilo: se espera fuera del bucle de eventos
+            await asyncio.to_thread(fcntl.flock, handle.fileno(), fcntl.LOCK_EX)
+            acquired = True
+        else:
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                acquired = True
+            except BlockingIOError:
+                acquired = False
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+    finally:
+        handle.close()
+
+
+@asynccontextmanager
+async def process_lock(engine: AsyncEngine, name: str, wait: bool = True) -> AsyncIterator[bool]:
+    """
+    Bloqueo exclusivo entre procesos (workers de uvicorn, instancias de Cloud
+    Run...) que comparten la base de datos: un advisory lock en PostgreSQL y
+    un bloqueo de fichero en SQLite.
+
+    Con `wait=False` no espera y devuelve si lo ha conseguido:
+
+        async with process_lock(engine, "startup") as acquired:
+            ...
+    """
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        lock = _postgres_lock(engine, name, wait)
+    elif dialect == "sqlite":
+        lock = _file_lock(lock_file_path(engine, name), wait)
+    else:
+        raise ValueError(f"Process locks are not supported for {dialect}")
+
+    async with lock as acquired:
+        if acquired:
+            logger.debug(f"Acquired process lock '{name}'")
+        yield acquired
+
+
+async def get_state(session: AsyncSession, key: str) -> Optional[Any]:
+    state = await session.get(AppState, key)
+    return state.value if state else None
+
+
+async def set_state(session: AsyncSession, key: str, value: Any) -> None:
+    """Guarda un valor en la tabla `appstate` (hace commit)."""
+    state = await session.get(AppState, key)
+    if state is None:
+        session.add(AppState(key=key, value=value))
+    else:
+        state.value, state.updated_at = value, utcnow()
+    await session.commit()
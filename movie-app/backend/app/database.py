@@ -1,15 +1,147 @@
+import hashlib
+from functools import lru_cache
 from sqlmodel import SQLModel
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from typing import AsyncGenerator
-from .config import settings
+from sqlalchemy import bindparam, delete, insert, inspect, literal, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession
+from typing import AsyncGenerator, Optional
+from .config import get_settings
+from .metrics import instrument_engine
+from .models import AppState, Movie, MovieChangeLog, parse_year_range, utcnow
+from .sql_diagnostics import install_query_diagnostics
 
-# Configuración del motor de base de datos
-engine = create_async_engine(settings.database_url, echo=True)
+SCHEMA_VERSION_KEY = "schema_version"
+
+def _create_engine(url: str) -> AsyncEngine:
+    engine = create_async_engine(url, echo=get_settings().sql_echo)
+    instrument_engine(engine)
+    install_query_diagnostics(engine)
+    return engine
+
+@lru_cache
+def get_engine() -> AsyncEngine:
+    """Motor de base de datos, creado e instrumentado al primer uso."""
+    return _create_engine(get_settings().database_url)
+
+@lru_cache
+def get_read_engine() -> Optional[AsyncEngine]:
+    """Motor de la réplica de lectura (`READ_DATABASE_URL`), o None si no hay réplica."""
+    url = get_settings().read_database_url
+    return _create_engine(url) if url else None
+
+def upsert_insert(dialect_name: str):
+    """
+    `insert()` del dialecto, con `on_conflict_do_nothing` / `on_conflict_do_update`
+    (INSERT ... ON CONFLICT), que tienen igual PostgreSQL y SQLite.
+    """
+    if dialect_name == "postgresql":
+        return postgresql.insert
+    if dialect_name == "sqlite":
+        return sqlite.insert
+    raise ValueError(f"Upserts are not supported for {dialect_name}")
+
+def add_missing_columns(connection) -> None:
+    """
+    create_all no modifica tablas existentes: añade las columnas e índices
+    nuevos de los modelos. Las columnas NOT NULL con un valor por defecto
+    fijo en el modelo se añaden con ese DEFAULT, que rellena las filas
+    existentes; el resto se añaden nullable y sin restricciones.
+    """
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    preparer = connection.dialect.identifier_preparer
+
+    for table in SQLModel.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            definition = column.type.compile(dialect=connection.dialect)
+            if not column.nullable and column.default is not None and column.default.is_scalar:
+                default = literal(column.default.arg, column.type).compile(
+                    dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+                )
+                definition += f" NOT NULL DEFAULT {default}"
+            connection.execute(text(
+                f"ALTER TABLE {preparer.format_table(table)} "
+                f"ADD COLUMN {preparer.format_column(column)} {definition}"
+            ))
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(connection)
+
+def backfill_year_range(connection) -> int:
+    """Rellena `year_start`/`year_end` de las películas guardadas antes de existir estas columnas."""
+    rows = connection.execute(
+        select(Movie.id, Movie.year).where(Movie.year_start.is_(None), Movie.year.is_not(None))
+    ).all()
+    updates = []
+    for movie_id, year in rows:
+        year_start, year_end = parse_year_range(year)
+        if year_start is not None:
+            updates.append({"movie_id": movie_id, "year_start": year_start, "year_end": year_end})
+    if updates:
+        connection.execute(
+            update(Movie.__table__)
+            .where(Movie.__table__.c.id == bindparam("movie_id"))
+            .values(year_start=bindparam("year_start"), year_end=bindparam("year_end")),
+            updates
+        )
+    return len(updates)
+
+def backfill_change_log(connection) -> None:
+    """Alta en el registro de cambios de las películas anteriores a él, para que `since=0` las incluya."""
+    connection.execute(
+        insert(MovieChangeLog).from_select(
+            ["movie_id", "op", "changed_at"],
+            select(Movie.id, literal("create"), literal(utcnow(), MovieChangeLog.__table__.c.changed_at.type))
+            .where(Movie.id.not_in(select(MovieChangeLog.movie_id)))
+            .order_by(Movie.id)
+        )
+    )
+
+def schema_version() -> str:
+    """Huella de las tablas, columnas e índices de los modelos: cambia con cualquier cambio de esquema."""
+    parts = []
+    for table in SQLModel.metadata.sorted_tables:
+        parts.append(table.name)
+        parts.extend(f"{column.name} {column.type} {column.nullable}" for column in table.columns)
+        parts.extend(sorted(index.name for index in table.indexes))
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+def stored_schema_version(connection) -> Optional[str]:
+    if not inspect(connection).has_table(AppState.__tablename__):
+        return None
+    return connection.execute(
+        select(AppState.value).where(AppState.key == SCHEMA_VERSION_KEY)
+    ).scalar_one_or_none()
+
+def store_schema_version(connection, version: str) -> None:
+    connection.execute(delete(AppState).where(AppState.key == SCHEMA_VERSION_KEY))
+    connection.execute(insert(AppState).values(key=SCHEMA_VERSION_KEY, value=version, updated_at=utcnow()))
+
+async def create_db_and_tables(engine: Optional[AsyncEngine] = None) -> bool:
+    """
+    Crea o pone al día el esquema. Si la versión guardada coincide con la de
+    los modelos no hace nada más que esa lectura. Devuelve si lo ha migrado.
+    """
+    engine = engine or get_engine()
+    version = schema_version()
+    async with engine.connect() as conn:
+        if await conn.run_sync(stored_schema_version) == version:
+            return False
 
-async def create_db_and_tables():
     async with engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.run_sync(add_missing_columns)
+        await conn.run_sync(backfill_year_range)
+        await conn.run_sync(backfill_change_log)
+        await conn.run_sync(store_schema_version, version)
+    return True
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
-    async with AsyncSession(engine) as session:
+    async with AsyncSession(get_engine()) as session:
         yield session
\ No newline at end of file
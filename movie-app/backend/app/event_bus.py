@@ -0,0 +1,140 @@
+import asyncio
+import json
+from typing import AsyncIterator, List, Optional, Set
+
+from loguru import logger
+
+from .catalog_events import CatalogChange, add_catalog_listener
+from .config import get_settings
+from .metrics import SSE_DROPPED, SSE_SUBSCRIBERS
+from .models import MovieResponse
+
+# Marca de fin en la cola de un suscriptor (cierre del bus o suscriptor descartado)
+_CLOSED = None
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+class Subscription:
+    """Cola acotada de eventos ya codificados de un suscriptor."""
+
+    def __init__(self, max_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self.dropped = False
+
+    def offer(self, message: bytes) -> bool:
+        """Encola sin esperar; False si la cola está llena (el suscriptor no da abasto)."""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def close(self) -> None:
+        # Con la cola llena se vacía para que quepa la marca de fin
+        while self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(_CLOSED)
+
+
+def encode_event(event_id: int, event: str, data: dict) -> bytes:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode("utf-8")
+
+
+class EventBus:
+    """
+    Pub/sub en proceso para los eventos del catálogo (Server-Sent Events).
+
+    Cada evento se codifica una sola vez y se copia a la cola de cada
+    suscriptor sin esperar. Las colas están acotadas: un suscriptor que no
+    las vacía a tiempo se descarta (se le cierra el stream y debe volver a
+    conectarse) en lugar de acumular memoria o frenar al resto.
+    """
+
+    def __init__(self, max_subscribers: Optional[int] = None, queue_size: Optional[int] = None):
+        # Lo que no se indica se toma de la configuración al primer uso
+        self._max_subscribers = max_subscribers
+        self._queue_size = queue_size
+        self._subscribers: Set[Subscription] = set()
+        self._next_id = 0
+
+    @property
+    def max_subscribers(self) -> int:
+        if self._max_subscribers is None:
+            self._max_subscribers = get_settings().sse_max_subscribers
+        return self._max_subscribers
+
+    @property
+    def queue_size(self) -> int:
+        if self._queue_size is None:
+            self._queue_size = get_settings().sse_queue_size
+        return self._queue_size
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscription:
+        if len(self._subscribers) >= self.max_subscribers:
+            raise TooManySubscribers()
+        subscription = Subscription(self.queue_size)
+        self._subscribers.add(subscription)
+        SSE_SUBSCRIBERS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription in self._subscribers:
+            self._subscribers.discard(subscription)
+            SSE_SUBSCRIBERS.dec()
+
+    def publish(self, event: str, data: dict) -> None:
+        self._next_id += 1
+        message = encode_event(self._next_id, event, data)
+        for subscription in list(self._subscribers):
+            if not subscription.offer(message):
+                subscription.dropped = True
+                self.unsubscribe(subscription)
+                subscription.close()
+                SSE_DROPPED.inc()
+                logger.warning("Dropped a slow event stream subscriber")
+
+    def publish_changes(self, changes: List[CatalogChange]) -> None:
+        """Listener de `catalog_events`: altas, cambios y bajas de películas tras cada commit."""
+        if not self._subscribers:
+            return
+        for change in changes:
+            data = {"movie_id": change.movie_id}
+            if change.op != "delete":
+                data["movie"] = MovieResponse.model_validate(change.data).model_dump(mode="json")
+            self.publish(change.op, data)
+
+    def close(self) -> None:
+        """Cierra todos los streams (al parar la aplicación)."""
+        for subscription in list(self._subscribers):
+            self.unsubscribe(subscription)
+            subscription.close()
+
+    async def stream(self, subscription: Subscription, heartbeat: Optional[float] = None) -> AsyncIterator[bytes]:
+        """Cuerpo de la respuesta SSE; un comentario cada `heartbeat` segundos mantiene viva la conexión."""
+        heartbeat = heartbeat or get_settings().sse_heartbeat_seconds
+        try:
+            # Para que el cliente sepa en seguida que está suscrito
+            yield b": connected\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                if message is _CLOSED:
+                    if subscription.dropped:
+                        yield b"event: overflow\ndata: {}\n\n"
+                    return
+                yield message
+        finally:
+            self.unsubscribe(subscription)
+
+
+event_bus = EventBus()
+add_catalog_listener(event_bus.publish_changes)
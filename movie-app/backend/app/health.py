@@ -0,0 +1,57 @@
+from functools import lru_cache
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import JSONResponse
+
+from .auth import get_current_admin
+from .config import get_settings
+from .database import get_engine, get_read_engine
+from .models import User
+from .runtime import ReadinessCheck, runtime_snapshot
+
+# Fuera de /api: las sondas no pasan por los límites por cliente ni cuentan como tráfico de la API
+router = APIRouter()
+
+
+@lru_cache
+def get_readiness_check() -> ReadinessCheck:
+    settings = get_settings()
+    return ReadinessCheck(ttl=settings.readiness_cache_seconds, timeout=settings.readiness_timeout_seconds)
+
+
+@router.get("/healthz", tags=["health"])
+async def healthz():
+    """
+    Liveness: el proceso responde. No toca la base de datos ni OMDB, así que
+    un fallo de estos no hace que Cloud Run reinicie la instancia.
+    """
+    return {"status": "ok"}
+
+
+@router.get("/readyz", tags=["health"])
+async def readyz():
+    """
+    Readiness: la base de datos responde (`SELECT 1`) en
+    `READINESS_TIMEOUT_SECONDS`. El resultado se reutiliza unos segundos
+    (`READINESS_CACHE_SECONDS`); si falla responde 503. El motivo solo va al
+    log: la sonda no tiene autenticación.
+    """
+    if await get_readiness_check().check(get_engine()):
+        return {"status": "ok", "database": "ok"}
+    return JSONResponse(
+        status_code=503,
+        content={"status": "unavailable", "database": "unavailable"}
+    )
+
+
+@router.get("/debug/runtime", tags=["health"])
+async def debug_runtime(request: Request, admin: User = Depends(get_current_admin)):
+    """
+    Diagnóstico del proceso (solo administradores): uso del pool de
+    conexiones, retraso del event loop, tareas asyncio, llamadas a OMDB en
+    curso, trabajos pendientes, tamaño de las cachés y duración del arranque.
+    """
+    snapshot = runtime_snapshot(get_engine(), get_read_engine())
+    container = getattr(request.app.state, "container", None)
+    snapshot["startup"] = container.report.as_dict() if container is not None else None
+    return snapshot
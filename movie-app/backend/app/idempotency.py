@@ -0,0 +1,129 @@
+import hashlib
+import json
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from loguru import logger
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import get_settings
+from .database import upsert_insert
+from .metrics import record_cache_lookup
+from .models import IdempotencyKey, utcnow
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+# Cabecera que marca una respuesta repetida a partir de la guardada
+REPLAYED_HEADER = "Idempotent-Replayed"
+# Una petición "en curso" más antigua que esto se da por abandonada (el proceso murió)
+ABANDONED_AFTER = timedelta(minutes=1)
+
+
+def request_fingerprint(method: str, path: str, payload: Any) -> str:
+    """Huella de la petición: la misma clave con otra petición es un error del cliente."""
+    canonical = json.dumps([method, path, payload], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def storable(status_code: int) -> bool:
+    """Se guardan las respuestas definitivas; los 5xx y 429 se pueden reintentar con la misma clave."""
+    return status_code < 500 and status_code != status.HTTP_429_TOO_MANY_REQUESTS
+
+
+def replay(record: IdempotencyKey) -> JSONResponse:
+    headers = dict(record.headers or {})
+    headers[REPLAYED_HEADER] = "true"
+    return JSONResponse(status_code=record.status_code, content=record.body, headers=headers)
+
+
+class IdempotentRequest:
+    """
+    Petición con Idempotency-Key. `begin` devuelve la respuesta guardada si
+    la clave ya se usó (una sola consulta, sin volver a llamar a OMDB) o
+    reserva la clave; al acabar, `finish` guarda la respuesta o `release`
+    libera la clave para que se pueda reintentar.
+    """
+
+    def __init__(self, session: AsyncSession, key: str, fingerprint: str):
+        self.session = session
+        self.key = key
+        self.fingerprint = fingerprint
+        self.replay: Optional[JSONResponse] = None
+
+    @classmethod
+    async def begin(cls, session: AsyncSession, key: str, fingerprint: str) -> "IdempotentRequest":
+        request = cls(session, key, fingerprint)
+        now = utcnow()
+        expired_before = now - timedelta(hours=get_settings().idempotency_key_ttl_hours)
+        abandoned_before = now - ABANDONED_AFTER
+
+        result = await session.execute(
+            select(IdempotencyKey, IdempotencyKey.created_at <= abandoned_before)
+            .where(IdempotencyKey.key == key, IdempotencyKey.created_at > expired_before)
+        )
+        row = result.first()
+        if row is not None:
+            record, abandoned = row
+            if record.fingerprint != fingerprint:
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"{IDEMPOTENCY_HEADER} was already used for a different request"
+                )
+            if record.status_code is not None:
+                record_cache_lookup("idempotency", hit=True)
+                request.replay = replay(record)
+                return request
+            if not abandoned:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"A request with this {IDEMPOTENCY_HEADER} is still in progress",
+                    headers={"Retry-After": "1"}
+                )
+            logger.warning(f"Reclaiming abandoned idempotency key {key}")
+
+        record_cache_lookup("idempotency", hit=False)
+        # Se aprovecha para borrar las claves caducadas y, si la hay, la abandonada
+        await session.execute(delete(IdempotencyKey).where(or_(
+            IdempotencyKey.created_at <= expired_before,
+            and_(
+                IdempotencyKey.key == key,
+                IdempotencyKey.status_code.is_(None),
+                IdempotencyKey.created_at <= abandoned_before
+            )
+        )))
+        insert = upsert_insert(session.get_bind().dialect.name)
+        claimed = await session.scalar(
+            insert(IdempotencyKey)
+            .values(key=key, fingerprint=fingerprint, created_at=now)
+            .on_conflict_do_nothing(index_elements=[IdempotencyKey.key])
+            .returning(IdempotencyKey.key)
+        )
+        await session.commit()
+        if claimed is None:
+            # Otra petición con la misma clave la reservó entre la consulta y el insert
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"A request with this {IDEMPOTENCY_HEADER} is still in progress",
+                headers={"Retry-After": "1"}
+            )
+        return request
+
+    async def finish(self, status_code: int, body: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        """Guarda la respuesta para repetirla; si no es definitiva, libera la clave."""
+        if not storable(status_code):
+            await self.release()
+            return
+        record = await self.session.get(IdempotencyKey, self.key)
+        if record is None:
+            return
+        record.status_code, record.body, record.headers = status_code, body, headers or None
+        await self.session.commit()
+
+    async def release(self) -> None:
+        await self.session.rollback()
+        await self.session.execute(delete(IdempotencyKey).where(
+            IdempotencyKey.key == self.key, IdempotencyKey.status_code.is_(None)
+        ))
+        await self.session.commit()
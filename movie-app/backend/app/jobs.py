@@ -0,0 +1,316 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Protocol
+
+from loguru import logger
+from sqlalchemy import delete, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from .config import get_settings
+from .database import get_engine
+from .models import Job, utcnow
+
+SessionFactory = Callable[[], AsyncSession]
+# handler(payload, session, **context) -> resultado serializable en JSON
+JobHandler = Callable[..., Awaitable[Any]]
+
+
+class JobFailed(Exception):
+    """Fallo esperado de un trabajo: se guarda tal cual como error del trabajo."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class JobQueueFull(Exception):
+    """La cola de trabajos está llena."""
+
+
+class JobStore(Protocol):
+    """Dónde se guarda el estado de los trabajos."""
+
+    async def create(self, job: Job) -> None: ...
+
+    async def get(self, job_id: str) -> Optional[Job]: ...
+
+    async def claim(self, job_id: str, stale_before: datetime) -> Optional[Job]:
+        """Pasa el trabajo a running si está pendiente o abandonado; None si otro worker se adelantó."""
+
+    async def finish(self, job_id: str, status: str, result: Any = None, error: Optional[dict] = None) -> None: ...
+
+    async def recoverable(self, stale_before: datetime) -> List[str]:
+        """Trabajos pendientes o abandonados (running desde antes de `stale_before`), que se vuelven a encolar."""
+
+    async def prune(self, finished_before: datetime) -> int: ...
+
+
+class InMemoryJobStore:
+    """Almacén en memoria: rápido, pero los trabajos se pierden al reiniciar y no se ven desde otros workers."""
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+
+    async def create(self, job: Job) -> None:
+        self._jobs[job.id] = job.model_copy()
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        return job.model_copy() if job else None
+
+    async def claim(self, job_id: str, stale_before: datetime) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is None or not (
+            job.status == "queued" or (job.status == "running" and job.updated_at < stale_before)
+        ):
+            return None
+        job.status, job.updated_at = "running", utcnow()
+        return job.model_copy()
+
+    async def finish(self, job_id: str, status: str, result: Any = None, error: Optional[dict] = None) -> None:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.status, job.result, job.error, job.updated_at = status, result, error, utcnow()
+
+    async def recoverable(self, stale_before: datetime) -> List[str]:
+        return [
+            job.id for job in self._jobs.values()
+            if job.status == "queued" or (job.status == "running" and job.updated_at < stale_before)
+        ]
+
+    async def prune(self, finished_before: datetime) -> int:
+        expired = [
+            job.id for job in self._jobs.values()
+            if job.status in ("succeeded", "failed") and job.updated_at < finished_before
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        return len(expired)
+
+
+def _claimable(stale_before: datetime):
+    return or_(
+        Job.status == "queued",
+        (Job.status == "running") & (Job.updated_at < stale_before)
+    )
+
+
+class DatabaseJobStore:
+    """Almacén en la tabla `job`: sobrevive a reinicios y lo comparten todos los workers."""
+
+    def __init__(self, session_factory: SessionFactory):
+        self._session_factory = session_factory
+
+    def _session(self) -> AsyncSession:
+        return self._session_factory()
+
+    async def create(self, job: Job) -> None:
+        async with self._session() as session:
+            session.add(job.model_copy())
+            await session.commit()
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        async with self._session() as session:
+            return await session.get(Job, job_id)
+
+    async def claim(self, job_id: str, stale_before: datetime) -> Optional[Job]:
+        async with self._session() as session:
+            # UPDATE condicional: solo un worker consigue el trabajo
+            result = await session.execute(
+                update(Job)
+                .where(Job.id == job_id, _claimable(stale_before))
+                .values(status="running", updated_at=utcnow())
+            )
+            await session.commit()
+            if result.rowcount != 1:
+                return None
+            return await session.get(Job, job_id)
+
+    async def finish(self, job_id: str, status: str, result: Any = None, error: Optional[dict] = None) -> None:
+        async with self._session() as session:
+            await session.execute(
+                update(Job)
+                .where(Job.id == job_id)
+                .values(status=status, result=result, error=error, updated_at=utcnow())
+            )
+            await session.commit()
+
+    async def recoverable(self, stale_before: datetime) -> List[str]:
+        async with self._session() as session:
+            result = await session.execute(
+                select(Job.id).where(_claimable(stale_before)).order_by(Job.created_at)
+            )
+            return list(result.scalars().all())
+
+    async def prune(self, finished_before: datetime) -> int:
+        async with self._session() as session:
+            result = await session.execute(
+                delete(Job).where(
+                    Job.status.in_(("succeeded", "failed")),
+                    Job.updated_at < finished_before
+                )
+            )
+            await session.commit()
+            return result.rowcount
+
+
+class JobQueue:
+    """
+    Cola de trabajos en proceso con un número fijo de workers asyncio.
+
+    La cola está acotada: si se llena, `submit` falla con `JobQueueFull` en
+    lugar de acumular trabajo. El estado se guarda en un `JobStore`
+    intercambiable; con el de base de datos, los trabajos pendientes o
+    abandonados se vuelven a encolar al arrancar.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_size: Optional[int] = None, store: Optional[JobStore] = None):
+        # Lo que no se indica se toma de la configuración al arrancar, no al importar
+        self._workers = workers
+        self._max_size = max_size
+        self._store = store
+        self.session_factory: SessionFactory = lambda: AsyncSession(get_engine())
+        self._handlers: Dict[str, JobHandler] = {}
+        # Contexto en memoria de cada trabajo (p.ej. el cliente de OMDB de la petición)
+        self._contexts: Dict[str, dict] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        # Huecos de la cola apartados por `submit` mientras guarda el trabajo
+        self._reserved = 0
+        self._last_prune = utcnow()
+
+    @property
+    def workers(self) -> int:
+        return self._workers if self._workers is not None else get_settings().job_workers
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size if self._max_size is not None else get_settings().job_queue_size
+
+    @property
+    def store(self) -> JobStore:
+        if self._store is None:
+            self._store = self._default_store()
+        return self._store
+
+    @store.setter
+    def store(self, store: JobStore) -> None:
+        self._store = store
+
+    def _default_store(self) -> JobStore:
+        backend = get_settings().job_backend
+        if backend == "database":
+            # Se resuelve en cada uso para que se pueda cambiar la fábrica de sesiones (tests)
+            return DatabaseJobStore(lambda: self.session_factory())
+        if backend == "memory":
+            return InMemoryJobStore()
+        raise ValueError(f"Unknown job backend: {backend}")
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self._handlers[kind] = handler
+
+    @property
+    def pending(self) -> int:
+        """Trabajos encolados que ningún worker ha cogido aún."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def _ensure_started(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def start(self) -> None:
+        """Arranca los workers y vuelve a encolar los trabajos que quedaron a medias."""
+        self._ensure_started()
+        settings = get_settings()
+        now = utcnow()
+        await self.store.prune(now - timedelta(seconds=settings.job_retention_seconds))
+        recovered = await self.store.recoverable(now - timedelta(seconds=settings.job_stale_after_seconds))
+        for job_id in recovered[:self.max_size]:
+            self._queue.put_nowait(job_id)
+        if recovered:
+            logger.info(f"Re-queued {min(len(recovered), self.max_size)} pending jobs")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._contexts.clear()
+
+    async def join(self) -> None:
+        """Espera a que se procesen todos los trabajos encolados."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def submit(self, kind: str, payload: dict, **context) -> Job:
+        """Guarda y encola un trabajo; el contexto solo vive en memoria y no se persiste."""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        self._ensure_started()
+        # El hueco se aparta antes de guardar el trabajo: mientras se guarda, otras
+        # peticiones podrían llenar la cola y el trabajo quedaría guardado sin encolar
+        queue = self._queue
+        if queue.maxsize > 0 and queue.qsize() + self._reserved >= queue.maxsize:
+            raise JobQueueFull()
+        self._reserved += 1
+        try:
+            job = Job(id=uuid.uuid4().hex, kind=kind, payload=payload)
+            await self.store.create(job)
+            if context:
+                self._contexts[job.id] = context
+            queue.put_nowait(job.id)
+        finally:
+            self._reserved -= 1
+        await self._maybe_prune()
+        return job
+
+    async def _maybe_prune(self) -> None:
+        now = utcnow()
+        if now - self._last_prune > timedelta(minutes=1):
+            self._last_prune = now
+            await self.store.prune(now - timedelta(seconds=get_settings().job_retention_seconds))
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception:
+                logger.exception(f"Job {job_id} could not be processed")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        context = self._contexts.pop(job_id, {})
+        stale_before = utcnow() - timedelta(seconds=get_settings().job_stale_after_seconds)
+        job = await self.store.claim(job_id, stale_before)
+        if job is None:
+            return
+
+        handler = self._handlers[job.kind]
+        try:
+            async with self.session_factory() as session:
+                result = await handler(job.payload, session, **context)
+        except JobFailed as e:
+            await self.store.finish(job_id, "failed", error={"status_code": e.status_code, "detail": e.detail})
+        except Exception:
+            logger.exception(f"Job {job_id} ({job.kind}) failed")
+            await self.store.finish(job_id, "failed", error={"status_code": 500, "detail": "Internal error"})
+        else:
+            await self.store.finish(job_id, "succeeded", result=result)
+
+
+job_queue = JobQueue()
@@ -1,12 +1,22 @@
+import time
+
+_imports_started = time.perf_counter()
+
+import sys
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .api import router
-from .database import create_db_and_tables, engine
-from sqlalchemy.ext.asyncio import AsyncSession
-from .services.omdb_service import get_omdb_service, omdb_service
-from .api import router, tags_metadata
 from loguru import logger
-import sys
+from .api import router, tags_metadata
+from .container import AppContainer, StartupReport
+from .health import router as health_router
+from .metrics import MetricsMiddleware, metrics_endpoint
+from .rate_limit import RateLimitMiddleware
+from .sql_diagnostics import QueryDiagnosticsMiddleware
+from .timing import ServerTimingMiddleware
+
+startup_report = StartupReport()
+startup_report.add("imports", time.perf_counter() - _imports_started)
 
 # Configurar el logger
 logger.remove()  # Remover el handler por defecto
@@ -25,11 +35,25 @@ logger.add(
     level="DEBUG"
 )
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    container = AppContainer(startup_report)
+    app.state.container = container
+    await container.startup()
+    try:
+        yield
+    finally:
+        await container.shutdown()
+
 app = FastAPI(
     title="Movie API",
-    openapi_tags=tags_metadata
+    openapi_tags=tags_metadata,
+    lifespan=lifespan
 )
 
+# Límites por cliente y por carga: dentro de CORS para que los 429/503 lleven sus cabeceras
+app.add_middleware(RateLimitMiddleware)
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -38,15 +62,12 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# El orden importa: el último añadido es el más externo
+app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(QueryDiagnosticsMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 # Incluir rutas
 app.include_router(router, prefix="/api/v1")
-
-@app.on_event("startup")
-async def on_startup():
-    # Crear tablas
-    await create_db_and_tables()
-    
-    # Cargar películas iniciales
-    async with AsyncSession(engine) as session:
-        await omdb_service.fetch_initial_movies(session)
\ No newline at end of file
+app.include_router(health_router)
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
@@ -0,0 +1,253 @@
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route, compile_path
+
+# Buckets pensados para una API: de 1 ms a 10 s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Latencia de las peticiones HTTP por ruta",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Peticiones HTTP en curso por ruta",
+    ["method", "route"],
+    multiprocess_mode="livesum"
+)
+DB_QUERIES = Counter(
+    "db_queries_total",
+    "Sentencias SQL ejecutadas por tipo",
+    ["operation"]
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Duración de las sentencias SQL por tipo",
+    ["operation"],
+    buckets=LATENCY_BUCKETS
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Tiempo de espera para obtener una conexión del pool",
+    buckets=LATENCY_BUCKETS
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_connections_checked_out",
+    "Conexiones del pool actualmente en uso",
+    multiprocess_mode="livesum"
+)
+OMDB_REQUEST_DURATION = Histogram(
+    "omdb_request_duration_seconds",
+    "Latencia de las llamadas a OMDB por endpoint",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS
+)
+OMDB_REQUESTS = Counter(
+    "omdb_requests_total",
+    "Llamadas a OMDB por endpoint y resultado",
+    ["endpoint", "outcome"]
+)
+OMDB_KEY_QUOTA_REMAINING = Gauge(
+    "omdb_key_quota_remaining",
+    "Llamadas que le quedan hoy a cada API key de OMDB según este proceso (0 si OMDB la rechazó por cuota)",
+    ["key"],
+    multiprocess_mode="liveall"
+)
+MOVIE_REFRESHES = Counter(
+    "movie_refreshes_total",
+    "Películas contrastadas con OMDB por el refresco en segundo plano, por resultado",
+    ["outcome"]
+)
+DB_READ_ROUTING = Counter(
+    "db_read_routing_total",
+    "Sesiones de lectura por destino (replica/primary) y motivo",
+    ["target", "reason"]
+)
+HTTP_REQUESTS_REJECTED = Counter(
+    "http_requests_rejected_total",
+    "Peticiones rechazadas por límite de cliente (rate_limited) o por sobrecarga (overloaded)",
+    ["category", "reason"]
+)
+SSE_SUBSCRIBERS = Gauge(
+    "sse_subscribers",
+    "Clientes conectados al stream de eventos del catálogo",
+    multiprocess_mode="livesum"
+)
+SSE_DROPPED = Counter(
+    "sse_subscribers_dropped_total",
+    "Clientes del stream de eventos descartados por no consumir a tiempo"
+)
+STARTUP_DURATION = Gauge(
+    "app_startup_duration_seconds",
+    "Duración de cada paso del arranque (importaciones, esquema, carga inicial...)",
+    ["step"],
+    multiprocess_mode="liveall"
+)
+EVENT_LOOP_LAG = Gauge(
+    "event_loop_lag_seconds",
+    "Retraso del event loop en la última muestra",
+    multiprocess_mode="liveall"
+)
+MOVIE_VIEWS_PENDING = Gauge(
+    "movie_views_pending",
+    "Visitas contadas en memoria pendientes de volcar a la base de datos",
+    multiprocess_mode="livesum"
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Consultas a cachés en memoria por resultado (hit/miss)",
+    ["cache", "result"]
+)
+CACHE_HIT_RATIO = Gauge(
+    "cache_hit_ratio",
+    "Proporción de aciertos acumulada de cada caché",
+    ["cache"],
+    multiprocess_mode="liveall"
+)
+
+_cache_counts: dict = {}
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """Registra un acierto o fallo de una caché y actualiza su ratio."""
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+    hits, total = _cache_counts.get(cache, (0, 0))
+    hits, total = hits + int(hit), total + 1
+    _cache_counts[cache] = (hits, total)
+    CACHE_HIT_RATIO.labels(cache=cache).set(hits / total)
+
+
+def _statement_operation(statement: str) -> str:
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return keyword if keyword in ("SELECT", "INSERT", "UPDATE", "DELETE") else "OTHER"
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Pool asíncrono que mide cuánto se espera en cada checkout."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Registra los eventos de SQLAlchemy que alimentan las métricas de base de datos."""
+    sync_engine = engine.sync_engine
+
+    # Cambiar la clase conserva la configuración del pool y sobrevive a `recreate()`
+    if type(sync_engine.pool) is AsyncAdaptedQueuePool:
+        sync_engine.pool.__class__ = InstrumentedAsyncQueuePool
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("metrics_query_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        operation = _statement_operation(statement)
+        DB_QUERIES.labels(operation=operation).inc()
+        DB_QUERY_DURATION.labels(operation=operation).observe(elapsed)
+
+    @event.listens_for(sync_engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(sync_engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.dec()
+
+
+def _route_table(app) -> list:
+    """Plantillas de ruta compiladas, con las estáticas antes que las parametrizadas."""
+    table = getattr(app.state, "metrics_route_table", None)
+    if table is None:
+        paths = set(app.openapi().get("paths", {}))
+        paths.update(route.path for route in app.routes if isinstance(route, Route))
+        ordered = sorted(paths, key=lambda path: (path.count("{"), -len(path)))
+        table = [(compile_path(path)[0], path) for path in ordered]
+        app.state.metrics_route_table = table
+    return table
+
+
+def _route_template(scope) -> str:
+    """Plantilla de la ruta (p.ej. /api/v1/movies/{movie_id}) para acotar la cardinalidad."""
+    app = scope.get("app")
+    if app is None:
+        return "unmatched"
+    path = scope["path"]
+    for regex, template in _route_table(app):
+        if regex.match(path):
+            return template
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mide latencia y peticiones en curso por ruta."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = _route_template(scope)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method=method, route=route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            HTTP_REQUEST_DURATION.labels(
+                method=method, route=route, status=str(status_code)
+            ).observe(time.perf_counter() - start)
+
+
+def _registry() -> CollectorRegistry:
+    # Con varios workers de uvicorn se agregan los ficheros de PROMETHEUS_MULTIPROC_DIR
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Expone las métricas en formato de texto de Prometheus."""
+    return Response(generate_latest(_registry()), media_type=CONTENT_TYPE_LATEST)
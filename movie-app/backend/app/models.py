@@ -1,16 +1,92 @@
+import re
+from datetime import datetime, timezone
 from sqlmodel import SQLModel, Field
-from typing import Optional, List, Generic, TypeVar
+from sqlalchemy import JSON, Column, Index, event, inspect
+from typing import Any, Optional, List, Generic, TypeVar, Tuple
 from pydantic import BaseModel
 
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+_YEAR = re.compile(r"\d{4}")
+
+def parse_year_range(year: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Convierte el año de OMDB en un rango numérico:
+    "1999" -> (1999, 1999), "2003–2005" -> (2003, 2005), "2019–" -> (2019, None).
+    """
+    years = [int(value) for value in _YEAR.findall(year or "")]
+    if not years:
+        return None, None
+    if len(years) > 1:
+        return years[0], years[1]
+    # Una serie en emisión ("2019–") no tiene año de fin
+    if year.strip().endswith(("–", "-")):
+        return years[0], None
+    return years[0], years[0]
+
 class MovieBase(SQLModel):
     title: str
     year: str
     imdb_id: str = Field(unique=True)
     plot: Optional[str] = None
     poster: Optional[str] = None
+    # Metadatos de OMDB normalizados para poder filtrar y ordenar sin volver a consultarlo
+    genre: Optional[str] = None
+    director: Optional[str] = None
+    runtime: Optional[int] = Field(default=None, index=True)
+    imdb_rating: Optional[float] = Field(default=None, index=True)
+    type: Optional[str] = None
+    # Derivados de `year` para filtrar y ordenar por año con índice
+    year_start: Optional[int] = Field(default=None, index=True)
+    year_end: Optional[int] = Field(default=None, index=True)
+    # Resto del registro de OMDB (actores, premios, ratings...)
+    extra: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+    # Último cambio de la fila y última vez que se contrastó con OMDB (None: nunca)
+    updated_at: Optional[datetime] = Field(default_factory=utcnow, index=True)
+    source_fetched_at: Optional[datetime] = Field(default=None, index=True)
 
 class Movie(MovieBase, table=True):
+    __table_args__ = (
+        Index("ix_movie_type_imdb_rating", "type", "imdb_rating"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+
+@event.listens_for(Movie, "before_insert")
+@event.listens_for(Movie, "before_update")
+def _derive_year_range(mapper, connection, target: Movie) -> None:
+    target.year_start, target.year_end = parse_year_range(target.year)
+
+@event.listens_for(Movie, "before_update")
+def _touch_updated_at(mapper, connection, target: Movie) -> None:
+    # before_update también se llama para objetos sin cambios netos en sus columnas
+    state = inspect(target)
+    if any(state.attrs[column.key].history.has_changes() for column in mapper.column_attrs):
+        target.updated_at = utcnow()
+
+class MovieChangeLog(SQLModel, table=True):
+    """
+    Registro de cambios del catálogo para la sincronización incremental. El id
+    es el token de `GET /movies/changes`; se guarda solo el último cambio de
+    cada película y las bajas (tombstones) se borran pasado un tiempo.
+    """
     id: Optional[int] = Field(default=None, primary_key=True)
+    # Sin clave foránea: las bajas apuntan a películas que ya no existen
+    movie_id: int = Field(index=True)
+    op: str  # create, update, delete
+    changed_at: datetime = Field(default_factory=utcnow, index=True)
+
+class MovieViews(SQLModel, table=True):
+    """Visitas acumuladas de cada película; se suman por lotes desde los contadores en memoria."""
+    movie_id: int = Field(foreign_key="movie.id", primary_key=True, ondelete="CASCADE")
+    views: int = Field(default=0, index=True)
+    updated_at: datetime = Field(default_factory=utcnow)
+
+class MovieGenre(SQLModel, table=True):
+    """Un género por fila, para filtrar por género con índice ("Action, Sci-Fi" -> action, sci-fi)."""
+    genre: str = Field(primary_key=True)
+    movie_id: int = Field(foreign_key="movie.id", primary_key=True, index=True, ondelete="CASCADE")
 
 class MovieCreate(SQLModel):
     """Modelo para crear una nueva película solo con el título."""
@@ -19,19 +95,82 @@ class MovieCreate(SQLModel):
 class MovieResponse(MovieBase):
     id: int
 
+class ScoredMovie(MovieResponse):
+    """Película con su puntuación de similitud (coseno, de 0 a 1)."""
+    score: float
+
+class PopularMovie(MovieResponse):
+    """Película con sus visitas acumuladas."""
+    views: int
+
+class MovieChange(SQLModel):
+    """Un cambio del catálogo; `movie` es la versión actual (None en las bajas)."""
+    token: int
+    op: str
+    movie_id: int
+    movie: Optional[MovieResponse] = None
+
+class ChangeFeed(BaseModel):
+    changes: List[MovieChange]
+    # Token para la siguiente llamada (`since`)
+    next_since: int
+    has_more: bool
+
+class MovieSuggestion(SQLModel):
+    """Sugerencia de autocompletado: solo lo necesario para mostrarla."""
+    id: int
+    title: str
+
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     username: str = Field(unique=True, index=True)
     hashed_password: str
     is_active: bool = True
+    # Acceso a los endpoints de diagnóstico (/debug/...)
+    is_admin: bool = False
 
 class UserCreate(SQLModel):
     username: str
     password: str
 
+class JobBase(SQLModel):
+    kind: str
+    status: str = Field(default="queued", index=True)  # queued, running, succeeded, failed
+    result: Optional[Any] = Field(default=None, sa_column=Column(JSON))
+    error: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+    created_at: datetime = Field(default_factory=utcnow)
+    updated_at: datetime = Field(default_factory=utcnow, index=True)
+
+class Job(JobBase, table=True):
+    """Trabajo en segundo plano (p.ej. crear una película consultando OMDB)."""
+    id: str = Field(primary_key=True)
+    payload: dict = Field(default_factory=dict, sa_column=Column(JSON))
+
+class JobResponse(JobBase):
+    id: str
+
+class AppState(SQLModel, table=True):
+    """Estado compartido entre procesos, p.ej. si ya se hizo la carga inicial de películas."""
+    key: str = Field(primary_key=True)
+    value: Optional[Any] = Field(default=None, sa_column=Column(JSON))
+    updated_at: datetime = Field(default_factory=utcnow)
+
+class IdempotencyKey(SQLModel, table=True):
+    """Respuesta guardada de una petición con cabecera Idempotency-Key; sin `status_code` aún está en curso."""
+    key: str = Field(primary_key=True)
+    fingerprint: str
+    status_code: Optional[int] = None
+    body: Optional[Any] = Field(default=None, sa_column=Column(JSON))
+    headers: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+    created_at: datetime = Field(default_factory=utcnow, index=True)
+
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 T = TypeVar("T")
 
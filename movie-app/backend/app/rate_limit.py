@@ -0,0 +1,212 @@
+import json
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from starlette.requests import HTTPConnection
+
+from .auth import token_subject
+from .clients import client_key
+from .config import get_settings
+from .metrics import HTTP_REQUESTS_REJECTED
+
+# Clientes con bucket en memoria como mucho (se descartan los menos recientes)
+MAX_TRACKED_CLIENTS = 10000
+# Segundos que se piden al cliente cuando se rechaza por sobrecarga
+OVERLOAD_RETRY_AFTER = 1
+# Tope de Retry-After: con un límite de 0 por minuto el bucket no se recarga nunca (espera infinita)
+MAX_RETRY_AFTER = 3600
+
+READ, WRITE, AUTH = "read", "write", "auth"
+_AUTH_PATHS = ("/token", "/token/refresh", "/users/")
+# Streams de larga duración: se limitan las conexiones nuevas pero no ocupan hueco de concurrencia
+# (el bus de eventos tiene su propio máximo de suscriptores)
+_STREAM_PATHS = ("/movies/events",)
+
+
+@dataclass(frozen=True)
+class Limits:
+    per_minute: float
+    burst: int
+    max_concurrent: int
+
+    @property
+    def rate(self) -> float:
+        """Tokens por segundo."""
+        return self.per_minute / 60
+
+
+class TokenBucket:
+    """Bucket lleno al empezar; se rellena a `rate` tokens por segundo hasta `capacity`."""
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, capacity: float, now: float):
+        self.tokens = capacity
+        self.updated = now
+
+    def take(self, rate: float, capacity: float, now: float) -> float:
+        """Gasta un token; devuelve 0 si lo había o los segundos que faltan para el siguiente."""
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate if rate > 0 else math.inf
+
+
+def route_category(method: str, path: str) -> Optional[str]:
+    """Tipo de límite de una petición a la API; None si no se limita (métricas, docs...)."""
+    if not path.startswith("/api/"):
+        return None
+    if method == "POST" and path.endswith(_AUTH_PATHS):
+        return AUTH
+    if method in ("GET", "HEAD", "OPTIONS"):
+        return READ
+    return WRITE
+
+
+def request_client(connection: HTTPConnection) -> str:
+    """El usuario del JWT si trae uno válido; si no, la IP."""
+    authorization = connection.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        subject = token_subject(token)
+        if subject:
+            return f"user:{subject}"
+    return f"ip:{client_key(connection)}"
+
+
+class RateLimiter:
+    """
+    Token bucket por cliente y tipo de ruta, más un máximo de peticiones en
+    curso por tipo. El estado es de cada proceso: con varios workers, cada
+    uno aplica los límites por separado.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Limits]] = None, enabled: Optional[bool] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        # Lo que no se indica se toma de la configuración al primer uso
+        self._limits = limits
+        self._enabled = enabled
+        self.clock = clock
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self._in_flight: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        if self._enabled is None:
+            self._enabled = get_settings().rate_limit_enabled
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled: bool) -> None:
+        self._enabled = enabled
+
+    @property
+    def limits(self) -> Dict[str, Limits]:
+        if self._limits is None:
+            settings = get_settings()
+            self._limits = {
+                READ: Limits(settings.rate_limit_read_per_minute, settings.rate_limit_read_burst,
+                             settings.max_concurrent_reads),
+                WRITE: Limits(settings.rate_limit_write_per_minute, settings.rate_limit_write_burst,
+                              settings.max_concurrent_writes),
+                AUTH: Limits(settings.rate_limit_auth_per_minute, settings.rate_limit_auth_burst,
+                             settings.max_concurrent_auth),
+            }
+        return self._limits
+
+    @property
+    def tracked_clients(self) -> int:
+        return len(self._buckets)
+
+    def reset(self) -> None:
+        self._buckets.clear()
+        self._in_flight.clear()
+
+    def check(self, category: str, client: str) -> float:
+        """0 si el cliente puede hacer la petición; si no, los segundos que debe esperar."""
+        limits = self.limits[category]
+        now = self.clock()
+        key = (category, client)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(limits.burst, now)
+            if len(self._buckets) > MAX_TRACKED_CLIENTS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.take(limits.rate, limits.burst, now)
+
+    def acquire(self, category: str) -> bool:
+        """Reserva un hueco de concurrencia; False si ya hay `max_concurrent` peticiones en curso."""
+        in_flight = self._in_flight.get(category, 0)
+        if in_flight >= self.limits[category].max_concurrent:
+            return False
+        self._in_flight[category] = in_flight + 1
+        return True
+
+    def release(self, category: str) -> None:
+        self._in_flight[category] -= 1
+
+    def in_flight(self, category: str) -> int:
+        return self._in_flight.get(category, 0)
+
+
+async def _reject(send, status: int, detail: str, retry_after: int) -> None:
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+            (b"retry-after", str(retry_after).encode("ascii")),
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    """
+    Middleware ASGI que aplica `RateLimiter` antes de llegar a las rutas:
+    429 si el cliente agota su bucket y 503 si hay demasiadas peticiones en
+    curso de ese tipo, ambos con Retry-After. Así se corta antes de que se
+    llenen el pool de la base de datos o se gaste la cuota de OMDB.
+    """
+
+    def __init__(self, app, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.limiter = limiter or rate_limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.limiter.enabled:
+            await self.app(scope, receive, send)
+            return
+        category = route_category(scope["method"], scope["path"])
+        if category is None:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = self.limiter.check(category, request_client(HTTPConnection(scope)))
+        if retry_after:
+            HTTP_REQUESTS_REJECTED.labels(category=category, reason="rate_limited").inc()
+            await _reject(send, 429, "Too many requests", max(1, math.ceil(min(retry_after, MAX_RETRY_AFTER))))
+            return
+        if scope["path"].endswith(_STREAM_PATHS):
+            await self.app(scope, receive, send)
+            return
+        if not self.limiter.acquire(category):
+            HTTP_REQUESTS_REJECTED.labels(category=category, reason="overloaded").inc()
+            await _reject(send, 503, "Server is overloaded, retry later", OVERLOAD_RETRY_AFTER)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release(category)
+
+
+rate_limiter = RateLimiter()
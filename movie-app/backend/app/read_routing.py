@@ -0,0 +1,162 @@
+import asyncio
+import math
+import time
+from functools import lru_cache
+from typing import AsyncGenerator, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from .clients import client_key
+from .config import get_settings
+from .database import get_engine, get_read_engine
+from .metrics import DB_READ_ROUTING
+
+# Cookie con el instante (epoch) hasta el que el cliente lee del primario;
+# a diferencia del registro en memoria, la ven todos los workers e instancias
+PIN_COOKIE = "read_primary_until"
+# Clientes recordados en memoria como mucho; se descartan primero los caducados
+MAX_PINNED_CLIENTS = 10000
+
+# Segundos de retraso de una réplica de PostgreSQL: 0 si ya aplicó todo lo recibido
+_POSTGRES_LAG = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+def replica_lag(connection) -> float:
+    """Retraso de la réplica en segundos. En SQLite (una copia en local) solo comprueba la conexión."""
+    if connection.dialect.name == "postgresql":
+        return float(connection.execute(_POSTGRES_LAG).scalar() or 0.0)
+    connection.execute(text("SELECT 1"))
+    return 0.0
+
+
+class ReadRouter:
+    """
+    Decide si una lectura va a la réplica o al primario.
+
+    Va al primario si no hay réplica, si el cliente escribió hace menos de
+    `pin_seconds` (read-your-writes) o si la réplica va más de `max_lag`
+    segundos por detrás o no responde. El retraso se consulta como mucho una
+    vez cada `check_interval` segundos y el resultado se reutiliza.
+    """
+
+    def __init__(self, replica: Optional[AsyncEngine], max_lag: float, check_interval: float, pin_seconds: float):
+        self.replica = replica
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.pin_seconds = pin_seconds
+        self._pins: Dict[str, float] = {}
+        self._replica_ok = True
+        self._checked_at = -math.inf
+        self._check_lock = asyncio.Lock()
+
+    # Read-your-writes
+
+    def pin(self, key: str) -> float:
+        """Manda al primario las lecturas de `key` durante `pin_seconds`; devuelve hasta cuándo (epoch)."""
+        now = time.time()
+        until = now + self.pin_seconds
+        self._pins[key] = until
+        if len(self._pins) > MAX_PINNED_CLIENTS:
+            self._prune(now)
+        return until
+
+    def is_pinned(self, key: str) -> bool:
+        until = self._pins.get(key)
+        if until is None:
+            return False
+        if until <= time.time():
+            del self._pins[key]
+            return False
+        return True
+
+    @property
+    def pinned_clients(self) -> int:
+        return len(self._pins)
+
+    def _prune(self, now: float) -> None:
+        self._pins = {key: until for key, until in self._pins.items() if until > now}
+        excess = len(self._pins) - MAX_PINNED_CLIENTS
+        if excess > 0:
+            for key in sorted(self._pins, key=self._pins.get)[:excess]:
+                del self._pins[key]
+
+    # Estado de la réplica
+
+    async def replica_healthy(self) -> bool:
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return self._replica_ok
+        async with self._check_lock:
+            # Otra petición pudo comprobarlo mientras esperábamos
+            if time.monotonic() - self._checked_at < self.check_interval:
+                return self._replica_ok
+            try:
+                async with self.replica.connect() as connection:
+                    lag = await connection.run_sync(replica_lag)
+                healthy = lag <= self.max_lag
+                if not healthy and self._replica_ok:
+                    logger.warning(f"Read replica is {lag:.1f}s behind, reading from the primary")
+            except Exception as e:
+                healthy = False
+                if self._replica_ok:
+                    logger.warning(f"Read replica unavailable, reading from the primary: {e}")
+            if healthy and not self._replica_ok:
+                logger.info("Read replica caught up, reading from it again")
+            self._replica_ok, self._checked_at = healthy, time.monotonic()
+            return healthy
+
+    async def route(self, request: Request) -> Tuple[Optional[AsyncEngine], str]:
+        """Motor de la réplica, o None para leer del primario, y el motivo."""
+        if self.replica is None:
+            return None, "no_replica"
+        if _cookie_pinned(request) or self.is_pinned(client_key(request)):
+            return None, "pinned"
+        if not await self.replica_healthy():
+            return None, "lagging"
+        return self.replica, "replica"
+
+
+def _cookie_pinned(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+@lru_cache
+def get_read_router() -> ReadRouter:
+    settings = get_settings()
+    return ReadRouter(
+        replica=get_read_engine(),
+        max_lag=settings.replica_max_lag_seconds,
+        check_interval=settings.replica_lag_check_seconds,
+        pin_seconds=settings.read_your_writes_seconds
+    )
+
+
+def pin_reads_to_primary(request: Request, response: Response) -> None:
+    """Tras una escritura, el cliente lee del primario durante un rato para ver su propio cambio."""
+    router = get_read_router()
+    if router.replica is None:
+        return
+    until = router.pin(client_key(request))
+    response.set_cookie(
+        PIN_COOKIE, f"{until:.3f}",
+        max_age=math.ceil(router.pin_seconds), httponly=True, samesite="lax"
+    )
+
+
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Sesión para rutas de solo lectura: usa la réplica cuando es seguro hacerlo."""
+    replica, reason = await get_read_router().route(request)
+    DB_READ_ROUTING.labels(target="replica" if replica else "primary", reason=reason).inc()
+    async with AsyncSession(replica or get_engine()) as session:
+        yield session
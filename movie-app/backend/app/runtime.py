@@ -0,0 +1,153 @@
+import asyncio
+import time
+from collections import Counter, deque
+from typing import Dict, Optional
+
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .auth import refresh_denylist
+from .event_bus import event_bus
+from .jobs import job_queue
+from .metrics import EVENT_LOOP_LAG, record_cache_lookup
+from .rate_limit import rate_limiter
+from .read_routing import get_read_router
+from .services.omdb_service import get_key_pool, omdb_calls_in_flight
+from .services.plot_index import plot_index
+from .services.title_search import prefix_index, title_index
+from .services.views import view_counter
+
+# Muestras del retraso del event loop que se conservan (2 minutos con el intervalo por defecto)
+LAG_SAMPLES = 240
+
+
+class LoopLagMonitor:
+    """
+    Mide el retraso del event loop: cada `interval` segundos duerme y anota
+    cuánto tarda de más en despertar. Un retraso alto indica código que
+    bloquea el loop (CPU o E/S síncrona), no esperas a la base de datos u OMDB.
+    """
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.samples: deque = deque(maxlen=LAG_SAMPLES)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="loop-lag-monitor")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            self.samples.append(lag)
+            EVENT_LOOP_LAG.set(lag)
+
+    def as_dict(self) -> Dict:
+        if not self.samples:
+            return {"running": self._task is not None, "last_ms": None, "max_ms": None}
+        return {
+            "running": self._task is not None,
+            "last_ms": round(self.samples[-1] * 1000, 2),
+            "max_ms": round(max(self.samples) * 1000, 2)
+        }
+
+
+loop_monitor = LoopLagMonitor()
+
+
+class ReadinessCheck:
+    """
+    Comprueba que la base de datos responde. El resultado se reutiliza durante
+    `ttl` segundos para que las sondas no añadan carga ni ocupen el pool, y
+    la comprobación se abandona a los `timeout` segundos: con el pool agotado
+    no se queda esperando (con el bloqueo tomado) a que quede una conexión libre.
+    """
+
+    def __init__(self, ttl: float = 5.0, timeout: float = 2.0):
+        self.ttl = ttl
+        self.timeout = timeout
+        self.ready = False
+        # Solo para el log: la sonda no tiene autenticación y no debe mostrar errores del driver
+        self.error: Optional[str] = None
+        self._checked_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    async def _ping(self, engine: AsyncEngine) -> None:
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    async def check(self, engine: AsyncEngine) -> bool:
+        if time.monotonic() - self._checked_at < self.ttl:
+            record_cache_lookup("readiness", hit=True)
+            return self.ready
+        async with self._lock:
+            # Otra sonda pudo comprobarlo mientras esperábamos
+            if time.monotonic() - self._checked_at < self.ttl:
+                record_cache_lookup("readiness", hit=True)
+                return self.ready
+            record_cache_lookup("readiness", hit=False)
+            try:
+                await asyncio.wait_for(self._ping(engine), timeout=self.timeout)
+                ready, error = True, None
+            except asyncio.TimeoutError:
+                ready, error = False, f"no response from the database in {self.timeout}s"
+            except Exception as e:
+                ready, error = False, str(e)
+            if not ready and (self.ready or self.error is None):
+                logger.warning(f"Readiness check failed: {error}")
+            self.ready, self.error, self._checked_at = ready, error, time.monotonic()
+            return ready
+
+
+def pool_status(engine: AsyncEngine) -> Dict:
+    """Conexiones del pool: en uso (checked out), libres (checked in) y de overflow."""
+    pool = engine.sync_engine.pool
+    status = {"class": type(pool).__name__}
+    # StaticPool o NullPool (SQLite en memoria, tests) no tienen estos contadores
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            status[name] = method()
+    return status
+
+
+def task_counts() -> Dict:
+    """Tareas asyncio vivas, agrupadas por nombre de la corrutina."""
+    tasks = [task for task in asyncio.all_tasks() if not task.done()]
+    by_coroutine = Counter(getattr(task.get_coro(), "__qualname__", "unknown") for task in tasks)
+    return {"total": len(tasks), "by_coroutine": dict(by_coroutine.most_common(10))}
+
+
+def runtime_snapshot(engine: AsyncEngine, read_engine: Optional[AsyncEngine] = None) -> Dict:
+    """Estado del proceso para distinguir saturación (colas, pool lleno) de lentitud."""
+    read_router = get_read_router()
+    return {
+        "pool": {
+            "primary": pool_status(engine),
+            "replica": pool_status(read_engine) if read_engine is not None else None
+        },
+        "event_loop_lag": loop_monitor.as_dict(),
+        "tasks": task_counts(),
+        "omdb": {"calls_in_flight": omdb_calls_in_flight(), "keys": get_key_pool().status()},
+        "jobs": {"pending": job_queue.pending, "workers_running": job_queue.running},
+        "movie_views": {"pending": view_counter.pending, "popular": len(view_counter.popular)},
+        "caches": {
+            "title_index": len(title_index),
+            "prefix_index": len(prefix_index),
+            "plot_index": len(plot_index),
+            "rate_limit_clients": rate_limiter.tracked_clients,
+            "read_your_writes_clients": read_router.pinned_clients,
+            "event_stream_subscribers": len(event_bus),
+            "refresh_token_denylist": len(refresh_denylist)
+        }
+    }
@@ -0,0 +1,145 @@
+from typing import Optional
+import httpx
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+
+from ..catalog_events import record_changes, snapshot
+from ..coordination import get_state, set_state
+from ..database import upsert_insert
+from ..jobs import JobFailed, job_queue
+from ..models import Movie, MovieResponse, parse_year_range, utcnow
+from ..sql_diagnostics import track_queries
+from ..timing import phase
+from .omdb_service import QUOTA_EXCEEDED_ERROR, OMDBService, genre_links, get_omdb_service, movie_from_details
+
+
+SEED_STATE_KEY = "initial_movies"
+
+
+class MovieImportError(Exception):
+    """Error al importar una película de OMDB, con el código HTTP que le corresponde."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+async def import_movie(title: str, session: AsyncSession, omdb_service: OMDBService) -> Movie:
+    """
+    Busca una película en OMDB por título y la guarda con sus datos completos.
+    Lo usan `POST /movies/` y los trabajos de creación en segundo plano.
+    Los fallos de OMDB (sin conexión o sin cuota) son 502/503 y no 404: no
+    son definitivos y una petición con Idempotency-Key no los guarda.
+    """
+    # Buscar película por título
+    search_result = await omdb_service.search_movies(title)
+    logger.info(f"Search result for '{title}': {search_result}")
+
+    if not search_result:
+        raise MovieImportError(502, "Error connecting to OMDB API")
+
+    if search_result.get("Error") == QUOTA_EXCEEDED_ERROR:
+        raise MovieImportError(503, "OMDB API request limit reached, retry later")
+
+    if search_result.get("Response") == "False":
+        raise MovieImportError(404, search_result.get("Error", "Movie not found in OMDB"))
+
+    movies_found = search_result.get("Search", [])
+    if not movies_found:
+        raise MovieImportError(404, f"No movies found with title: {title}")
+
+    # Intentar encontrar una coincidencia exacta primero
+    exact_match = next(
+        (m for m in movies_found if m["Title"].lower() == title.lower()),
+        movies_found[0]  # Si no hay coincidencia exacta, usar el primer resultado
+    )
+
+    # Una consulta por índice ahorra la llamada de detalles a OMDB si ya existe
+    with phase("exists"):
+        existing = await session.scalar(select(Movie.id).where(Movie.imdb_id == exact_match["imdbID"]))
+    if existing is not None:
+        raise MovieImportError(
+            400, f"Movie with IMDB ID {exact_match['imdbID']} already exists in database"
+        )
+
+    # Obtener detalles completos
+    try:
+        movie_details = await omdb_service.get_movie_details(exact_match["imdbID"])
+    except (httpx.HTTPError, ValueError) as e:
+        # Igual que en la búsqueda: un fallo de red o una respuesta ilegible es un 502, no un 500
+        logger.error(f"Details request failed for {exact_match['imdbID']}: {str(e)}")
+        movie_details = None
+    if not movie_details:
+        raise MovieImportError(502, f"Could not fetch details for movie: {exact_match['Title']}")
+
+    # Crear película con datos completos; si otra petición la ha creado entretanto no se inserta
+    with phase("upsert"):
+        db_movie = await insert_movie(session, movie_from_details(movie_details))
+    if db_movie is None:
+        raise MovieImportError(
+            400, f"Movie with IMDB ID {exact_match['imdbID']} already exists in database"
+        )
+
+    with phase("commit"):
+        session.add_all(genre_links(db_movie))
+        await session.commit()
+        await session.refresh(db_movie)
+
+    return db_movie
+
+
+async def insert_movie(session: AsyncSession, movie: Movie) -> Optional[Movie]:
+    """
+    Inserta la película en una sola sentencia (INSERT ... ON CONFLICT (imdb_id)
+    DO NOTHING RETURNING): sin SELECT previo ni carrera entre dos peticiones
+    con la misma película. Devuelve None si ya existía.
+    """
+    values = movie.model_dump(exclude={"id"})
+    # Los eventos before_insert del ORM no se ejecutan con sentencias insert
+    values["year_start"], values["year_end"] = parse_year_range(movie.year)
+    insert = upsert_insert(session.get_bind().dialect.name)
+    statement = (
+        insert(Movie)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=[Movie.imdb_id])
+        .returning(Movie)
+    )
+    db_movie = (await session.execute(statement)).scalar_one_or_none()
+    if db_movie is not None:
+        record_changes(session, [snapshot("create", db_movie)])
+    return db_movie
+
+
+async def seed_catalog(session: AsyncSession, omdb_service: OMDBService) -> None:
+    """
+    Carga inicial de películas, una sola vez entre todos los procesos: el
+    estado se guarda en `appstate`. Se llama con el bloqueo "startup" tomado.
+    """
+    state = await get_state(session, SEED_STATE_KEY)
+    if state and state.get("status") == "done":
+        logger.info(f"Initial movies already loaded ({state.get('movies')} movies), skipping")
+        return
+
+    with track_queries("fetch_initial_movies"):
+        loaded = await omdb_service.fetch_initial_movies(session)
+    # Si OMDB no respondió no se marca: el siguiente arranque lo reintenta
+    if loaded:
+        await set_state(session, SEED_STATE_KEY, {
+            "status": "done",
+            "movies": loaded,
+            "finished_at": utcnow().isoformat()
+        })
+
+
+async def create_movie_job(payload: dict, session: AsyncSession, omdb_service: Optional[OMDBService] = None) -> dict:
+    """Trabajo "create_movie": importa la película y devuelve sus datos como resultado."""
+    try:
+        movie = await import_movie(payload["title"], session, omdb_service or get_omdb_service())
+    except MovieImportError as e:
+        raise JobFailed(e.status_code, e.detail)
+    return MovieResponse.model_validate(movie).model_dump(mode="json")
+
+
+job_queue.register("create_movie", create_movie_job)
@@ -0,0 +1,110 @@
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional
+
+from loguru import logger
+
+from ..metrics import OMDB_KEY_QUOTA_REMAINING
+from ..models import utcnow
+
+# Cuota diaria de una key gratuita de OMDB
+DEFAULT_DAILY_QUOTA = 1000
+
+
+def parse_api_keys(value: str) -> List[str]:
+    """"key1, key2" -> ["key1", "key2"] (sin vacíos ni repetidas)."""
+    keys = []
+    for key in (value or "").split(","):
+        key = key.strip()
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def key_label(index: int) -> str:
+    """
+    Etiqueta de una key para logs y métricas: solo su posición en
+    OMDB_API_KEY. /metrics no tiene autenticación y las keys de OMDB son de
+    8 caracteres, así que ni un fragmento ni un hash corto de la key son seguros.
+    """
+    return str(index)
+
+
+@dataclass
+class _KeyState:
+    key: str
+    label: str
+    day: date
+    used: int = 0
+    exhausted: bool = False
+
+
+class OMDBKeyPool:
+    """
+    Varias API keys de OMDB con un contador diario por key. Cada llamada usa
+    la key con más cuota restante, así que se van alternando. Una key que
+    OMDB rechaza por cuota ("Request limit reached!") queda desactivada hasta
+    el día siguiente (UTC). Los contadores son de este proceso: con varios
+    workers o instancias, OMDB es quien tiene la cuenta real y el rechazo
+    desactiva la key igualmente.
+    """
+
+    def __init__(self, keys: List[str], daily_quota: int = DEFAULT_DAILY_QUOTA,
+                 clock: Callable[[], datetime] = utcnow):
+        if not keys:
+            raise ValueError("At least one OMDB API key is required")
+        self.daily_quota = daily_quota
+        self.clock = clock
+        today = clock().date()
+        self._keys = [_KeyState(key, key_label(i), today) for i, key in enumerate(keys)]
+        for state in self._keys:
+            self._publish(state)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _refresh(self, state: _KeyState, today: date) -> None:
+        if state.day != today:
+            if state.exhausted:
+                logger.info(f"OMDB API key {state.label} re-enabled for a new day")
+            state.day, state.used, state.exhausted = today, 0, False
+            self._publish(state)
+
+    def remaining(self, state: _KeyState) -> int:
+        return 0 if state.exhausted else max(0, self.daily_quota - state.used)
+
+    def _publish(self, state: _KeyState) -> None:
+        OMDB_KEY_QUOTA_REMAINING.labels(key=state.label).set(self.remaining(state))
+
+    def acquire(self) -> Optional[str]:
+        """Key con más cuota restante (y la cuenta como usada), o None si todas están agotadas."""
+        today = self.clock().date()
+        best = None
+        for state in self._keys:
+            self._refresh(state, today)
+            if self.remaining(state) > 0 and (best is None or state.used < best.used):
+                best = state
+        if best is None:
+            return None
+        best.used += 1
+        self._publish(best)
+        return best.key
+
+    def exhausted(self, key: str) -> None:
+        """OMDB rechazó la key por cuota: no se vuelve a usar hasta el día siguiente."""
+        for state in self._keys:
+            if state.key == key and not state.exhausted:
+                state.exhausted = True
+                self._publish(state)
+                available = sum(1 for other in self._keys if self.remaining(other) > 0)
+                logger.warning(f"OMDB API key {state.label} is over quota ({available} keys left)")
+
+    def status(self) -> Dict[str, Dict]:
+        """Uso de cada key, para /debug/runtime."""
+        today = self.clock().date()
+        for state in self._keys:
+            self._refresh(state, today)
+        return {
+            state.label: {"used": state.used, "remaining": self.remaining(state), "exhausted": state.exhausted}
+            for state in self._keys
+        }
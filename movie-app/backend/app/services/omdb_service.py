@@ -1,86 +1,271 @@
+import asyncio
 import httpx
-from typing import Optional, Dict, List
-from sqlmodel import select
+import math
+import time
+from collections import deque
+from contextlib import aclosing
+from functools import lru_cache
+from typing import AsyncIterator, Optional, Dict, List
+from sqlmodel import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from ..models import Movie
+from ..config import get_settings
+from ..models import Movie, MovieGenre, utcnow
+from ..metrics import OMDB_REQUEST_DURATION, OMDB_REQUESTS
+from ..timing import record_phase
+from .omdb_keys import OMDBKeyPool, parse_api_keys
 from loguru import logger
 
+QUOTA_EXCEEDED_ERROR = "Request limit reached!"
+# Resultados por página de búsqueda de OMDB y máximo de páginas que sirve
+SEARCH_PAGE_SIZE = 10
+MAX_SEARCH_PAGES = 100
+
+
+def _classify_response(response: httpx.Response) -> str:
+    """Clasifica una respuesta de OMDB para las métricas."""
+    try:
+        data = response.json()
+    except ValueError:
+        data = {}
+    if isinstance(data, dict) and data.get("Error") == QUOTA_EXCEEDED_ERROR:
+        return "quota_exceeded"
+    if response.status_code != 200:
+        return "http_error"
+    return "ok" if data.get("Response") == "True" else "not_found"
+
+
+# Campos de OMDB que se guardan en columnas propias; el resto va a `Movie.extra`
+_COLUMN_FIELDS = {
+    "Title", "Year", "imdbID", "Plot", "Poster", "Genre",
+    "Director", "Runtime", "imdbRating", "Type", "Response"
+}
+
+
+def _clean(value):
+    """OMDB usa "N/A" para los valores desconocidos."""
+    return None if value in (None, "", "N/A") else value
+
+
+def _parse_runtime(value: Optional[str]) -> Optional[int]:
+    """"136 min" -> 136"""
+    value = _clean(value)
+    if value is None:
+        return None
+    digits = value.split()[0].replace(",", "")
+    return int(digits) if digits.isdigit() else None
+
+
+def _parse_float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(_clean(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def normalize_genre(name: str) -> str:
+    return name.strip().lower()
+
+
+def parse_genres(genre: Optional[str]) -> List[str]:
+    """"Action, Sci-Fi" -> ["action", "sci-fi"]"""
+    genres = []
+    for name in (_clean(genre) or "").split(","):
+        name = normalize_genre(name)
+        if name and name not in genres:
+            genres.append(name)
+    return genres
+
+
+def movie_from_details(details: Dict) -> Movie:
+    """Construye una película a partir del registro completo de detalles de OMDB."""
+    extra = {key: value for key, value in details.items() if key not in _COLUMN_FIELDS}
+    return Movie(
+        title=details["Title"],
+        year=details["Year"],
+        imdb_id=details["imdbID"],
+        plot=_clean(details.get("Plot")),
+        poster=_clean(details.get("Poster")),
+        genre=_clean(details.get("Genre")),
+        director=_clean(details.get("Director")),
+        runtime=_parse_runtime(details.get("Runtime")),
+        imdb_rating=_parse_float(details.get("imdbRating")),
+        type=_clean(details.get("Type")),
+        extra=extra or None,
+        source_fetched_at=utcnow()
+    )
+
+
+def genre_links(movie: Movie) -> List[MovieGenre]:
+    """Filas de MovieGenre de una película ya persistida (necesita `movie.id`)."""
+    return [MovieGenre(genre=name, movie_id=movie.id) for name in parse_genres(movie.genre)]
+
+
+# Llamadas a OMDB en curso en este proceso; cada una abre su propio cliente httpx
+_calls_in_flight = 0
+
+
+def omdb_calls_in_flight() -> int:
+    return _calls_in_flight
+
+
+def _begin_call() -> float:
+    global _calls_in_flight
+    _calls_in_flight += 1
+    return time.perf_counter()
+
+
+def _observe_call(endpoint: str, start: float, outcome: str) -> None:
+    global _calls_in_flight
+    _calls_in_flight -= 1
+    elapsed = time.perf_counter() - start
+    OMDB_REQUESTS.labels(endpoint=endpoint, outcome=outcome).inc()
+    OMDB_REQUEST_DURATION.labels(endpoint=endpoint).observe(elapsed)
+    record_phase(f"omdb-{endpoint}", elapsed)
+
+
 class OMDBService:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, base_url: str = "http://www.omdbapi.com/", key_pool: Optional[OMDBKeyPool] = None):
+        # `api_key` puede llevar varias keys separadas por comas; sin `key_pool` se crea uno propio
         self.api_key = api_key
-        self.base_url = "http://www.omdbapi.com/"
+        self.base_url = base_url
+        self.key_pool = key_pool or OMDBKeyPool(parse_api_keys(api_key))
+
+    async def _get(self, endpoint: str, params: Dict) -> Optional[httpx.Response]:
+        """
+        Llamada a OMDB con la key que tenga más cuota. Si OMDB responde que la
+        key agotó su cuota, se desactiva y se repite con la siguiente. None si
+        no queda ninguna key con cuota.
+        """
+        while True:
+            api_key = self.key_pool.acquire()
+            if api_key is None:
+                logger.error("All OMDB API keys are over quota")
+                return None
+            start = _begin_call()
+            outcome = "error"
+            try:
+                async with httpx.AsyncClient() as client:
+                    response = await client.get(self.base_url, params={**params, "apikey": api_key})
+                    outcome = _classify_response(response)
+            finally:
+                _observe_call(endpoint, start, outcome)
+            if outcome != "quota_exceeded":
+                return response
+            self.key_pool.exhausted(api_key)
 
     async def search_movies(self, search_term: str, page: int = 1) -> Optional[dict]:
         params = {
-            "apikey": self.api_key,
             "s": search_term,
             "page": str(page)
         }
-        logger.info(f"Requesting: {self.base_url}?apikey={self.api_key}&s={search_term}&page={page}")
-        
+        logger.info(f"Requesting: {self.base_url}?s={search_term}&page={page}")
+
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(self.base_url, params=params)
-                if response.status_code == 200:
-                    return response.json()
-                logger.error(f"Error status: {response.status_code}")
+            response = await self._get("search", params)
+            if response is None:
                 return None
-                
+            if response.status_code == 200:
+                return response.json()
+            logger.error(f"Error status: {response.status_code}")
+            return None
+
         except Exception as e:
             logger.error(f"Search request failed: {str(e)}")
             return None
 
+    async def iter_search(
+        self,
+        search_term: str,
+        max_pages: Optional[int] = None,
+        concurrency: Optional[int] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Resultados de una búsqueda en todas sus páginas, en orden. La primera
+        página da `totalResults`; el resto se piden a la vez, como mucho
+        `concurrency` por delante de lo que ha leído el consumidor. Si este
+        deja de iterar, las páginas pendientes se cancelan. Una página que
+        falla se salta.
+        """
+        first = await self.search_movies(search_term, 1)
+        if not first or first.get("Response") == "False":
+            return
+        try:
+            total = int(first.get("totalResults") or 0)
+        except ValueError:
+            total = 0
+        pages = min(math.ceil(total / SEARCH_PAGE_SIZE), max_pages or MAX_SEARCH_PAGES, MAX_SEARCH_PAGES)
+        window = max(1, concurrency or get_settings().omdb_search_concurrency)
+
+        next_page = 2
+        pending: deque = deque()
+
+        def schedule() -> None:
+            nonlocal next_page
+            while next_page <= pages and len(pending) < window:
+                pending.append(asyncio.create_task(self.search_movies(search_term, next_page)))
+                next_page += 1
+
+        # Se piden ya las siguientes páginas para que lleguen mientras se consume la primera
+        schedule()
+        try:
+            for result in first.get("Search", []):
+                yield result
+            page = 2
+            while pending:
+                page_result = await pending.popleft()
+                schedule()
+                if not page_result or "Search" not in page_result:
+                    logger.warning(f"No results for {search_term} page {page}")
+                else:
+                    for result in page_result["Search"]:
+                        yield result
+                page += 1
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
     async def get_movie_details(self, imdb_id: str) -> Optional[Dict]:
-        async with httpx.AsyncClient() as client:
-            params = {
-                "apikey": self.api_key,
-                "i": imdb_id,
-                "plot": "full"
-            }
-            response = await client.get(self.base_url, params=params)
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("Response") == "True":
-                    return data
-            return None
+        params = {
+            "i": imdb_id,
+            "plot": "full"
+        }
+        response = await self._get("details", params)
+        if response is not None and response.status_code == 200:
+            data = response.json()
+            if data.get("Response") == "True":
+                return data
+        return None
 
-    async def fetch_initial_movies(self, session: AsyncSession) -> None:
-        """Cargar películas iniciales si la base de datos está vacía."""
+    async def fetch_initial_movies(self, session: AsyncSession) -> int:
+        """Cargar películas iniciales si la base de datos está vacía. Devuelve cuántas hay o se han cargado."""
         logger.info("Starting initial movie fetch...")
 
         # Verificar si ya hay películas en la base de datos
-        result = await session.execute(select(Movie))
-        movies = result.scalars().all()
-        if movies:
-            logger.info(f"Found {len(movies)} existing movies")
-            return
+        existing = await session.scalar(select(func.count()).select_from(Movie))
+        if existing:
+            logger.info(f"Found {existing} existing movies")
+            return existing
 
         # Términos de búsqueda para obtener películas variadas
         search_terms = ["Matrix", "Star Wars", "Lord", "Harry", "Avengers"]
         collected_movies = []
 
         for term in search_terms:
+            if len(collected_movies) >= 100:
+                break
             logger.info(f"Searching for term: {term}")
-            page = 1
-            
-            while len(collected_movies) < 100 and page <= 5:
-                try:
-                    search_result = await self.search_movies(term, page)
-                    if not search_result or "Search" not in search_result:
-                        logger.warning(f"No results for {term} page {page}")
-                        break
-
-                    movies_found = search_result["Search"]
-                    logger.info(f"Found {len(movies_found)} movies for {term} page {page}")
-
-                    for movie_data in movies_found:
+
+            try:
+                async with aclosing(self.iter_search(term, max_pages=5)) as results:
+                    async for movie_data in results:
                         if len(collected_movies) >= 100:
                             break
 
                         try:
                             # Verificar si la película ya existe
                             existing_movie = await session.execute(
-                                select(Movie).where(Movie.imdb_id == movie_data["imdbID"])
+                                select(Movie.id).where(Movie.imdb_id == movie_data["imdbID"])
                             )
                             if existing_movie.scalar_one_or_none():
                                 logger.debug(f"Movie {movie_data['imdbID']} already exists, skipping")
@@ -88,15 +273,10 @@ class OMDBService:
 
                             details = await self.get_movie_details(movie_data["imdbID"])
                             if details:
-                                movie = Movie(
-                                    title=details["Title"],
-                                    year=details["Year"],
-                                    imdb_id=details["imdbID"],
-                                    plot=details.get("Plot"),
-                                    poster=details.get("Poster")
-                                )
+                                movie = movie_from_details(details)
                                 session.add(movie)
                                 await session.flush()
+                                session.add_all(genre_links(movie))
                                 collected_movies.append(movie)
                                 logger.info(f"Added movie: {details['Title']}")
 
@@ -109,11 +289,9 @@ class OMDBService:
                             logger.error(f"Error processing movie {movie_data.get('imdbID')}: {str(e)}")
                             continue
 
-                    page += 1
-
-                except Exception as e:
-                    logger.error(f"Error processing {term} page {page}: {str(e)}")
-                    continue
+            except Exception as e:
+                logger.error(f"Error searching {term}: {str(e)}")
+                continue
 
         try:
             if collected_movies:
@@ -125,13 +303,17 @@ class OMDBService:
             await session.rollback()
             logger.error(f"Final commit error: {str(e)}")
             raise
+        return len(collected_movies)
 
-def get_omdb_service() -> OMDBService:
-    from ..config import settings
-    api_key = settings.omdb_api_key
-    if not api_key:
+@lru_cache
+def get_key_pool() -> OMDBKeyPool:
+    """Pool de keys compartido por todas las peticiones del proceso."""
+    settings = get_settings()
+    keys = parse_api_keys(settings.omdb_api_key)
+    if not keys:
         raise ValueError("OMDB_API_KEY not configured in settings")
-    return OMDBService(api_key=api_key)
+    return OMDBKeyPool(keys, daily_quota=settings.omdb_daily_quota)
 
-# Crear una instancia global del servicio
-omdb_service = get_omdb_service()
\ No newline at end of file
+def get_omdb_service() -> OMDBService:
+    settings = get_settings()
+    return OMDBService(api_key=settings.omdb_api_key, base_url=settings.omdb_base_url, key_pool=get_key_pool())
\ No newline at end of file
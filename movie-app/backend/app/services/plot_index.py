@@ -0,0 +1,446 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import func, select
+
+from ..catalog_events import CatalogChange, add_catalog_listener
+from ..config import get_settings
+from ..models import Movie
+from .omdb_service import parse_genres
+from .title_search import normalize_title
+
+# Cambiar si cambia la forma de vectorizar: invalida los índices guardados
+VECTORIZER_VERSION = 2
+LOAD_BATCH_SIZE = 5000
+# Margen al buscar películas cambiadas desde la instantánea: una transacción que hizo
+# commit después de leer `synced_until` puede traer un `updated_at` algo anterior
+SYNC_MARGIN = timedelta(minutes=1)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset("""
+    a about after again against all an and any are as at be because been before
+    being between both but by can could did do does doing down during each few for
+    from further had has have having he her here hers him his how i if in into is
+    it its itself just me more most my no nor not now of off on once only or other
+    our out over own same she should so some such than that the their them then
+    there these they this those through to too under until up very was we were
+    what when where which while who whom why will with would you your
+""".split())
+# Sufijos que se recortan para agrupar variantes ("hackers" -> "hack", "simulated" -> "simul")
+_SUFFIXES = (
+    "ational", "ations", "ation", "ating", "ated", "ates", "ate", "ments", "ment",
+    "ings", "ing", "ers", "er", "ies", "ied", "ed", "es", "ly", "s", "e"
+)
+_MIN_STEM = 3
+
+# Ficheros de cada instantánea: matriz por filas (CSR) para leer el vector de
+# una película y por columnas (CSC) para puntuar solo las palabras de la consulta
+_SNAPSHOT_ARRAYS = ("ids", "row_ptr", "cols", "vals", "col_ptr", "col_rows", "col_vals")
+
+
+class SparseVector(NamedTuple):
+    """Posiciones (ordenadas) y pesos no nulos de un vector normalizado."""
+    indices: np.ndarray
+    values: np.ndarray
+
+    def any(self) -> bool:
+        return len(self.indices) > 0
+
+
+def stem(token: str) -> str:
+    """Lematización ligera por sufijos; basta con que las variantes coincidan entre sí."""
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= _MIN_STEM:
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return [
+        stem(token) for token in _TOKEN.findall(normalize_title(text or ""))
+        if len(token) > 1 and token not in _STOPWORDS
+    ]
+
+
+def embed_text(text: Optional[str], genres: Iterable[str] = (), dim: Optional[int] = None) -> SparseVector:
+    """
+    Vector normalizado (L2) de un texto con el "hashing trick": cada palabra
+    suma en una de `dim` posiciones según su crc32, con signo también derivado
+    del hash para que las colisiones se compensen. Frecuencias sublineales
+    (1 + log tf). Los géneros entran como palabras propias ("genre:drama").
+    """
+    dim = dim or get_settings().plot_vector_dim
+    counts: Dict[str, int] = {}
+    for token in tokenize(text):
+        counts[token] = counts.get(token, 0) + 1
+    for genre in genres:
+        token = f"genre:{genre}"
+        counts[token] = counts.get(token, 0) + 1
+
+    weights: Dict[int, float] = {}
+    for token, count in counts.items():
+        digest = zlib.crc32(token.encode("utf-8"))
+        sign = 1.0 if (digest // dim) % 2 == 0 else -1.0
+        position = digest % dim
+        weights[position] = weights.get(position, 0.0) + sign * (1.0 + np.log(count))
+
+    positions = sorted(p for p, w in weights.items() if w != 0.0)
+    indices = np.array(positions, dtype=np.int32)
+    values = np.array([weights[p] for p in positions], dtype=np.float32)
+    norm = np.linalg.norm(values)
+    if norm > 0:
+        values /= norm
+    return SparseVector(indices, values)
+
+
+def embed_movie(data: Dict, dim: Optional[int] = None) -> Optional[SparseVector]:
+    """Vector de una película a partir de su argumento y géneros; None si no tiene argumento."""
+    if not data.get("plot"):
+        return None
+    vector = embed_text(data["plot"], parse_genres(data.get("genre")), dim)
+    return vector if vector.any() else None
+
+
+def same_vector(a: Optional[SparseVector], b: Optional[SparseVector]) -> bool:
+    if a is None or b is None:
+        return a is b
+    return np.array_equal(a.indices, b.indices) and np.allclose(a.values, b.values)
+
+
+def _build_arrays(ids: np.ndarray, vectors: List[SparseVector], dim: int) -> Dict[str, np.ndarray]:
+    """Matrices CSR y CSC de un conjunto de vectores."""
+    lengths = np.fromiter((len(v.indices) for v in vectors), dtype=np.int64, count=len(vectors))
+    row_ptr = np.zeros(len(vectors) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=row_ptr[1:])
+    cols = np.concatenate([v.indices for v in vectors]) if vectors else np.zeros(0, dtype=np.int32)
+    vals = np.concatenate([v.values for v in vectors]) if vectors else np.zeros(0, dtype=np.float32)
+
+    rows = np.repeat(np.arange(len(vectors), dtype=np.int32), lengths)
+    order = np.argsort(cols, kind="stable")
+    col_ptr = np.zeros(dim + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cols, minlength=dim), out=col_ptr[1:])
+    return {
+        "ids": np.asarray(ids, dtype=np.int64),
+        "row_ptr": row_ptr,
+        "cols": cols.astype(np.int32, copy=False),
+        "vals": vals.astype(np.float32, copy=False),
+        "col_ptr": col_ptr,
+        "col_rows": rows[order],
+        "col_vals": vals[order]
+    }
+
+
+class _Matrix:
+    """Vectores de un conjunto de películas en formato CSR + CSC (en memoria o memory-mapped)."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.arrays = arrays
+        self.ids = arrays["ids"]
+        self.rows = {int(movie_id): row for row, movie_id in enumerate(self.ids)}
+
+    @classmethod
+    def empty(cls) -> "_Matrix":
+        # Sin filas no hace falta `dim`: `scores` no llega a mirar las columnas
+        return cls(_build_arrays(np.zeros(0, dtype=np.int64), [], 0))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def vector(self, row: int) -> SparseVector:
+        start, end = self.arrays["row_ptr"][row], self.arrays["row_ptr"][row + 1]
+        return SparseVector(
+            np.asarray(self.arrays["cols"][start:end]),
+            np.asarray(self.arrays["vals"][start:end])
+        )
+
+    def vectors(self, rows: np.ndarray) -> List[SparseVector]:
+        return [self.vector(int(row)) for row in rows]
+
+    def scores(self, query: SparseVector) -> np.ndarray:
+        """Producto escalar con todas las filas recorriendo solo las columnas de la consulta."""
+        if not len(self):
+            return np.zeros(0, dtype=np.float64)
+        col_ptr, col_rows, col_vals = self.arrays["col_ptr"], self.arrays["col_rows"], self.arrays["col_vals"]
+        hit_rows, hit_weights = [], []
+        for column, weight in zip(query.indices, query.values):
+            start, end = col_ptr[column], col_ptr[column + 1]
+            if start != end:
+                hit_rows.append(col_rows[start:end])
+                hit_weights.append(col_vals[start:end] * weight)
+        if not hit_rows:
+            return np.zeros(len(self), dtype=np.float64)
+        return np.bincount(
+            np.concatenate(hit_rows),
+            weights=np.concatenate(hit_weights),
+            minlength=len(self)
+        )
+
+
+class PlotIndex:
+    """
+    Vectores de argumentos para "películas similares" y búsqueda por texto.
+
+    Los vectores son dispersos (unas decenas de palabras de `dim` posibles) y
+    se guardan como matriz CSR + CSC. La base es una instantánea en disco
+    abierta con memory-map en solo lectura, de modo que los workers la cargan
+    al instante y comparten las páginas. Los cambios posteriores se guardan
+    en memoria (vectores nuevos e ids borrados) hasta la siguiente instantánea.
+    La instantánea guarda hasta qué `updated_at` de la base de datos recoge
+    (`synced_until`), para volver a vectorizar al arrancar lo que cambió después.
+    """
+
+    def __init__(self, directory: Optional[str] = None, dim: Optional[int] = None):
+        # Lo que no se indica se toma de la configuración al primer uso, no al importar
+        self._directory = Path(directory) if directory else None
+        self._dim = dim
+        self._lock = threading.Lock()
+        self.synced_until: Optional[datetime] = None
+        self._generation: Optional[str] = None
+        self._reset()
+
+    @property
+    def directory(self) -> Path:
+        if self._directory is None:
+            self._directory = Path(get_settings().plot_index_dir)
+        return self._directory
+
+    @property
+    def dim(self) -> int:
+        if self._dim is None:
+            self._dim = get_settings().plot_vector_dim
+        return self._dim
+
+    def _reset(self, base: Optional[_Matrix] = None) -> None:
+        self._base = base or _Matrix.empty()
+        self._base_alive = np.ones(len(self._base), dtype=bool)
+        self._delta: Dict[int, SparseVector] = {}
+        self._delta_matrix: Optional[_Matrix] = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+            self.synced_until = None
+            self._generation = None
+
+    def __len__(self) -> int:
+        return int(self._base_alive.sum()) + len(self._delta)
+
+    @property
+    def pending_changes(self) -> int:
+        """Cambios que aún no están en la instantánea de disco."""
+        return len(self._delta) + int((~self._base_alive).sum())
+
+    def __contains__(self, movie_id: int) -> bool:
+        return movie_id in self._delta or self._alive_row(movie_id) is not None
+
+    def _alive_row(self, movie_id: int) -> Optional[int]:
+        row = self._base.rows.get(movie_id)
+        if row is None or not self._base_alive[row]:
+            return None
+        return row
+
+    # Instantánea en disco
+
+    def open_snapshot(self) -> bool:
+        """Abre la instantánea de disco si existe y es compatible; devuelve si se abrió."""
+        try:
+            meta = json.loads((self.directory / "meta.json").read_text())
+            if meta.get("version") != VECTORIZER_VERSION or meta.get("dim") != self.dim:
+                logger.info("Plot index snapshot is outdated, it will be rebuilt")
+                return False
+            generation = meta["generation"]
+            # Instantáneas anteriores a este campo: se comprueban todas las películas
+            synced_until = datetime.fromisoformat(meta["synced_until"]) if meta.get("synced_until") else None
+            arrays = {
+                name: np.load(self.directory / f"{name}-{generation}.npy", mmap_mode="r")
+                for name in _SNAPSHOT_ARRAYS
+            }
+        except (OSError, ValueError, KeyError) as e:
+            logger.info(f"No usable plot index snapshot in {self.directory}: {e}")
+            return False
+
+        with self._lock:
+            self._reset(_Matrix(arrays))
+            self.synced_until = synced_until
+            self._generation = generation
+        return True
+
+    def _write_meta(self, generation: str, count: int) -> None:
+        # Se sustituye de una vez (os.replace): quien lo lea ve el anterior o el nuevo completo
+        tmp = self.directory / f"meta.json.{os.getpid()}.tmp"
+        tmp.write_text(json.dumps({
+            "version": VECTORIZER_VERSION,
+            "dim": self.dim,
+            "generation": generation,
+            "count": count,
+            "saved_at": time.time(),
+            "synced_until": self.synced_until.isoformat() if self.synced_until else None
+        }))
+        os.replace(tmp, self.directory / "meta.json")
+
+    def save_snapshot(self) -> None:
+        """
+        Escribe una instantánea con el estado actual (base viva + cambios).
+
+        Los ficheros de cada instantánea llevan un identificador de generación
+        y `meta.json` se sustituye al final con os.replace: quien lea a la vez
+        ve la instantánea anterior o la nueva completa, y los workers que ya
+        tengan abierta la anterior siguen leyéndola.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        started = time.time()
+        generation = f"{int(started)}-{uuid.uuid4().hex[:8]}"
+        with self._lock:
+            alive_rows = np.flatnonzero(self._base_alive)
+            ids = np.concatenate([
+                np.asarray(self._base.ids)[alive_rows],
+                np.fromiter(self._delta.keys(), dtype=np.int64, count=len(self._delta))
+            ])
+            vectors = self._base.vectors(alive_rows) + list(self._delta.values())
+            arrays = _build_arrays(ids, vectors, self.dim)
+            for name, array in arrays.items():
+                np.save(self.directory / f"{name}-{generation}.npy", array)
+
+            self._write_meta(generation, len(ids))
+
+            self._reset(_Matrix({
+                name: np.load(self.directory / f"{name}-{generation}.npy", mmap_mode="r")
+                for name in _SNAPSHOT_ARRAYS
+            }))
+            self._generation = generation
+
+        # Las generaciones anteriores ya no se abren; quien las tenga mapeadas las conserva
+        for path in self.directory.glob("*.npy"):
+            if generation not in path.name and path.stat().st_mtime < started:
+                path.unlink(missing_ok=True)
+
+    # Cambios incrementales
+
+    def add(self, movie_id: int, vector: Optional[SparseVector]) -> None:
+        with self._lock:
+            self._discard(movie_id)
+            if vector is not None:
+                self._delta[movie_id] = vector
+                self._delta_matrix = None
+
+    def remove(self, movie_id: int) -> None:
+        with self._lock:
+            self._discard(movie_id)
+
+    def _discard(self, movie_id: int) -> None:
+        row = self._base.rows.get(movie_id)
+        if row is not None:
+            self._base_alive[row] = False
+        if self._delta.pop(movie_id, None) is not None:
+            self._delta_matrix = None
+
+    def apply_changes(self, changes: List[CatalogChange]) -> None:
+        """Listener de `catalog_events`."""
+        for change in changes:
+            if change.op == "delete":
+                self.remove(change.movie_id)
+            else:
+                self.add(change.movie_id, embed_movie(change.data, self.dim))
+
+    # Consultas
+
+    def vector(self, movie_id: int) -> Optional[SparseVector]:
+        with self._lock:
+            if movie_id in self._delta:
+                return self._delta[movie_id]
+            row = self._alive_row(movie_id)
+            return None if row is None else self._base.vector(row)
+
+    def nearest(self, vector: SparseVector, limit: int = 10, exclude: Set[int] = frozenset()) -> List[Tuple[int, float]]:
+        """
+        Las `limit` películas más parecidas a `vector` (similitud coseno). Se
+        puntúa todo el índice de una vez con las listas de filas de cada
+        palabra de la consulta (CSC) y se eligen las mejores con `argpartition`.
+        """
+        with self._lock:
+            if self._delta_matrix is None:
+                self._delta_matrix = _Matrix(_build_arrays(
+                    np.fromiter(self._delta.keys(), dtype=np.int64, count=len(self._delta)),
+                    list(self._delta.values()),
+                    self.dim
+                ))
+            base, delta = self._base, self._delta_matrix
+            alive = np.concatenate([self._base_alive, np.ones(len(delta), dtype=bool)])
+
+        ids = np.concatenate([np.asarray(base.ids), delta.ids])
+        scores = np.concatenate([base.scores(vector), delta.scores(vector)])
+        if exclude:
+            alive &= ~np.isin(ids, np.fromiter(exclude, dtype=np.int64))
+        scores = np.where(alive & (scores > 0), scores, -np.inf)
+
+        limit = min(limit, int(np.isfinite(scores).sum()))
+        if limit <= 0:
+            return []
+        top = np.argpartition(scores, -limit)[-limit:]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+    async def sync(self, session: AsyncSession) -> None:
+        """
+        Abre la instantánea y la pone al día con la base de datos: vectoriza
+        las películas que faltan y las modificadas después de la instantánea
+        (p.ej. un argumento nuevo del refresco de OMDB), descarta las borradas
+        y, si hubo cambios, guarda una instantánea nueva para los siguientes
+        arranques.
+        """
+        start = time.perf_counter()
+        self.open_snapshot()
+        # Se lee antes que las películas: lo que cambie a partir de aquí entra en el siguiente arranque
+        synced_until = await session.scalar(select(func.max(Movie.updated_at)))
+        db_ids = set((await session.execute(select(Movie.id))).scalars().all())
+        with self._lock:
+            indexed = set(self._base.rows)
+        for movie_id in indexed - db_ids:
+            self.remove(movie_id)
+
+        changed_query = select(Movie.id)
+        if self.synced_until is not None:
+            changed_query = changed_query.where(Movie.updated_at >= self.synced_until - SYNC_MARGIN)
+        changed = set((await session.execute(changed_query)).scalars().all()) & indexed
+
+        to_embed = sorted((db_ids - indexed) | changed)
+        embedded = 0
+        for i in range(0, len(to_embed), LOAD_BATCH_SIZE):
+            batch = to_embed[i:i + LOAD_BATCH_SIZE]
+            result = await session.execute(
+                select(Movie.id, Movie.plot, Movie.genre).where(Movie.id.in_(batch))
+            )
+            for movie_id, plot, genre in result.all():
+                vector = embed_movie({"plot": plot, "genre": genre}, self.dim)
+                # Las del margen que no han cambiado se quedan en la instantánea
+                if movie_id in changed and same_vector(vector, self.vector(movie_id)):
+                    continue
+                self.add(movie_id, vector)
+                embedded += 1
+
+        previous, self.synced_until = self.synced_until, synced_until
+        if self.pending_changes:
+            self.save_snapshot()
+        elif self._generation is not None and synced_until != previous:
+            # Ningún vector ha cambiado: basta con avanzar `synced_until` sin reescribir las matrices
+            with self._lock:
+                self._write_meta(self._generation, len(self._base))
+        logger.info(
+            f"Plot index ready with {len(self)} vectors "
+            f"({embedded} embedded) in {time.perf_counter() - start:.1f}s"
+        )
+
+
+plot_index = PlotIndex()
+add_catalog_listener(plot_index.apply_changes)
@@ -0,0 +1,211 @@
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Collection, Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import delete, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from ..config import Settings
+from ..coordination import process_lock
+from ..database import get_engine
+from ..metrics import MOVIE_REFRESHES
+from ..models import Movie, MovieGenre, utcnow
+from .omdb_service import OMDBService, genre_links, get_omdb_service, movie_from_details
+
+SessionFactory = Callable[[], AsyncSession]
+
+# Campos que se comparan con OMDB; el resto de columnas se derivan de estos
+REFRESHED_FIELDS = (
+    "title", "year", "plot", "poster", "genre", "director",
+    "runtime", "imdb_rating", "type", "extra"
+)
+
+# Campos de `extra` que OMDB cambia casi a diario (votos, puntuaciones, taquilla): por sí
+# solos no cuentan como cambio; se guardan cuando la película cambia por otro motivo
+VOLATILE_EXTRA_FIELDS = frozenset({"imdbVotes", "Metascore", "Ratings", "BoxOffice"})
+
+# Fallos seguidos tras los que se abandona la pasada (OMDB caído o sin cuota)
+MAX_CONSECUTIVE_FAILURES = 3
+
+
+@dataclass
+class RefreshStats:
+    checked: int = 0
+    changed: int = 0
+    failed: int = 0
+    aborted: bool = False
+    # Películas que OMDB no devolvió: siguen caducadas para reintentarlas en la siguiente pasada
+    failed_ids: List[int] = field(default_factory=list)
+
+
+def _comparable(field: str, value):
+    if field == "extra" and value:
+        return {key: item for key, item in value.items() if key not in VOLATILE_EXTRA_FIELDS}
+    return value
+
+
+def apply_details(movie: Movie, details: Dict) -> List[str]:
+    """
+    Copia en `movie` los datos de OMDB si ha cambiado algún campo estable y
+    devuelve sus nombres; si solo cambian los volátiles no toca la película.
+    """
+    fresh = movie_from_details(details)
+    changed = [
+        field for field in REFRESHED_FIELDS
+        if _comparable(field, getattr(movie, field)) != _comparable(field, getattr(fresh, field))
+    ]
+    if changed:
+        for field in REFRESHED_FIELDS:
+            setattr(movie, field, getattr(fresh, field))
+    return changed
+
+
+async def refresh_batch(
+    session: AsyncSession,
+    omdb_service: OMDBService,
+    stale_before: datetime,
+    limit: int,
+    skip: Collection[int] = ()
+) -> RefreshStats:
+    """
+    Contrasta con OMDB las `limit` películas más antiguas (salvo las de
+    `skip`) y guarda solo las que han cambiado. Las llamadas a OMDB se hacen
+    fuera de la transacción.
+    """
+    stats = RefreshStats()
+    query = (
+        select(Movie.id, Movie.imdb_id)
+        .where(or_(Movie.source_fetched_at.is_(None), Movie.source_fetched_at < stale_before))
+        .order_by(Movie.source_fetched_at.asc().nulls_first(), Movie.id)
+        .limit(limit)
+    )
+    if skip:
+        query = query.where(Movie.id.not_in(skip))
+    result = await session.execute(query)
+    candidates: List[Tuple[int, str]] = list(result.all())
+    await session.commit()
+
+    fetched: Dict[int, Dict] = {}
+    consecutive_failures = 0
+    for movie_id, imdb_id in candidates:
+        details = await omdb_service.get_movie_details(imdb_id)
+        stats.checked += 1
+        if details is None:
+            stats.failed += 1
+            stats.failed_ids.append(movie_id)
+            consecutive_failures += 1
+            if consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+                stats.aborted = True
+                break
+            continue
+        consecutive_failures = 0
+        fetched[movie_id] = details
+
+    if not fetched:
+        return stats
+
+    now = utcnow()
+    changed_ids = set()
+    movies = await session.execute(select(Movie).where(Movie.id.in_(fetched)))
+    for movie in movies.scalars().all():
+        changed = apply_details(movie, fetched[movie.id])
+        if not changed:
+            continue
+        changed_ids.add(movie.id)
+        movie.source_fetched_at = now
+        if "genre" in changed:
+            await session.execute(delete(MovieGenre).where(MovieGenre.movie_id == movie.id))
+            session.add_all(genre_links(movie))
+        logger.info(f"Refreshed movie {movie.imdb_id}: {', '.join(changed)}")
+
+    # Las que no cambian solo avanzan su fecha, con una única sentencia; las que fallan no
+    untouched = [movie_id for movie_id in fetched if movie_id not in changed_ids]
+    if untouched:
+        await session.execute(
+            update(Movie).where(Movie.id.in_(untouched)).values(source_fetched_at=now)
+        )
+    await session.commit()
+
+    stats.changed = len(changed_ids)
+    MOVIE_REFRESHES.labels(outcome="changed").inc(stats.changed)
+    MOVIE_REFRESHES.labels(outcome="unchanged").inc(stats.checked - stats.changed - stats.failed)
+    MOVIE_REFRESHES.labels(outcome="failed").inc(stats.failed)
+    return stats
+
+
+class MovieRefresher:
+    """
+    Refresca periódicamente las películas con datos de OMDB más antiguos que
+    `max_age`, en lotes pequeños y con un máximo de llamadas a OMDB por pasada.
+    Los cambios pasan por la sesión, así que los índices en memoria se
+    actualizan con los eventos del catálogo.
+    """
+
+    def __init__(self, interval: float, max_age: timedelta, batch_size: int, budget: int):
+        self.interval = interval
+        self.max_age = max_age
+        self.batch_size = batch_size
+        self.budget = budget
+        self.session_factory: SessionFactory = lambda: AsyncSession(get_engine())
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "MovieRefresher":
+        return cls(
+            interval=settings.refresh_interval_seconds,
+            max_age=timedelta(days=settings.refresh_max_age_days),
+            batch_size=settings.refresh_batch_size,
+            budget=settings.refresh_omdb_budget
+        )
+
+    async def run_once(self, omdb_service: Optional[OMDBService] = None) -> RefreshStats:
+        """Una pasada: lotes de películas caducadas hasta agotar el presupuesto o las películas."""
+        omdb_service = omdb_service or get_omdb_service()
+        stale_before = utcnow() - self.max_age
+        total = RefreshStats()
+        while total.checked < self.budget:
+            limit = min(self.batch_size, self.budget - total.checked)
+            async with self.session_factory() as session:
+                # Las que ya han fallado en esta pasada siguen caducadas: no se vuelven a pedir
+                stats = await refresh_batch(session, omdb_service, stale_before, limit, skip=total.failed_ids)
+            total.checked += stats.checked
+            total.changed += stats.changed
+            total.failed += stats.failed
+            total.failed_ids.extend(stats.failed_ids)
+            if stats.aborted:
+                total.aborted = True
+                logger.warning(f"Movie refresh aborted after {stats.failed} OMDB failures")
+                break
+            if stats.checked < limit:
+                break
+        if total.checked:
+            logger.info(
+                f"Movie refresh: {total.checked} checked, {total.changed} changed, {total.failed} failed"
+            )
+        return total
+
+    def start(self) -> None:
+        if self.interval <= 0 or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.create_task(self._loop(), name="movie-refresher")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                # Una sola pasada a la vez entre todos los procesos; el resto se la salta
+                async with process_lock(get_engine(), "movie-refresh", wait=False) as acquired:
+                    if acquired:
+                        await self.run_once()
+            except Exception:
+                logger.exception("Movie refresh failed")
@@ -0,0 +1,329 @@
+import bisect
+import itertools
+import math
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from ..catalog_events import CatalogChange, add_catalog_listener
+from ..models import Movie
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_NON_WORD = re.compile(r"[\W_]+")
+_ARTICLES = ("the ", "a ", "an ")
+
+# Niveles de coincidencia, de mejor a peor
+EXACT, PREFIX, CONTAINS, FUZZY = 3, 2, 1, 0
+
+# Similitud mínima para las coincidencias aproximadas (el valor por defecto de pg_trgm)
+SIMILARITY_THRESHOLD = 0.3
+
+# Títulos que se puntúan como mucho en una búsqueda: acota el tiempo con el bloqueo tomado
+MAX_CANDIDATES = 5000
+
+
+def normalize_title(title: str) -> str:
+    """Minúsculas, sin acentos ni puntuación: "Amélie!" -> "amelie"."""
+    decomposed = unicodedata.normalize("NFKD", title)
+    ascii_title = decomposed.encode("ascii", "ignore").decode("ascii")
+    normalized = _NON_ALNUM.sub(" ", ascii_title.lower()).strip()
+    if normalized:
+        return normalized
+    # Sin letras latinas ("千と千尋の神隠し") pasar a ASCII lo vacía: se compara el texto original
+    return _NON_WORD.sub(" ", unicodedata.normalize("NFKC", title).casefold()).strip()
+
+
+def strip_article(normalized: str) -> str:
+    """ "the matrix" -> "matrix" """
+    for article in _ARTICLES:
+        if normalized.startswith(article):
+            return normalized[len(article):]
+    return normalized
+
+
+def trigrams(normalized: str) -> Set[str]:
+    """Trigramas de cada palabra con el mismo relleno que pg_trgm ("  w", " wo", ...)."""
+    grams = set()
+    for word in normalized.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+@dataclass(frozen=True)
+class TitleMatch:
+    movie_id: int
+    title: str
+    level: int
+    score: float
+
+    @property
+    def sort_key(self) -> Tuple:
+        # Mejor nivel, más similar y, a igualdad, el título más corto
+        return (-self.level, -self.score, len(self.title), self.movie_id)
+
+
+def match_level(query: str, title: str) -> Optional[int]:
+    """Nivel de coincidencia de dos títulos normalizados, o None si solo puede ser aproximada."""
+    bare_query, bare_title = strip_article(query), strip_article(title)
+    if title == query or bare_title == bare_query:
+        return EXACT
+    if title.startswith(query) or bare_title.startswith(bare_query):
+        return PREFIX
+    if query in title:
+        return CONTAINS
+    return None
+
+
+def rank_title(query: str, title: str, movie_id: int = 0) -> Optional[TitleMatch]:
+    """Puntúa un título concreto; se usa también para validar filas leídas de la base de datos."""
+    normalized_query, normalized_title = normalize_title(query), normalize_title(title)
+    if not normalized_query:
+        return None
+    score = similarity(trigrams(normalized_query), trigrams(normalized_title))
+    level = match_level(normalized_query, normalized_title)
+    if level is None:
+        if score < SIMILARITY_THRESHOLD:
+            return None
+        level = FUZZY
+    return TitleMatch(movie_id=movie_id, title=title, level=level, score=score)
+
+
+class TitleIndex:
+    """
+    Índice en memoria de títulos por trigramas. Ordena las coincidencias:
+    exacta, prefijo, contenida y, por último, por similitud de trigramas.
+
+    Se carga al arrancar y se actualiza con los cambios del catálogo. Cada
+    worker tiene su propia copia, así que puede quedarse atrás respecto a la
+    base de datos: los resultados son candidatos que hay que comprobar.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._titles: Dict[int, str] = {}
+        self._normalized: Dict[int, str] = {}
+        self._trigrams: Dict[int, Set[str]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._titles.clear()
+            self._normalized.clear()
+            self._trigrams.clear()
+            self._postings.clear()
+
+    def add(self, movie_id: int, title: str) -> None:
+        with self._lock:
+            self._remove(movie_id)
+            normalized = normalize_title(title)
+            grams = trigrams(normalized)
+            self._titles[movie_id] = title
+            self._normalized[movie_id] = normalized
+            self._trigrams[movie_id] = grams
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(movie_id)
+
+    def remove(self, movie_id: int) -> None:
+        with self._lock:
+            self._remove(movie_id)
+
+    def _remove(self, movie_id: int) -> None:
+        self._titles.pop(movie_id, None)
+        self._normalized.pop(movie_id, None)
+        for gram in self._trigrams.pop(movie_id, ()):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(movie_id)
+                if not ids:
+                    del self._postings[gram]
+
+    def rebuild(self, movies: Iterable[Tuple[int, str]]) -> None:
+        self.clear()
+        for movie_id, title in movies:
+            self.add(movie_id, title)
+
+    def apply_changes(self, changes: List[CatalogChange]) -> None:
+        """Listener de `catalog_events`."""
+        for change in changes:
+            if change.op == "delete":
+                self.remove(change.movie_id)
+            else:
+                self.add(change.movie_id, change.data["title"])
+
+    def _candidates(self, normalized_query: str, query_grams: Set[str]) -> Set[int]:
+        """
+        Películas que pueden coincidir, leyendo solo las listas de los trigramas más raros.
+
+        Con similitud >= umbral un título comparte al menos `umbral * len(query_grams)`
+        trigramas de la consulta, así que contiene alguno de los `len - needed + 1`
+        más raros. Las coincidencias exactas, de prefijo o contenidas incluyen la
+        consulta (sin artículo), y con ella su trigrama sin relleno más raro.
+        """
+        def frequency(gram: str) -> int:
+            return len(self._postings.get(gram, ()))
+
+        by_rarity = sorted(query_grams, key=frequency)
+        needed = max(1, math.ceil(SIMILARITY_THRESHOLD * len(by_rarity)))
+        grams = by_rarity[:len(by_rarity) - needed + 1]
+        inner = [gram for gram in trigrams(strip_article(normalized_query)) if " " not in gram]
+        if inner:
+            # Primero: es el que asegura las mejores coincidencias si se llega al tope
+            grams.insert(0, min(inner, key=frequency))
+
+        candidates: Set[int] = set()
+        for gram in grams:
+            ids = self._postings.get(gram, ())
+            if len(candidates) + len(ids) > MAX_CANDIDATES:
+                # Consulta muy poco selectiva: se completa el cupo y no se leen más listas
+                candidates.update(itertools.islice(ids, MAX_CANDIDATES - len(candidates)))
+                break
+            candidates.update(ids)
+        return candidates
+
+    def search(self, query: str, limit: int = 5) -> List[TitleMatch]:
+        normalized_query = normalize_title(query)
+        if not normalized_query:
+            return []
+        query_grams = trigrams(normalized_query)
+
+        with self._lock:
+            matches = []
+            for movie_id in self._candidates(normalized_query, query_grams):
+                grams = self._trigrams[movie_id]
+                count = len(query_grams & grams)
+                score = count / (len(query_grams) + len(grams) - count)
+                level = match_level(normalized_query, self._normalized[movie_id])
+                if level is None:
+                    if score < SIMILARITY_THRESHOLD:
+                        continue
+                    level = FUZZY
+                matches.append(TitleMatch(movie_id, self._titles[movie_id], level, score))
+
+        matches.sort(key=lambda match: match.sort_key)
+        return matches[:limit]
+
+
+class PrefixIndex:
+    """
+    Títulos normalizados en un array ordenado para autocompletar con bisect.
+
+    Cada película aparece también sin el artículo inicial, para que "matr"
+    sugiera "The Matrix". No consulta la base de datos: igual que
+    `TitleIndex`, se carga al arrancar y sigue los cambios del catálogo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys: List[Tuple[str, int]] = []
+        self._titles: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    @staticmethod
+    def _entries(movie_id: int, title: str) -> List[Tuple[str, int]]:
+        normalized = normalize_title(title)
+        bare = strip_article(normalized)
+        return [(key, movie_id) for key in {normalized, bare} if key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._keys.clear()
+            self._titles.clear()
+
+    def add(self, movie_id: int, title: str) -> None:
+        with self._lock:
+            self._remove(movie_id)
+            self._titles[movie_id] = title
+            for entry in self._entries(movie_id, title):
+                bisect.insort(self._keys, entry)
+
+    def remove(self, movie_id: int) -> None:
+        with self._lock:
+            self._remove(movie_id)
+
+    def _remove(self, movie_id: int) -> None:
+        title = self._titles.pop(movie_id, None)
+        if title is None:
+            return
+        for entry in self._entries(movie_id, title):
+            position = bisect.bisect_left(self._keys, entry)
+            if position < len(self._keys) and self._keys[position] == entry:
+                del self._keys[position]
+
+    def rebuild(self, movies: Iterable[Tuple[int, str]]) -> None:
+        with self._lock:
+            self._titles = {movie_id: title for movie_id, title in movies}
+            self._keys = sorted(
+                entry
+                for movie_id, title in self._titles.items()
+                for entry in self._entries(movie_id, title)
+            )
+
+    def apply_changes(self, changes: List[CatalogChange]) -> None:
+        """Listener de `catalog_events`."""
+        for change in changes:
+            if change.op == "delete":
+                self.remove(change.movie_id)
+            else:
+                self.add(change.movie_id, change.data["title"])
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Tuple[int, str]]:
+        """Hasta `limit` películas (id, título) cuyo título empieza por `prefix`, en orden alfabético."""
+        normalized = normalize_title(prefix)
+        if not normalized:
+            return []
+        results: Dict[int, str] = {}
+        with self._lock:
+            position = bisect.bisect_left(self._keys, (normalized, -1))
+            while position < len(self._keys) and len(results) < limit:
+                key, movie_id = self._keys[position]
+                if not key.startswith(normalized):
+                    break
+                results.setdefault(movie_id, self._titles[movie_id])
+                position += 1
+        return list(results.items())
+
+
+def best_title_match(query: str, movies: Iterable[Movie]) -> Optional[Movie]:
+    """La película cuyo título actual encaja mejor con `query`, o None."""
+    ranked = []
+    for movie in movies:
+        match = rank_title(query, movie.title, movie.id)
+        if match is not None:
+            ranked.append((match.sort_key, movie))
+    if not ranked:
+        return None
+    return min(ranked, key=lambda item: item[0])[1]
+
+
+async def load_title_indexes(session: AsyncSession) -> None:
+    """Construye los índices de títulos con una sola lectura de la base de datos."""
+    result = await session.execute(select(Movie.id, Movie.title))
+    movies = result.all()
+    title_index.rebuild(movies)
+    prefix_index.rebuild(movies)
+    logger.info(f"Title indexes loaded with {len(movies)} titles")
+
+
+title_index = TitleIndex()
+prefix_index = PrefixIndex()
+add_catalog_listener(title_index.apply_changes)
+add_catalog_listener(prefix_index.apply_changes)
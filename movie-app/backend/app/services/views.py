@@ -0,0 +1,181 @@
+import asyncio
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from ..catalog_events import CatalogChange, add_catalog_listener
+from ..config import get_settings
+from ..database import get_engine, upsert_insert
+from ..metrics import MOVIE_VIEWS_PENDING
+from ..models import Movie, MovieViews, PopularMovie, utcnow
+
+SessionFactory = Callable[[], AsyncSession]
+
+# Filas por sentencia al volcar los contadores
+FLUSH_CHUNK = 500
+
+
+async def add_views(session: AsyncSession, counts: Dict[int, int]) -> None:
+    """
+    Suma las visitas a `movieviews` con INSERT ... ON CONFLICT DO UPDATE.
+
+    Las visitas de películas borradas desde que se contaron se descartan: si
+    no, volverían a crear su fila (o violarían la clave ajena).
+    """
+    insert = upsert_insert(session.get_bind().dialect.name)
+    now = utcnow()
+    # En orden de id: dos procesos que vuelcan a la vez bloquean las filas en el mismo orden
+    movie_ids = sorted(counts)
+    for start in range(0, len(movie_ids), FLUSH_CHUNK):
+        chunk = movie_ids[start:start + FLUSH_CHUNK]
+        existing = set((await session.execute(select(Movie.id).where(Movie.id.in_(chunk)))).scalars())
+        rows = [
+            {"movie_id": movie_id, "views": counts[movie_id], "updated_at": now}
+            for movie_id in chunk if movie_id in existing
+        ]
+        if not rows:
+            continue
+        statement = insert(MovieViews).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[MovieViews.movie_id],
+            set_={"views": MovieViews.views + statement.excluded.views, "updated_at": statement.excluded.updated_at}
+        )
+        await session.execute(statement)
+
+
+async def load_popular(session: AsyncSession, size: int) -> List[PopularMovie]:
+    """Las `size` películas con más visitas (las borradas no aparecen)."""
+    result = await session.execute(
+        select(Movie, MovieViews.views)
+        .join(MovieViews, MovieViews.movie_id == Movie.id)
+        .order_by(MovieViews.views.desc(), Movie.id)
+        .limit(size)
+    )
+    return [PopularMovie(**movie.model_dump(), views=views) for movie, views in result.all()]
+
+
+class ViewCounter:
+    """
+    Visitas a las películas con escritura diferida: cada lectura solo suma en
+    un contador en memoria y un bucle vuelca los contadores cada `interval`
+    segundos en un único upsert por lotes. En cada volcado se recalcula el
+    ranking de populares, que se sirve desde memoria. Si el proceso muere se
+    pierden como mucho las visitas de un intervalo; si el volcado falla, se
+    conservan para el siguiente.
+    """
+
+    def __init__(self, interval: Optional[float] = None, size: Optional[int] = None):
+        # Lo que no se indica se toma de la configuración al primer uso
+        self._interval = interval
+        self._size = size
+        self.session_factory: SessionFactory = lambda: AsyncSession(get_engine())
+        self.popular: List[PopularMovie] = []
+        self._counts: Counter = Counter()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def interval(self) -> float:
+        if self._interval is None:
+            self._interval = get_settings().view_flush_interval_seconds
+        return self._interval
+
+    @property
+    def size(self) -> int:
+        if self._size is None:
+            self._size = get_settings().popular_movies_size
+        return self._size
+
+    @property
+    def pending(self) -> int:
+        """Visitas contadas que aún no están en la base de datos."""
+        return sum(self._counts.values())
+
+    def record(self, movie_id: int) -> None:
+        if self.interval <= 0:
+            return
+        self._counts[movie_id] += 1
+        MOVIE_VIEWS_PENDING.inc()
+
+    def top(self, limit: int) -> List[PopularMovie]:
+        return self.popular[:limit]
+
+    async def load(self, session: AsyncSession) -> None:
+        """Carga el ranking de la base de datos (al arrancar y tras cada volcado)."""
+        self.popular = await load_popular(session, self.size)
+
+    async def flush(self) -> int:
+        """Vuelca los contadores y recalcula el ranking. Devuelve cuántas visitas ha escrito."""
+        async with self._flush_lock:
+            counts, self._counts = self._counts, Counter()
+            flushed = sum(counts.values())
+            written = not counts
+            try:
+                async with self.session_factory() as session:
+                    if counts:
+                        await add_views(session, counts)
+                        await session.commit()
+                        written = True
+                        MOVIE_VIEWS_PENDING.dec(flushed)
+                    # Se recalcula aunque no haya visitas nuevas aquí: otros procesos también vuelcan
+                    await self.load(session)
+            except BaseException:
+                # También si se cancela (parada): `stop` las vuelca después
+                if not written:
+                    # Se suman a las que han llegado mientras tanto y se reintentan en el siguiente volcado
+                    self._counts.update(counts)
+                raise
+            return flushed
+
+    def apply_changes(self, changes: List[CatalogChange]) -> None:
+        """Listener de `catalog_events`: el ranking no muestra películas borradas ni datos antiguos."""
+        if not self.popular:
+            return
+        changed = {change.movie_id: change for change in changes}
+        if not any(movie.id in changed for movie in self.popular):
+            return
+        popular = []
+        for movie in self.popular:
+            change = changed.get(movie.id)
+            if change is None:
+                popular.append(movie)
+            elif change.op != "delete":
+                popular.append(PopularMovie.model_validate({**change.data, "views": movie.views}))
+        self.popular = popular
+
+    def reset(self) -> None:
+        MOVIE_VIEWS_PENDING.dec(self.pending)
+        self._counts.clear()
+        self.popular = []
+
+    def start(self) -> None:
+        if self.interval <= 0 or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.create_task(self._loop(), name="view-counter-flush")
+
+    async def stop(self) -> None:
+        """Para el bucle y hace un último volcado para no perder las visitas pendientes."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception(f"Could not flush {self.pending} pending movie views on shutdown")
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception(f"Movie views flush failed ({self.pending} views pending)")
+
+
+view_counter = ViewCounter()
+add_catalog_listener(view_counter.apply_changes)
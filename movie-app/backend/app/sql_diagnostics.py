@@ -0,0 +1,127 @@
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .config import get_settings
+
+_WHITESPACE = re.compile(r"\s+")
+# Las listas IN expandidas cambian de longitud; las colapsamos para agrupar por forma
+_PARAM_LIST = re.compile(r"\((?:\s*(?:\?|%s|\$\d+|:\w+)\s*,)+\s*(?:\?|%s|\$\d+|:\w+)\s*\)")
+
+
+@dataclass
+class QueryStats:
+    """Consultas ejecutadas dentro de una petición (o de una tarea con `track_queries`)."""
+    label: str
+    count: int = 0
+    total_time: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+    reported: set = field(default_factory=set)
+
+    @property
+    def total_ms(self) -> float:
+        return self.total_time * 1000
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Estadísticas SQL de la petición en curso, si la hay."""
+    return _current_stats.get()
+
+
+def statement_shape(statement: str) -> str:
+    """Normaliza una sentencia para agrupar ejecuciones de la misma consulta."""
+    return _PARAM_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+def parameter_shape(parameters, executemany: bool = False) -> str:
+    """Describe los tipos de los parámetros sin exponer sus valores."""
+    if executemany and isinstance(parameters, (list, tuple)) and parameters:
+        return f"{len(parameters)} x {parameter_shape(parameters[0])}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(v).__name__ for v in parameters) + ")"
+    return type(parameters).__name__
+
+
+@contextmanager
+def track_queries(label: str) -> Iterator[QueryStats]:
+    """Agrupa las consultas ejecutadas en el bloque para detectar N+1 fuera de peticiones HTTP."""
+    stats = QueryStats(label=label)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+        _log_summary(stats)
+
+
+def _log_summary(stats: QueryStats) -> None:
+    if stats.count:
+        logger.debug(f"{stats.label}: {stats.count} queries, {stats.total_ms:.1f} ms in database")
+
+
+def install_query_diagnostics(engine: AsyncEngine) -> None:
+    """Registra los hooks de cursor que alimentan el log de consultas lentas y la detección de N+1."""
+    settings = get_settings()
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("diagnostics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("diagnostics_query_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        slow = elapsed * 1000 >= settings.slow_query_threshold_ms
+        stats = _current_stats.get()
+        if not slow and stats is None:
+            return
+
+        shape = statement_shape(statement)
+        if slow:
+            logger.warning(
+                f"Slow query ({elapsed * 1000:.1f} ms): {shape} "
+                f"params={parameter_shape(parameters, executemany)}"
+            )
+        if stats is None:
+            return
+
+        stats.count += 1
+        stats.total_time += elapsed
+        stats.shapes[shape] += 1
+        if stats.shapes[shape] > settings.n_plus_one_threshold and shape not in stats.reported:
+            stats.reported.add(shape)
+            logger.warning(
+                f"Possible N+1 in {stats.label}: statement executed more than "
+                f"{settings.n_plus_one_threshold} times: {shape}"
+            )
+
+
+class QueryDiagnosticsMiddleware:
+    """Middleware ASGI que abre un contexto de estadísticas SQL por petición."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries(f"{scope['method']} {scope['path']}"):
+            await self.app(scope, receive, send)
@@ -0,0 +1,138 @@
+import functools
+import inspect
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional
+
+from fastapi.routing import APIRoute
+from loguru import logger
+
+from .config import get_settings
+from .sql_diagnostics import current_query_stats
+
+
+@dataclass
+class RequestTimings:
+    """Fases con nombre (db, omdb-search, auth, serialize...) medidas durante una petición."""
+    start: float = field(default_factory=time.perf_counter)
+    phases: Dict[str, float] = field(default_factory=dict)
+    endpoint_end: Optional[float] = None
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def snapshot(self) -> Dict[str, float]:
+        """Fases en milisegundos, incluido el tiempo total en base de datos."""
+        phases = {name: seconds * 1000 for name, seconds in self.phases.items()}
+        stats = current_query_stats()
+        if stats is not None and stats.count:
+            phases["db"] = stats.total_ms
+        return phases
+
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current_timings.get()
+
+
+def record_phase(name: str, seconds: float) -> None:
+    """Suma `seconds` a la fase `name` de la petición en curso (si la hay)."""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Mide el bloque como la fase `name`; se puede usar alrededor de `await`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - start)
+
+
+def server_timing_header(phases: Dict[str, float], total_ms: float) -> str:
+    entries = [f"{name};dur={ms:.1f}" for name, ms in phases.items()]
+    entries.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(entries)
+
+
+class TimedRoute(APIRoute):
+    """Ruta que marca cuándo termina el endpoint para medir la serialización de la respuesta."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if inspect.iscoroutinefunction(endpoint):
+            endpoint = _mark_endpoint_end(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _mark_endpoint_end(endpoint):
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            timings = _current_timings.get()
+            if timings is not None:
+                timings.endpoint_end = time.perf_counter()
+    return wrapper
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware ASGI que añade la cabecera Server-Timing y escribe una línea
+    de access log estructurada (JSON) con el desglose de fases.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if timings.endpoint_end is not None:
+                    timings.add("serialize", time.perf_counter() - timings.endpoint_end)
+                if get_settings().server_timing_enabled:
+                    total_ms = (time.perf_counter() - timings.start) * 1000
+                    header = server_timing_header(timings.snapshot(), total_ms)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", header.encode("latin-1"))
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_timings.reset(token)
+            if get_settings().access_log_enabled:
+                _log_access(scope, status_code, timings)
+
+
+def _log_access(scope, status_code: int, timings: RequestTimings) -> None:
+    stats = current_query_stats()
+    entry = {
+        "method": scope["method"],
+        "path": scope["path"],
+        "status": status_code,
+        "duration_ms": round((time.perf_counter() - timings.start) * 1000, 2),
+        "db_queries": stats.count if stats is not None else 0,
+        "phases_ms": {name: round(ms, 2) for name, ms in timings.snapshot().items()},
+        "client": scope["client"][0] if scope.get("client") else None,
+    }
+    logger.bind(access_log=True).info(f"access {json.dumps(entry)}")
@@ -0,0 +1,367 @@
+"""
+Benchmark de carga de la API.
+
+Lanza el simulador de OMDB (`omdb_simulator`) con latencia configurable,
+siembra bases de datos de distintos tamaños y mide latencia (p50/p95/p99) y
+RPS de los endpoints principales, ya sea en proceso (httpx.ASGITransport) o
+sobre un socket real de uvicorn. Los resultados se guardan en JSON para
+comparar ejecuciones.
+
+Uso (desde movie-app/backend):
+
+    python -m benchmarks.run --sizes 1000 100000 --mode asgi --requests 500
+    python -m benchmarks.run --mode uvicorn --omdb-latency-ms 80
+    python -m benchmarks.run --compare benchmarks/results/antes.json benchmarks/results/despues.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from .seed import BENCH_PASSWORD, BENCH_USERNAME, PLOT_WORDS, TITLE_WORDS, fresh_copy
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).parent / "results"
+SCENARIOS = ["list", "get_by_id", "title_search", "title_fuzzy", "suggest", "similar", "plot_search", "create", "login"]
+
+RequestFn = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil con interpolación lineal sobre valores ya ordenados."""
+    if not values:
+        return 0.0
+    rank = (len(values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+async def _wait_until_up(url: str, timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start in {timeout}s")
+
+
+@asynccontextmanager
+async def _process(args: List[str], ready_url: str, env: Optional[dict] = None) -> AsyncIterator[None]:
+    proc = subprocess.Popen(
+        args,
+        cwd=BACKEND_DIR,
+        env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        await _wait_until_up(ready_url)
+        yield
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def omdb_simulator_process(port: int, args: argparse.Namespace):
+    """Arranca el simulador de OMDB en un proceso aparte."""
+    return _process(
+        [sys.executable, "-m", "omdb_simulator", "--port", str(port),
+         "--latency-dist", args.omdb_latency_dist,
+         "--latency-ms", str(args.omdb_latency_ms),
+         "--latency-jitter-ms", str(args.omdb_jitter_ms),
+         "--error-rate", str(args.omdb_error_rate),
+         "--synthesize-missing"],
+        f"http://127.0.0.1:{port}/_simulator/stats"
+    )
+
+
+@asynccontextmanager
+async def asgi_client(database_url: str, omdb_url: str) -> AsyncIterator[httpx.AsyncClient]:
+    """Cliente en proceso contra la app, con sesión y OMDB apuntando al entorno de benchmark."""
+    from loguru import logger
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from app.database import get_session
+    from app.main import app
+    from app.rate_limit import rate_limiter
+    from app.read_routing import get_read_session
+    from app.services.omdb_service import OMDBService, get_omdb_service
+    from app.services.plot_index import plot_index
+    from app.services.title_search import load_title_indexes
+
+    # app.main configura loguru a nivel INFO; en el benchmark solo queremos avisos
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    engine = create_async_engine(database_url)
+    # Sin uvicorn no se ejecuta el startup de la app: cargamos los índices del catálogo aquí
+    async with AsyncSession(engine) as session:
+        await load_title_indexes(session)
+        await plot_index.sync(session)
+
+    async def bench_session():
+        async with AsyncSession(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = bench_session
+    app.dependency_overrides[get_read_session] = bench_session
+    # Todas las peticiones del benchmark vienen del mismo cliente
+    rate_limit_enabled = rate_limiter.enabled
+    rate_limiter.enabled = False
+    app.dependency_overrides[get_omdb_service] = lambda: OMDBService(api_key="bench", base_url=omdb_url)
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            yield client
+    finally:
+        rate_limiter.enabled = rate_limit_enabled
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+
+@asynccontextmanager
+async def uvicorn_client(database_url: str, omdb_url: str) -> AsyncIterator[httpx.AsyncClient]:
+    """Cliente HTTP real contra un proceso uvicorn con la base de benchmark."""
+    port = _free_port()
+    env = {
+        "DATABASE_URL": database_url,
+        "OMDB_BASE_URL": omdb_url,
+        "OMDB_API_KEY": "bench",
+        "GOOGLE_CLOUD_PROJECT": "bench",
+        "RATE_LIMIT_ENABLED": "false"
+    }
+    args = [sys.executable, "-m", "uvicorn", "app.main:app",
+            "--port", str(port), "--log-level", "warning"]
+    base_url = f"http://127.0.0.1:{port}"
+    async with _process(args, f"{base_url}/openapi.json", env):
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            yield client
+
+
+def build_scenarios(size: int) -> Dict[str, RequestFn]:
+    """Peticiones de cada escenario; `i` es el número de petición."""
+    rng = random.Random(size)
+
+    async def list_movies(client, i):
+        skip = rng.randint(0, max(0, min(size, 1000) - 10))
+        return await client.get("/api/v1/movies/", params={"skip": skip, "limit": 10})
+
+    async def get_by_id(client, i):
+        return await client.get(f"/api/v1/movies/{rng.randint(1, size)}")
+
+    async def title_search(client, i):
+        # Los títulos sembrados terminan en su número de fila
+        return await client.get(f"/api/v1/movies/title/{rng.randint(1, size)}")
+
+    async def title_fuzzy(client, i):
+        # Dos palabras comunes con una errata: trigramas poco selectivos, muchos candidatos
+        first, second = rng.sample(TITLE_WORDS, 2)
+        typo = rng.randint(0, len(second) - 2)
+        second = second[:typo] + second[typo + 1] + second[typo] + second[typo + 2:]
+        return await client.get(f"/api/v1/movies/title/{first} {second}")
+
+    async def suggest(client, i):
+        # Prefijos de 1 a 4 letras de las palabras con las que se forman los títulos
+        word = rng.choice(TITLE_WORDS)
+        return await client.get("/api/v1/movies/suggest", params={"prefix": word[:rng.randint(1, 4)]})
+
+    async def similar(client, i):
+        return await client.get(f"/api/v1/movies/{rng.randint(1, size)}/similar")
+
+    async def plot_search(client, i):
+        query = " ".join(rng.sample(PLOT_WORDS, rng.randint(2, 6)))
+        return await client.get("/api/v1/movies/search/plot", params={"q": query})
+
+    async def create(client, i):
+        return await client.post("/api/v1/movies/", json={"title": f"Bench {uuid.uuid4().hex}"})
+
+    async def login(client, i):
+        return await client.post(
+            "/api/v1/token",
+            data={"username": BENCH_USERNAME, "password": BENCH_PASSWORD}
+        )
+
+    return {
+        "list": list_movies,
+        "get_by_id": get_by_id,
+        "title_search": title_search,
+        "title_fuzzy": title_fuzzy,
+        "suggest": suggest,
+        "similar": similar,
+        "plot_search": plot_search,
+        "create": create,
+        "login": login
+    }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    request: RequestFn,
+    requests: int,
+    concurrency: int,
+    warmup: int
+) -> dict:
+    """Ejecuta `requests` peticiones con `concurrency` workers y devuelve estadísticas."""
+    for i in range(warmup):
+        await request(client, i)
+
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                response = await request(client, i)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall_start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "concurrency": concurrency,
+        "wall_s": round(wall, 3),
+        "rps": round(requests / wall, 1) if wall else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    omdb_port = _free_port()
+    omdb_url = f"http://127.0.0.1:{omdb_port}/"
+    client_factory = asgi_client if args.mode == "asgi" else uvicorn_client
+    results = []
+
+    async with omdb_simulator_process(omdb_port, args):
+        for size in args.sizes:
+            database_url = await fresh_copy(size)
+            scenarios = build_scenarios(size)
+            async with client_factory(database_url, omdb_url) as client:
+                for name in args.scenarios:
+                    # bcrypt es caro a propósito: limitamos las peticiones de login
+                    requests = min(args.requests, args.login_requests) if name == "login" else args.requests
+                    stats = await run_scenario(
+                        client, scenarios[name], requests, args.concurrency, args.warmup
+                    )
+                    stats.update({"size": size, "scenario": name})
+                    results.append(stats)
+                    print(
+                        f"{size:>9} {name:<13} rps={stats['rps']:>8} "
+                        f"p50={stats['p50_ms']:>8}ms p95={stats['p95_ms']:>8}ms "
+                        f"p99={stats['p99_ms']:>8}ms errors={stats['errors']}"
+                    )
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_rev": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "mode": args.mode,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "omdb_latency_dist": args.omdb_latency_dist,
+            "omdb_latency_ms": args.omdb_latency_ms,
+            "omdb_jitter_ms": args.omdb_jitter_ms,
+            "omdb_error_rate": args.omdb_error_rate
+        },
+        "results": results
+    }
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline_path: str, candidate_path: str) -> None:
+    """Muestra la variación de RPS y p95 entre dos ficheros de resultados."""
+    def load(path):
+        data = json.loads(Path(path).read_text())
+        return {(r["size"], r["scenario"]): r for r in data["results"]}
+
+    baseline, candidate = load(baseline_path), load(candidate_path)
+    print(f"{'size':>9} {'scenario':<13} {'rps':>18} {'p95 ms':>20}")
+    for key in sorted(baseline.keys() & candidate.keys()):
+        old, new = baseline[key], candidate[key]
+        rps_delta = (new["rps"] - old["rps"]) / old["rps"] * 100 if old["rps"] else 0.0
+        p95_delta = (new["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0.0
+        print(
+            f"{key[0]:>9} {key[1]:<13} {old['rps']:>7}->{new['rps']:<7}({rps_delta:+.0f}%) "
+            f"{old['p95_ms']:>7}->{new['p95_ms']:<7}({p95_delta:+.0f}%)"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de carga de la Movie API")
+    parser.add_argument("--mode", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--login-requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--omdb-latency-dist", default="uniform")
+    parser.add_argument("--omdb-latency-ms", type=float, default=50.0)
+    parser.add_argument("--omdb-jitter-ms", type=float, default=10.0)
+    parser.add_argument("--omdb-error-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="Fichero JSON de resultados")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = asyncio.run(run(args))
+    output = Path(args.output) if args.output else (
+        RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{args.mode}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Siembra bases de datos de benchmark con N películas sintéticas y un usuario.
+
+Las bases SQLite se guardan en `benchmarks/data/` como plantillas que se
+reutilizan entre ejecuciones; cada ejecución trabaja sobre una copia para que
+las escrituras del benchmark no alteren la plantilla.
+
+Uso:
+
+    python -m benchmarks.seed --sizes 1000 100000 1000000
+"""
+import argparse
+import asyncio
+import random
+import shutil
+import time
+from pathlib import Path
+from typing import Iterator, List
+
+from loguru import logger
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel import SQLModel
+
+from app.auth import get_password_hash
+from app.database import add_missing_columns, backfill_year_range
+from app.models import Movie, MovieGenre, User
+from app.services.omdb_service import parse_genres
+
+DATA_DIR = Path(__file__).parent / "data"
+BENCH_USERNAME = "bench"
+BENCH_PASSWORD = "bench-password"
+BATCH_SIZE = 5000
+
+TITLE_WORDS = [
+    "Matrix", "Star", "Lord", "Rings", "Harry", "Potter", "Avengers", "Dark",
+    "Knight", "Return", "Empire", "Galaxy", "Shadow", "River", "Night", "City",
+    "Dream", "Ghost", "Iron", "Silent", "Lost", "Last", "Secret", "Winter",
+    "Summer", "Blade", "Runner", "Space", "Odyssey", "Alien", "Planet", "War"
+]
+PLOT_WORDS = [
+    "hacker", "discovers", "reality", "simulation", "rebellion", "machines",
+    "young", "wizard", "school", "ring", "journey", "heroes", "save", "world",
+    "detective", "city", "crime", "family", "secret", "love", "war", "space",
+    "crew", "planet", "survive", "ghost", "house", "revenge", "escape", "time"
+]
+_GENRES = [
+    "Action", "Adventure", "Animation", "Comedy", "Crime", "Drama", "Fantasy",
+    "Horror", "Mystery", "Romance", "Sci-Fi", "Thriller", "War", "Western"
+]
+_DIRECTORS = [
+    "Lana Wachowski", "Christopher Nolan", "Ridley Scott", "James Cameron",
+    "Greta Gerwig", "Denis Villeneuve", "Kathryn Bigelow", "Bong Joon Ho"
+]
+
+
+def template_path(size: int) -> Path:
+    """Ruta de la plantilla SQLite de benchmark para un tamaño dado."""
+    return DATA_DIR / f"movies_{size}.db"
+
+
+def generate_movies(size: int, seed: int = 42) -> Iterator[dict]:
+    """Genera filas de películas deterministas."""
+    rng = random.Random(seed)
+    for i in range(1, size + 1):
+        title = " ".join(rng.sample(TITLE_WORDS, rng.randint(1, 4)))
+        year = rng.randint(1950, 2024)
+        yield {
+            "id": i,
+            "title": f"{title} {i}",
+            "year": str(year),
+            "year_start": year,
+            "year_end": year,
+            "imdb_id": f"tt{i:08d}",
+            "plot": " ".join(rng.choices(PLOT_WORDS, k=20)).capitalize() + ".",
+            "poster": f"https://example.com/poster/{i}.jpg",
+            "genre": ", ".join(rng.sample(_GENRES, rng.randint(1, 3))),
+            "director": rng.choice(_DIRECTORS),
+            "runtime": rng.randint(70, 200),
+            "imdb_rating": round(rng.uniform(1.0, 9.5), 1),
+            "type": "series" if rng.random() < 0.1 else "movie"
+        }
+
+
+def _batches(rows: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def seed_database(engine: AsyncEngine, size: int) -> None:
+    """Crea las tablas y las rellena hasta `size` películas si hace falta."""
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.run_sync(add_missing_columns)
+        await conn.run_sync(backfill_year_range)
+        current = await conn.scalar(select(func.count()).select_from(Movie))
+        if current == size:
+            logger.info(f"Database already seeded with {size} movies")
+            return
+        if current:
+            raise RuntimeError(
+                f"Database contains {current} movies, expected 0 or {size}"
+            )
+
+    start = time.perf_counter()
+    for batch in _batches(generate_movies(size), BATCH_SIZE):
+        async with engine.begin() as conn:
+            await conn.execute(insert(Movie), batch)
+            await conn.execute(insert(MovieGenre), [
+                {"genre": genre, "movie_id": row["id"]}
+                for row in batch
+                for genre in parse_genres(row["genre"])
+            ])
+
+    async with engine.begin() as conn:
+        user = await conn.scalar(select(User.id).where(User.username == BENCH_USERNAME))
+        if user is None:
+            await conn.execute(insert(User), [{
+                "username": BENCH_USERNAME,
+                "hashed_password": get_password_hash(BENCH_PASSWORD),
+                "is_active": True
+            }])
+
+    logger.info(f"Seeded {size} movies in {time.perf_counter() - start:.1f}s")
+
+
+async def ensure_seeded(size: int) -> Path:
+    """Garantiza que existe la plantilla SQLite de `size` películas y devuelve su ruta."""
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    path = template_path(size)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    try:
+        await seed_database(engine, size)
+    finally:
+        await engine.dispose()
+    return path
+
+
+async def fresh_copy(size: int) -> str:
+    """Copia la plantilla de `size` películas y devuelve la URL de la copia."""
+    template = await ensure_seeded(size)
+    target = DATA_DIR / f"run_movies_{size}.db"
+    shutil.copyfile(template, target)
+    return f"sqlite+aiosqlite:///{target}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Siembra bases de datos de benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        asyncio.run(ensure_seeded(size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+"""
+Simulador local de la API de OMDB.
+
+Sirve búsquedas (`s=`) y detalles (`i=`/`t=`) a partir de un corpus generado,
+con latencia, errores, cuelgues y cuota por API key configurables, para pruebas
+de carga y de resiliencia sin depender de la API real.
+
+Uso (desde movie-app/backend):
+
+    python -m omdb_simulator --port 8765 --latency-dist lognormal --latency-ms 80 --latency-jitter-ms 40
+    OMDB_BASE_URL=http://127.0.0.1:8765/ uvicorn app.main:app
+"""
+from .corpus import Corpus
+from .server import OMDBSimulator, SimulatorConfig, create_app
+
+__all__ = ["Corpus", "OMDBSimulator", "SimulatorConfig", "create_app"]
@@ -0,0 +1,48 @@
+import argparse
+
+import uvicorn
+
+from .server import LATENCY_DISTRIBUTIONS, SimulatorConfig, create_app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulador local de la API de OMDB")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--corpus-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-ms", type=float, default=2000.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--hang-ms", type=float, default=30000.0)
+    parser.add_argument("--quota-per-key", type=int)
+    parser.add_argument("--quota-window-s", type=float, default=86400.0)
+    parser.add_argument("--valid-keys", nargs="+")
+    parser.add_argument("--synthesize-missing", action="store_true")
+    args = parser.parse_args()
+
+    config = SimulatorConfig(
+        corpus_size=args.corpus_size,
+        seed=args.seed,
+        latency_dist=args.latency_dist,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms,
+        error_rate=args.error_rate,
+        hang_rate=args.hang_rate,
+        hang_ms=args.hang_ms,
+        quota_per_key=args.quota_per_key,
+        quota_window_s=args.quota_window_s,
+        valid_keys=set(args.valid_keys) if args.valid_keys else None,
+        synthesize_missing=args.synthesize_missing
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Corpus sintético y determinista de películas con el formato de OMDB."""
+import hashlib
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+PAGE_SIZE = 10
+
+# Incluye los términos que usa `fetch_initial_movies` para que la carga inicial funcione
+_FRANCHISES = ["Matrix", "Star Wars", "Lord of the Rings", "Harry Potter", "Avengers"]
+_WORDS = [
+    "Dark", "Knight", "Return", "Empire", "Galaxy", "Shadow", "River", "Night",
+    "City", "Dream", "Ghost", "Iron", "Silent", "Lost", "Last", "Secret",
+    "Winter", "Summer", "Blade", "Runner", "Space", "Odyssey", "Alien", "Planet"
+]
+_GENRES = [
+    "Action", "Adventure", "Animation", "Comedy", "Crime", "Drama", "Fantasy",
+    "Horror", "Mystery", "Romance", "Sci-Fi", "Thriller"
+]
+_PEOPLE = [
+    "Lana Wachowski", "Lilly Wachowski", "Peter Jackson", "George Lucas",
+    "Chris Columbus", "Joss Whedon", "Keanu Reeves", "Carrie-Anne Moss",
+    "Elijah Wood", "Mark Hamill", "Daniel Radcliffe", "Scarlett Johansson"
+]
+_PLOT_WORDS = [
+    "hacker", "discovers", "reality", "simulation", "rebellion", "machines",
+    "young", "wizard", "school", "ring", "journey", "heroes", "save", "world",
+    "detective", "city", "crime", "family", "secret", "love", "war", "space",
+    "crew", "planet", "survive", "ghost", "house", "revenge", "escape", "time"
+]
+_TYPES = ["movie"] * 8 + ["series", "episode"]
+
+
+def synthetic_imdb_id(title: str) -> str:
+    """imdbID estable para títulos fuera del corpus (10 dígitos, no colisiona con el corpus)."""
+    digest = hashlib.md5(title.lower().encode("utf-8")).hexdigest()
+    return f"tt{int(digest, 16) % 10**10:010d}"
+
+
+def _year(rng: random.Random, movie_type: str) -> str:
+    start = rng.randint(1950, 2024)
+    if movie_type != "series":
+        return str(start)
+    if rng.random() < 0.3:
+        return f"{start}–"
+    return f"{start}–{min(start + rng.randint(1, 8), 2025)}"
+
+
+def build_record(imdb_id: str, title: str, rng: random.Random) -> dict:
+    """Construye un registro de detalle con todos los campos que devuelve OMDB."""
+    movie_type = rng.choice(_TYPES)
+    rating = round(rng.uniform(2.0, 9.5), 1)
+    return {
+        "Title": title,
+        "Year": _year(rng, movie_type),
+        "Rated": rng.choice(["G", "PG", "PG-13", "R", "N/A"]),
+        "Released": f"{rng.randint(1, 28):02d} Mar {rng.randint(1950, 2024)}",
+        "Runtime": f"{rng.randint(70, 200)} min",
+        "Genre": ", ".join(rng.sample(_GENRES, rng.randint(1, 3))),
+        "Director": rng.choice(_PEOPLE),
+        "Writer": ", ".join(rng.sample(_PEOPLE, 2)),
+        "Actors": ", ".join(rng.sample(_PEOPLE, 3)),
+        "Plot": " ".join(rng.choices(_PLOT_WORDS, k=rng.randint(12, 40))).capitalize() + ".",
+        "Language": "English",
+        "Country": rng.choice(["United States", "United Kingdom", "New Zealand"]),
+        "Awards": "N/A",
+        "Poster": f"https://example.com/poster/{imdb_id}.jpg",
+        "Ratings": [{"Source": "Internet Movie Database", "Value": f"{rating}/10"}],
+        "Metascore": str(rng.randint(20, 100)),
+        "imdbRating": str(rating),
+        "imdbVotes": f"{rng.randint(100, 2_000_000):,}",
+        "imdbID": imdb_id,
+        "Type": movie_type,
+        "DVD": "N/A",
+        "BoxOffice": "N/A",
+        "Production": "N/A",
+        "Website": "N/A",
+        "Response": "True"
+    }
+
+
+def summary(record: dict) -> dict:
+    """Entrada reducida que aparece en los resultados de búsqueda (`s=`)."""
+    return {
+        "Title": record["Title"],
+        "Year": record["Year"],
+        "imdbID": record["imdbID"],
+        "Type": record["Type"],
+        "Poster": record["Poster"]
+    }
+
+
+@dataclass
+class Corpus:
+    """Películas indexadas por imdbID, con búsqueda por subcadena de título."""
+    records: Dict[str, dict] = field(default_factory=dict)
+    _order: List[str] = field(default_factory=list)
+
+    @classmethod
+    def generate(cls, size: int, seed: int = 42) -> "Corpus":
+        rng = random.Random(seed)
+        corpus = cls()
+        for i in range(1, size + 1):
+            if i % 5 == 1:
+                base = _FRANCHISES[(i // 5) % len(_FRANCHISES)]
+                title = f"{base}: {' '.join(rng.sample(_WORDS, rng.randint(1, 2)))}"
+            else:
+                title = " ".join(rng.sample(_WORDS, rng.randint(1, 3)))
+            corpus.add(build_record(f"tt{i:07d}", f"{title} {i}", rng))
+        return corpus
+
+    def add(self, record: dict) -> None:
+        if record["imdbID"] not in self.records:
+            self._order.append(record["imdbID"])
+        self.records[record["imdbID"]] = record
+
+    def get(self, imdb_id: str) -> Optional[dict]:
+        return self.records.get(imdb_id)
+
+    def by_title(self, title: str) -> Optional[dict]:
+        needle = title.lower()
+        return next(
+            (self.records[i] for i in self._order if self.records[i]["Title"].lower() == needle),
+            None
+        )
+
+    def search(self, term: str, movie_type: Optional[str] = None, year: Optional[str] = None) -> List[dict]:
+        needle = term.lower()
+        return [
+            record for record in (self.records[i] for i in self._order)
+            if needle in record["Title"].lower()
+            and (movie_type is None or record["Type"] == movie_type)
+            and (year is None or record["Year"].startswith(year))
+        ]
+
+    def __len__(self) -> int:
+        return len(self.records)
@@ -0,0 +1,208 @@
+"""Servidor compatible con OMDB con inyección de latencia, errores y cuota."""
+import asyncio
+import math
+import random
+import time
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, Optional, Set
+
+from fastapi import Body, FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from .corpus import PAGE_SIZE, Corpus, build_record, summary, synthetic_imdb_id
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+
+@dataclass
+class SimulatorConfig:
+    """Parámetros del simulador; todos se pueden cambiar en caliente vía `/_simulator/config`."""
+    corpus_size: int = 1000
+    seed: int = 42
+    # Latencia: `latency_ms` es la media (mediana en lognormal) y `latency_jitter_ms`
+    # la dispersión (semiancho en uniform, desviación en normal, sigma*media en lognormal)
+    latency_dist: str = "fixed"
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    # Cola lenta: una fracción de peticiones tarda `slow_ms` adicionales
+    slow_rate: float = 0.0
+    slow_ms: float = 2000.0
+    # Fallos: errores 5xx y respuestas que se cuelgan `hang_ms` antes de contestar
+    error_rate: float = 0.0
+    hang_rate: float = 0.0
+    hang_ms: float = 30000.0
+    # Cuota por API key; se reinicia cada `quota_window_s` segundos
+    quota_per_key: Optional[int] = None
+    quota_window_s: float = 86400.0
+    # Si se indica, solo estas keys son válidas
+    valid_keys: Optional[Set[str]] = None
+    # Genera una película para búsquedas sin resultados (útil para benchmarks de creación)
+    synthesize_missing: bool = False
+
+    def validate(self) -> None:
+        if self.latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency_dist must be one of {LATENCY_DISTRIBUTIONS}")
+        for name in ("slow_rate", "error_rate", "hang_rate"):
+            if not 0.0 <= getattr(self, name) <= 1.0:
+                raise ValueError(f"{name} must be between 0 and 1")
+
+
+class OMDBSimulator:
+    """Estado del simulador: corpus, cuotas por key y estadísticas."""
+
+    def __init__(self, config: SimulatorConfig):
+        config.validate()
+        self.config = config
+        self.corpus = Corpus.generate(config.corpus_size, config.seed)
+        self.rng = random.Random(config.seed)
+        self.stats: Counter = Counter()
+        self._usage: Dict[str, int] = defaultdict(int)
+        self._window_start = time.monotonic()
+
+    def sample_latency(self) -> float:
+        """Latencia en milisegundos según la distribución configurada."""
+        cfg, rng = self.config, self.rng
+        if cfg.latency_dist == "uniform":
+            delay = rng.uniform(cfg.latency_ms - cfg.latency_jitter_ms, cfg.latency_ms + cfg.latency_jitter_ms)
+        elif cfg.latency_dist == "normal":
+            delay = rng.gauss(cfg.latency_ms, cfg.latency_jitter_ms)
+        elif cfg.latency_dist == "lognormal" and cfg.latency_ms > 0:
+            sigma = cfg.latency_jitter_ms / cfg.latency_ms
+            delay = rng.lognormvariate(math.log(cfg.latency_ms), sigma)
+        elif cfg.latency_dist == "exponential" and cfg.latency_ms > 0:
+            delay = rng.expovariate(1 / cfg.latency_ms)
+        else:
+            delay = cfg.latency_ms
+        if cfg.slow_rate and rng.random() < cfg.slow_rate:
+            delay += cfg.slow_ms
+        return max(0.0, delay)
+
+    def consume_quota(self, api_key: str) -> bool:
+        """Cuenta una petición para la key; devuelve False si ya agotó la cuota."""
+        if self.config.quota_per_key is None:
+            return True
+        if time.monotonic() - self._window_start >= self.config.quota_window_s:
+            self._usage.clear()
+            self._window_start = time.monotonic()
+        if self._usage[api_key] >= self.config.quota_per_key:
+            return False
+        self._usage[api_key] += 1
+        return True
+
+    def reset(self) -> None:
+        self.stats.clear()
+        self._usage.clear()
+        self._window_start = time.monotonic()
+
+    def search(self, term: str, page: int, movie_type: Optional[str], year: Optional[str]) -> dict:
+        if len(term.strip()) < 3:
+            return {"Response": "False", "Error": "Too many results."}
+        matches = self.corpus.search(term, movie_type, year)
+        if not matches and self.config.synthesize_missing:
+            record = build_record(synthetic_imdb_id(term), term, self.rng)
+            self.corpus.add(record)
+            matches = [record]
+        start = (page - 1) * PAGE_SIZE
+        page_items = matches[start:start + PAGE_SIZE]
+        if not page_items:
+            return {"Response": "False", "Error": "Movie not found!"}
+        return {
+            "Search": [summary(record) for record in page_items],
+            "totalResults": str(len(matches)),
+            "Response": "True"
+        }
+
+    def details(self, imdb_id: Optional[str], title: Optional[str]) -> dict:
+        record = self.corpus.get(imdb_id) if imdb_id else self.corpus.by_title(title or "")
+        if record is None:
+            error = "Incorrect IMDb ID." if imdb_id else "Movie not found!"
+            return {"Response": "False", "Error": error}
+        return record
+
+
+def create_app(config: Optional[SimulatorConfig] = None) -> FastAPI:
+    """Crea la aplicación del simulador."""
+    simulator = OMDBSimulator(config or SimulatorConfig())
+    app = FastAPI(title="OMDB Simulator")
+    app.state.simulator = simulator
+
+    @app.get("/")
+    async def omdb(
+        apikey: Optional[str] = None,
+        s: Optional[str] = None,
+        i: Optional[str] = None,
+        t: Optional[str] = None,
+        page: int = 1,
+        type: Optional[str] = None,
+        y: Optional[str] = None,
+        plot: Optional[str] = None
+    ):
+        cfg, rng = simulator.config, simulator.rng
+        simulator.stats["requests"] += 1
+
+        delay = simulator.sample_latency()
+        if cfg.hang_rate and rng.random() < cfg.hang_rate:
+            simulator.stats["hangs"] += 1
+            delay += cfg.hang_ms
+        if delay:
+            await asyncio.sleep(delay / 1000)
+
+        if not apikey:
+            simulator.stats["auth_errors"] += 1
+            return JSONResponse({"Response": "False", "Error": "No API key provided."}, status_code=401)
+        if cfg.valid_keys is not None and apikey not in cfg.valid_keys:
+            simulator.stats["auth_errors"] += 1
+            return JSONResponse({"Response": "False", "Error": "Invalid API key!"}, status_code=401)
+        if not simulator.consume_quota(apikey):
+            simulator.stats["quota_exceeded"] += 1
+            return JSONResponse({"Response": "False", "Error": "Request limit reached!"}, status_code=401)
+        if cfg.error_rate and rng.random() < cfg.error_rate:
+            simulator.stats["errors"] += 1
+            status_code = rng.choice([500, 502, 503])
+            return PlainTextResponse("Service Unavailable", status_code=status_code)
+
+        if s is not None:
+            simulator.stats["search"] += 1
+            return simulator.search(s, max(page, 1), type, y)
+        if i is not None or t is not None:
+            simulator.stats["details"] += 1
+            return simulator.details(i, t)
+        return {"Response": "False", "Error": "Something went wrong."}
+
+    @app.get("/_simulator/stats")
+    async def stats():
+        return {
+            "corpus_size": len(simulator.corpus),
+            "stats": dict(simulator.stats),
+            "quota_usage": dict(simulator._usage)
+        }
+
+    @app.get("/_simulator/config")
+    async def get_config():
+        return asdict(simulator.config)
+
+    @app.put("/_simulator/config")
+    async def update_config(changes: dict = Body(...)):
+        allowed = {f.name for f in fields(SimulatorConfig)} - {"corpus_size", "seed"}
+        unknown = set(changes) - allowed
+        if unknown:
+            raise HTTPException(status_code=422, detail=f"Unknown or read-only fields: {sorted(unknown)}")
+        previous = asdict(simulator.config)
+        for name, value in changes.items():
+            if name == "valid_keys" and value is not None:
+                value = set(value)
+            setattr(simulator.config, name, value)
+        try:
+            simulator.config.validate()
+        except ValueError as e:
+            simulator.config = SimulatorConfig(**previous)
+            raise HTTPException(status_code=422, detail=str(e))
+        return asdict(simulator.config)
+
+    @app.post("/_simulator/reset")
+    async def reset():
+        simulator.reset()
+        return {"message": "Simulator state reset"}
+
+    return app
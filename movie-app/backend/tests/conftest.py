@@ -4,7 +4,13 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from httpx import AsyncClient, ASGITransport
 from typing import AsyncGenerator
 from app.database import get_session
+from app.read_routing import get_read_session
+from app.jobs import job_queue
 from app.main import app
+from app.rate_limit import rate_limiter
+from app.services.plot_index import plot_index
+from app.services.title_search import prefix_index, title_index
+from app.services.views import view_counter
 from loguru import logger
 
 
@@ -64,6 +70,46 @@ async def override_dependencies(test_session: AsyncSession):
     """Sobreescribir dependencias con dependencias de prueba."""
     logger.info("Setting up dependency overrides")
     app.dependency_overrides[get_session] = lambda: test_session
+    app.dependency_overrides[get_read_session] = lambda: test_session
     yield
     logger.info("Clearing dependency overrides")
-    app.dependency_overrides.clear()
\ No newline at end of file
+    app.dependency_overrides.clear()
+
+@pytest.fixture(autouse=True)
+def reset_catalog_indexes():
+    """Vaciar los índices en memoria del catálogo entre tests (cada test usa una base nueva)."""
+    indexes = (title_index, prefix_index, plot_index)
+    for index in indexes:
+        index.clear()
+    yield
+    for index in indexes:
+        index.clear()
+
+
+@pytest.fixture(autouse=True)
+async def test_job_queue(async_engine):
+    """Los trabajos en segundo plano usan la base de prueba; los workers se paran al acabar el test."""
+    original_factory = job_queue.session_factory
+    job_queue.session_factory = lambda: AsyncSession(async_engine, expire_on_commit=False)
+    yield job_queue
+    await job_queue.stop()
+    job_queue.session_factory = original_factory
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limiter():
+    """Cada test empieza con los buckets de los clientes llenos."""
+    rate_limiter.reset()
+    yield
+    rate_limiter.reset()
+
+
+@pytest.fixture(autouse=True)
+async def test_view_counter(async_engine):
+    """Las visitas se vuelcan a la base de prueba; cada test empieza sin visitas ni ranking."""
+    original_factory = view_counter.session_factory
+    view_counter.session_factory = lambda: AsyncSession(async_engine, expire_on_commit=False)
+    view_counter.reset()
+    yield view_counter
+    view_counter.reset()
+    view_counter.session_factory = original_factory
@@ -198,4 +198,120 @@ async def test_delete_movie_not_found(
         "/api/v1/movies/999",
         headers=auth_headers
     )
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+@pytest.fixture
+async def catalog(test_session) -> list:
+    """Fixture con películas con metadatos de OMDB y sus géneros."""
+    from app.services.omdb_service import genre_links
+    movies = [
+        Movie(title="The Matrix", year="1999", imdb_id="tt0133093", genre="Action, Sci-Fi",
+              director="Lana Wachowski", runtime=136, imdb_rating=8.7, type="movie"),
+        Movie(title="Alien", year="1979", imdb_id="tt0078748", genre="Horror, Sci-Fi",
+              director="Ridley Scott", runtime=117, imdb_rating=8.5, type="movie"),
+        Movie(title="Gravity", year="2013", imdb_id="tt1454468", genre="Drama, Sci-Fi, Thriller",
+              director="Alfonso Cuarón", runtime=91, imdb_rating=7.7, type="movie"),
+        Movie(title="Titanic", year="1997", imdb_id="tt0120338", genre="Drama, Romance",
+              director="James Cameron", runtime=194, imdb_rating=7.9, type="movie"),
+        Movie(title="Firefly", year="2002–2003", imdb_id="tt0303461", genre="Adventure, Drama, Sci-Fi",
+              director=None, runtime=44, imdb_rating=None, type="series")
+    ]
+    test_session.add_all(movies)
+    await test_session.flush()
+    for movie in movies:
+        test_session.add_all(genre_links(movie))
+    await test_session.commit()
+    return movies
+
+@pytest.mark.asyncio
+async def test_list_movies_filter_by_genre_sorted_by_rating(client: AsyncClient, catalog):
+    """Test para filtrar por género y ordenar por rating descendente."""
+    response = await client.get(
+        "/api/v1/movies/",
+        params={"genre": "Sci-Fi", "sort": "rating", "order": "desc"}
+    )
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["total"] == 4
+    # Las películas sin rating van al final
+    assert [m["title"] for m in data["items"]] == ["The Matrix", "Alien", "Gravity", "Firefly"]
+
+@pytest.mark.asyncio
+async def test_list_movies_combined_filters(client: AsyncClient, catalog):
+    """Test para combinar filtros de tipo, rating, duración y director."""
+    response = await client.get(
+        "/api/v1/movies/",
+        params={"type": "movie", "min_rating": 7.8, "max_runtime": 150}
+    )
+    data = response.json()
+    assert {m["title"] for m in data["items"]} == {"The Matrix", "Alien"}
+    assert data["total"] == 2
+
+    response = await client.get("/api/v1/movies/", params={"director": "cameron"})
+    assert [m["title"] for m in response.json()["items"]] == ["Titanic"]
+
+@pytest.mark.asyncio
+async def test_list_movies_invalid_sort(client: AsyncClient):
+    """Test para rechazar un campo de ordenación no soportado."""
+    response = await client.get("/api/v1/movies/", params={"sort": "plot"})
+    assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_create_movie_stores_omdb_metadata(client: AsyncClient, test_session, monkeypatch):
+    """Test para verificar que se guardan los metadatos completos de OMDB."""
+    from app.services.omdb_service import OMDBService
+    from app.models import MovieGenre
+    from tests.fixtures.mock_responses import MOCK_MOVIE_DETAILS, MOCK_SEARCH_RESPONSE
+
+    async def mock_search_movies(*args, **kwargs):
+        return MOCK_SEARCH_RESPONSE
+
+    async def mock_get_movie_details(*args, **kwargs):
+        return MOCK_MOVIE_DETAILS
+
+    monkeypatch.setattr(OMDBService, "search_movies", mock_search_movies)
+    monkeypatch.setattr(OMDBService, "get_movie_details", mock_get_movie_details)
+
+    response = await client.post("/api/v1/movies/", json={"title": "The Matrix"})
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["genre"] == "Action, Sci-Fi"
+    assert data["runtime"] == 136
+    assert data["imdb_rating"] == 8.7
+    assert data["type"] == "movie"
+    assert data["extra"]["Actors"].startswith("Keanu Reeves")
+    assert "Title" not in data["extra"]
+
+    result = await test_session.execute(
+        select(MovieGenre.genre).where(MovieGenre.movie_id == data["id"])
+    )
+    assert set(result.scalars().all()) == {"action", "sci-fi"}
+
+    # Al eliminar la película se eliminan sus géneros
+    token = create_access_token(data={"sub": "anyone"})
+    test_session.add(User(username="anyone", hashed_password="x"))
+    await test_session.commit()
+    response = await client.delete(
+        f"/api/v1/movies/{data['id']}",
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 204
+    result = await test_session.execute(select(MovieGenre))
+    assert result.first() is None
+
+@pytest.mark.asyncio
+async def test_list_movies_year_range_sorted_by_year(client: AsyncClient, catalog):
+    """Test para filtrar por rango de años y ordenar por año de estreno."""
+    response = await client.get(
+        "/api/v1/movies/",
+        params={"year_from": 1990, "year_to": 2005, "sort": "year", "order": "desc"}
+    )
+    assert response.status_code == 200
+
+    data = response.json()
+    assert [m["title"] for m in data["items"]] == ["Firefly", "The Matrix", "Titanic"]
+    assert data["items"][0]["year_start"] == 2002
+    assert data["items"][0]["year_end"] == 2003
+    assert data["total"] == 3
@@ -1,8 +1,11 @@
 import pytest
+from datetime import timedelta
+from unittest.mock import patch
 from httpx import AsyncClient
+from jose import jwt
 from sqlmodel import select
 from app.models import User, Movie
-from app.auth import create_access_token, get_password_hash
+from app.auth import TokenDenylist, create_access_token, create_refresh_token, get_password_hash
 
 @pytest.fixture
 async def test_user(test_session) -> User:
@@ -140,4 +143,94 @@ async def test_protected_route_invalid_token(client: AsyncClient, test_movie):
         headers=headers
     )
     assert response.status_code == 401
-    assert "Could not validate credentials" in response.json()["detail"]
\ No newline at end of file
+    assert "Could not validate credentials" in response.json()["detail"]
+
+@pytest.mark.asyncio
+async def test_refresh_token_rotation(client: AsyncClient, test_user, test_movie):
+    """Test para renovar el token de acceso con un refresh token de un solo uso."""
+    login = await client.post("/api/v1/token", data={"username": "testuser", "password": "testpass"})
+    refresh_token = login.json()["refresh_token"]
+
+    with patch("app.auth.verify_password") as verify_password:
+        response = await client.post("/api/v1/token/refresh", json={"refresh_token": refresh_token})
+        # La renovación no pasa por bcrypt
+        verify_password.assert_not_called()
+    assert response.status_code == 200
+    tokens = response.json()
+    assert tokens["refresh_token"] != refresh_token
+
+    # El token antiguo ya no vale; el nuevo sí
+    reused = await client.post("/api/v1/token/refresh", json={"refresh_token": refresh_token})
+    assert reused.status_code == 401
+    renewed = await client.post("/api/v1/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert renewed.status_code == 200
+
+    response = await client.delete(
+        f"/api/v1/movies/{test_movie.id}",
+        headers={"Authorization": f"Bearer {tokens['access_token']}"}
+    )
+    assert response.status_code == 204
+
+@pytest.mark.asyncio
+async def test_refresh_token_is_not_an_access_token(client: AsyncClient, test_user, test_movie):
+    """Test para verificar que un refresh token no sirve como token de acceso, ni al revés."""
+    refresh_token = create_refresh_token(test_user.username)
+    response = await client.delete(
+        f"/api/v1/movies/{test_movie.id}",
+        headers={"Authorization": f"Bearer {refresh_token}"}
+    )
+    assert response.status_code == 401
+
+    access_token = create_access_token(data={"sub": test_user.username})
+    response = await client.post("/api/v1/token/refresh", json={"refresh_token": access_token})
+    assert response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_refresh_token_expired(client: AsyncClient, test_user):
+    """Test para verificar el rechazo de un refresh token caducado."""
+    refresh_token = create_refresh_token(test_user.username, expires_delta=timedelta(seconds=-1))
+    response = await client.post("/api/v1/token/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_refresh_token_keeps_session_expiry(client: AsyncClient, test_user):
+    """Test para verificar que rotar el refresh token no alarga la sesión del login."""
+    login = await client.post("/api/v1/token", data={"username": "testuser", "password": "testpass"})
+    refresh_token = login.json()["refresh_token"]
+    session_expiry = jwt.get_unverified_claims(refresh_token)["exp"]
+
+    for _ in range(2):
+        response = await client.post("/api/v1/token/refresh", json={"refresh_token": refresh_token})
+        assert response.status_code == 200
+        refresh_token = response.json()["refresh_token"]
+        assert jwt.get_unverified_claims(refresh_token)["exp"] == session_expiry
+
+@pytest.mark.asyncio
+async def test_refresh_token_rejected_for_inactive_or_deleted_user(client: AsyncClient, test_session, test_user):
+    """Test para verificar que un usuario desactivado o borrado no puede renovar su sesión."""
+    test_user.is_active = False
+    await test_session.commit()
+    response = await client.post(
+        "/api/v1/token/refresh", json={"refresh_token": create_refresh_token(test_user.username)}
+    )
+    assert response.status_code == 401
+
+    await test_session.delete(test_user)
+    await test_session.commit()
+    response = await client.post(
+        "/api/v1/token/refresh", json={"refresh_token": create_refresh_token(test_user.username)}
+    )
+    assert response.status_code == 401
+
+def test_denylist_evicts_expired_entries():
+    """Test para verificar que el denylist descarta las entradas cuyos tokens ya caducaron."""
+    now = [1000.0]
+    denylist = TokenDenylist(clock=lambda: now[0])
+    denylist.add("a", 1010.0)
+    denylist.add("b", 1020.0)
+    denylist.add("old", 900.0)
+    assert "a" in denylist and len(denylist) == 2
+
+    now[0] = 1015.0
+    assert "a" not in denylist
+    assert len(denylist) == 1
@@ -0,0 +1,127 @@
+import pytest
+from datetime import timedelta
+from httpx import AsyncClient
+from sqlalchemy import insert, update
+from sqlmodel import select
+from app.change_log import compact_change_log
+from app.config import get_settings
+from app.database import backfill_change_log
+from app.models import Movie, MovieChangeLog, utcnow
+from app.services.movie_service import insert_movie
+from app.services.omdb_service import movie_from_details
+from .fixtures.mock_responses import MOCK_MOVIE_DETAILS
+
+
+@pytest.fixture(autouse=True)
+def no_settle(monkeypatch):
+    """Los cambios se sirven en cuanto se hace commit."""
+    monkeypatch.setattr(get_settings(), "change_feed_settle_seconds", 0)
+
+
+async def add_movie(session, title: str, imdb_id: str) -> Movie:
+    movie = Movie(title=title, year="1999", imdb_id=imdb_id)
+    session.add(movie)
+    await session.commit()
+    return movie
+
+
+async def changes(client: AsyncClient, since: int = 0, **params) -> dict:
+    response = await client.get("/api/v1/movies/changes", params={"since": since, **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.asyncio
+async def test_change_feed_creates_updates_and_deletes(client: AsyncClient, test_session):
+    """Verifica que el registro guarda el último cambio de cada película, con bajas como tombstones."""
+    matrix = await add_movie(test_session, "The Matrix", "tt0133093")
+    alien = await add_movie(test_session, "Alien", "tt0078748")
+
+    feed = await changes(client)
+    assert [(c["op"], c["movie"]["title"]) for c in feed["changes"]] == [("create", "The Matrix"), ("create", "Alien")]
+    token = feed["next_since"]
+
+    matrix.plot = "Neo wakes up"
+    await test_session.commit()
+    await test_session.delete(alien)
+    await test_session.commit()
+
+    feed = await changes(client, since=token)
+    assert [(c["op"], c["movie_id"]) for c in feed["changes"]] == [("update", matrix.id), ("delete", alien.id)]
+    assert feed["changes"][0]["movie"]["plot"] == "Neo wakes up"
+    assert feed["changes"][1]["movie"] is None
+
+    # Compactado: una entrada por película
+    entries = (await test_session.execute(select(MovieChangeLog))).scalars().all()
+    assert sorted(entry.movie_id for entry in entries) == sorted([matrix.id, alien.id])
+
+    assert (await changes(client, since=feed["next_since"]))["changes"] == []
+
+
+@pytest.mark.asyncio
+async def test_change_feed_pagination(client: AsyncClient, test_session):
+    """Verifica la paginación con `next_since` y `has_more`."""
+    for i in range(5):
+        await add_movie(test_session, f"Movie {i}", f"tt000000{i}")
+
+    first = await changes(client, limit=3)
+    assert len(first["changes"]) == 3 and first["has_more"]
+    second = await changes(client, since=first["next_since"], limit=3)
+    assert len(second["changes"]) == 2 and not second["has_more"]
+    assert [c["movie"]["title"] for c in first["changes"] + second["changes"]] == [f"Movie {i}" for i in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_change_feed_records_upserts(client: AsyncClient, test_session):
+    """Verifica que las altas con sentencias insert (upsert) también se registran."""
+    movie = await insert_movie(test_session, movie_from_details(MOCK_MOVIE_DETAILS))
+    await test_session.commit()
+
+    feed = await changes(client)
+    assert [(c["op"], c["movie_id"]) for c in feed["changes"]] == [("create", movie.id)]
+
+
+@pytest.mark.asyncio
+async def test_change_feed_waits_for_settle_window(client: AsyncClient, test_session, monkeypatch):
+    """Verifica que los cambios más recientes que la ventana de espera se dejan para la siguiente llamada."""
+    await add_movie(test_session, "The Matrix", "tt0133093")
+    monkeypatch.setattr(get_settings(), "change_feed_settle_seconds", 60)
+
+    feed = await changes(client)
+    assert feed["changes"] == []
+    assert feed["next_since"] == 0
+
+
+@pytest.mark.asyncio
+async def test_compaction_expires_old_tokens(client: AsyncClient, test_session):
+    """Verifica que se borran las bajas antiguas y que un token anterior a ellas da 410."""
+    matrix = await add_movie(test_session, "The Matrix", "tt0133093")
+    alien = await add_movie(test_session, "Alien", "tt0078748")
+    old_token = (await changes(client))["changes"][0]["token"]
+    await test_session.delete(alien)
+    await test_session.commit()
+    await test_session.execute(
+        update(MovieChangeLog).where(MovieChangeLog.op == "delete").values(changed_at=utcnow() - timedelta(days=60))
+    )
+    await test_session.commit()
+
+    assert await compact_change_log(test_session, timedelta(days=30)) == 1
+
+    response = await client.get("/api/v1/movies/changes", params={"since": old_token})
+    assert response.status_code == 410
+    feed = await changes(client)
+    assert [c["movie_id"] for c in feed["changes"]] == [matrix.id]
+
+
+@pytest.mark.asyncio
+async def test_backfill_change_log(test_session):
+    """Verifica que las películas anteriores al registro se dan de alta en él al migrar."""
+    await test_session.execute(insert(Movie).values(title="Old Movie", year="1980", imdb_id="tt0000001"))
+    await test_session.commit()
+    assert (await test_session.execute(select(MovieChangeLog))).first() is None
+
+    connection = await test_session.connection()
+    await connection.run_sync(backfill_change_log)
+    await connection.run_sync(backfill_change_log)
+    entries = (await test_session.execute(select(MovieChangeLog))).scalars().all()
+    assert [(entry.op, entry.movie_id) for entry in entries] == [("create", 1)]
@@ -1,5 +1,7 @@
 import pytest
 import os
+import subprocess
+import sys
 from app.config import Settings
 from pydantic import ValidationError
 
@@ -45,4 +47,19 @@ def test_invalid_configuration(monkeypatch):
         Settings(
             _env_file=None,  # Deshabilitar la carga del archivo .env
             _env_file_encoding=None
-        )
\ No newline at end of file
+        )
+
+
+def test_import_without_environment(tmp_path):
+    """Verifica que la aplicación se importa sin variables de entorno: la configuración se lee al arrancar."""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {key: value for key, value in os.environ.items() if key not in (
+        "DATABASE_URL", "OMDB_API_KEY", "GOOGLE_CLOUD_PROJECT", "SECRET_KEY"
+    )}
+    env["PYTHONPATH"] = backend_dir
+    # Fuera del directorio del backend para que no se lea su .env
+    result = subprocess.run(
+        [sys.executable, "-c", "import app.main"],
+        cwd=tmp_path, env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
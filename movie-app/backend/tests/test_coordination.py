@@ -0,0 +1,82 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.coordination import get_state, lock_file_path, process_lock, set_state
+from app.services.movie_service import SEED_STATE_KEY, seed_catalog
+
+
+@pytest.fixture
+async def file_engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'movies.db'}")
+    yield engine
+    await engine.dispose()
+
+
+def test_lock_file_next_to_database(file_engine, tmp_path):
+    """Verifica que el fichero de bloqueo de SQLite va junto a la base de datos."""
+    assert lock_file_path(file_engine, "startup") == f"{tmp_path / 'movies.db'}.startup.lock"
+
+
+@pytest.mark.asyncio
+async def test_process_lock_is_exclusive(file_engine):
+    """Verifica que un segundo intento sin espera no consigue el bloqueo mientras está tomado."""
+    async with process_lock(file_engine, "startup") as acquired:
+        assert acquired
+        async with process_lock(file_engine, "startup", wait=False) as second:
+            assert not second
+        # Otro nombre es otro bloqueo
+        async with process_lock(file_engine, "other", wait=False) as other:
+            assert other
+
+    async with process_lock(file_engine, "startup", wait=False) as acquired:
+        assert acquired
+
+
+@pytest.mark.asyncio
+async def test_process_lock_waits_for_holder(file_engine):
+    """Verifica que quien espera el bloqueo entra cuando el primero lo suelta."""
+    order = []
+
+    async def holder():
+        async with process_lock(file_engine, "startup"):
+            order.append("first")
+            await asyncio.sleep(0.05)
+            order.append("first done")
+
+    async def waiter():
+        await asyncio.sleep(0.01)
+        async with process_lock(file_engine, "startup"):
+            order.append("second")
+
+    await asyncio.gather(holder(), waiter())
+    assert order == ["first", "first done", "second"]
+
+
+@pytest.mark.asyncio
+async def test_seed_catalog_runs_once(test_session):
+    """Verifica que la carga inicial se registra en la base de datos y no se repite."""
+    omdb_service = AsyncMock()
+    omdb_service.fetch_initial_movies.return_value = 42
+
+    await seed_catalog(test_session, omdb_service)
+    await seed_catalog(test_session, omdb_service)
+
+    omdb_service.fetch_initial_movies.assert_awaited_once()
+    state = await get_state(test_session, SEED_STATE_KEY)
+    assert state["status"] == "done"
+    assert state["movies"] == 42
+
+
+@pytest.mark.asyncio
+async def test_seed_catalog_retries_when_nothing_loaded(test_session):
+    """Verifica que si OMDB no devuelve películas la carga se reintenta en el siguiente arranque."""
+    omdb_service = AsyncMock()
+    omdb_service.fetch_initial_movies.return_value = 0
+
+    await seed_catalog(test_session, omdb_service)
+    assert await get_state(test_session, SEED_STATE_KEY) is None
+
+    await set_state(test_session, SEED_STATE_KEY, {"status": "running"})
+    await seed_catalog(test_session, omdb_service)
+    assert omdb_service.fetch_initial_movies.await_count == 2
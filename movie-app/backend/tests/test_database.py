@@ -138,4 +138,108 @@ async def test_concurrent_sessions(async_engine):
             )
             movies = list(result.scalars().all())
             assert len(movies) == 2
-            assert {m.title for m in movies} == {"Movie 1", "Movie 2"}
\ No newline at end of file
+            assert {m.title for m in movies} == {"Movie 1", "Movie 2"}
+
+@pytest.mark.asyncio
+async def test_add_missing_columns():
+    """Verifica que se añaden las columnas e índices nuevos a una tabla existente."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from app.database import add_missing_columns
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    try:
+        async with engine.begin() as conn:
+            # Esquema anterior de la tabla movie
+            await conn.execute(text(
+                "CREATE TABLE movie (id INTEGER PRIMARY KEY, title VARCHAR NOT NULL, "
+                "year VARCHAR NOT NULL, imdb_id VARCHAR NOT NULL UNIQUE, plot VARCHAR, poster VARCHAR)"
+            ))
+            await conn.execute(text(
+                "INSERT INTO movie (title, year, imdb_id) VALUES ('Old Movie', '1999', 'tt0000001')"
+            ))
+            await conn.run_sync(SQLModel.metadata.create_all)
+            await conn.run_sync(add_missing_columns)
+
+            def describe(connection):
+                inspector = inspect(connection)
+                columns = {c["name"] for c in inspector.get_columns("movie")}
+                indexes = {i["name"] for i in inspector.get_indexes("movie")}
+                return columns, indexes
+
+            columns, indexes = await conn.run_sync(describe)
+            assert {"genre", "director", "runtime", "imdb_rating", "type", "extra"} <= columns
+            assert "ix_movie_type_imdb_rating" in indexes
+
+            row = (await conn.execute(text("SELECT title, runtime FROM movie"))).one()
+            assert row == ("Old Movie", None)
+    finally:
+        await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_add_missing_columns_not_null_default():
+    """Verifica que una columna NOT NULL nueva se añade con el valor por defecto del modelo."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from app.database import add_missing_columns
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    try:
+        async with engine.begin() as conn:
+            # Tabla user de antes de existir is_admin
+            await conn.execute(text(
+                'CREATE TABLE "user" (id INTEGER PRIMARY KEY, username VARCHAR NOT NULL UNIQUE, '
+                "hashed_password VARCHAR NOT NULL, is_active BOOLEAN NOT NULL)"
+            ))
+            await conn.execute(text(
+                "INSERT INTO \"user\" (username, hashed_password, is_active) VALUES ('old', 'hash', 1)"
+            ))
+            await conn.run_sync(SQLModel.metadata.create_all)
+            await conn.run_sync(add_missing_columns)
+
+            def describe(connection):
+                return {c["name"]: c for c in inspect(connection).get_columns("user")}
+
+            columns = await conn.run_sync(describe)
+            assert columns["is_admin"]["nullable"] is False
+
+            user = (await conn.execute(select(User).where(User.username == "old"))).one()
+            assert user.is_admin is False
+    finally:
+        await engine.dispose()
+
+def test_parse_year_range():
+    """Verifica la conversión del año de OMDB a un rango numérico."""
+    from app.models import parse_year_range
+
+    assert parse_year_range("1999") == (1999, 1999)
+    assert parse_year_range("2003–2005") == (2003, 2005)
+    assert parse_year_range("2019–") == (2019, None)
+    assert parse_year_range("N/A") == (None, None)
+
+@pytest.mark.asyncio
+async def test_backfill_year_range(async_engine):
+    """Verifica que se rellenan los años numéricos de las filas existentes."""
+    from app.database import backfill_year_range
+
+    async with async_engine.begin() as conn:
+        await conn.execute(text(
+            "INSERT INTO movie (title, year, imdb_id) VALUES "
+            "('Old Movie', '1999', 'tt0000001'), ('Old Series', '2003–2005', 'tt0000002')"
+        ))
+        assert await conn.run_sync(backfill_year_range) == 2
+        rows = (await conn.execute(text(
+            "SELECT year_start, year_end FROM movie ORDER BY imdb_id"
+        ))).all()
+        assert rows == [(1999, 1999), (2003, 2005)]
+        assert await conn.run_sync(backfill_year_range) == 0
+
+@pytest.mark.asyncio
+async def test_create_db_and_tables_skips_current_schema(async_engine, monkeypatch):
+    """Verifica que el esquema solo se crea o migra cuando cambia su versión."""
+    import app.database as database
+
+    assert await create_db_and_tables(async_engine) is True
+    assert await create_db_and_tables(async_engine) is False
+
+    monkeypatch.setattr(database, "schema_version", lambda: "changed")
+    assert await create_db_and_tables(async_engine) is True
+    assert await create_db_and_tables(async_engine) is False
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import pytest
+from httpx import AsyncClient
+from app.event_bus import EventBus, TooManySubscribers, event_bus
+from app.models import Movie
+
+
+@pytest.fixture(autouse=True)
+def close_event_bus():
+    yield
+    event_bus.close()
+
+
+def parse_events(body: str) -> list:
+    """(evento, datos) de un cuerpo SSE, sin los comentarios."""
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if line and not line.startswith(":"))
+        if fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+async def read_stream(bus: EventBus, subscription, heartbeat: float = 15.0) -> str:
+    return b"".join([chunk async for chunk in bus.stream(subscription, heartbeat)]).decode()
+
+
+@pytest.mark.asyncio
+async def test_fan_out_to_all_subscribers():
+    """Verifica que cada evento llega a todos los suscriptores."""
+    bus = EventBus(max_subscribers=10, queue_size=10)
+    first, second = bus.subscribe(), bus.subscribe()
+    bus.publish("delete", {"movie_id": 1})
+    bus.close()
+
+    for subscription in (first, second):
+        assert parse_events(await read_stream(bus, subscription)) == [("delete", {"movie_id": 1})]
+    assert len(bus) == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_dropped():
+    """Verifica que un suscriptor que no consume se descarta sin afectar al resto."""
+    bus = EventBus(max_subscribers=10, queue_size=2)
+    slow, fast = bus.subscribe(), bus.subscribe()
+    fast_stream = bus.stream(fast)
+    assert await fast_stream.__anext__() == b": connected\n\n"
+
+    for movie_id in range(3):
+        bus.publish("delete", {"movie_id": movie_id})
+        await fast_stream.__anext__()
+
+    assert len(bus) == 1
+    # Recibe lo que llegó a encolar y el aviso de que se ha quedado atrás
+    events = parse_events(await read_stream(bus, slow))
+    assert events[-1] == ("overflow", {})
+    assert len(events) <= 2
+    await fast_stream.aclose()
+    assert len(bus) == 0
+
+
+@pytest.mark.asyncio
+async def test_subscriber_limit():
+    """Verifica el máximo de suscriptores."""
+    bus = EventBus(max_subscribers=1, queue_size=10)
+    bus.subscribe()
+    with pytest.raises(TooManySubscribers):
+        bus.subscribe()
+
+
+@pytest.mark.asyncio
+async def test_heartbeat():
+    """Verifica que sin eventos se envían comentarios para mantener viva la conexión."""
+    bus = EventBus(max_subscribers=1, queue_size=10)
+    stream = bus.stream(bus.subscribe(), heartbeat=0.01)
+    assert await stream.__anext__() == b": connected\n\n"
+    assert await stream.__anext__() == b": ping\n\n"
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_events_endpoint_streams_catalog_changes(client: AsyncClient, test_session):
+    """Verifica que GET /movies/events emite las altas y bajas confirmadas en la base de datos."""
+    request = asyncio.create_task(client.get("/api/v1/movies/events"))
+    while len(event_bus) == 0:
+        await asyncio.sleep(0.01)
+
+    movie = Movie(title="The Matrix", year="1999", imdb_id="tt0133093")
+    test_session.add(movie)
+    await test_session.commit()
+    await test_session.delete(movie)
+    await test_session.commit()
+    event_bus.close()
+
+    response = await request
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_events(response.text)
+    assert [event for event, _ in events] == ["create", "delete"]
+    assert events[0][1]["movie"]["title"] == "The Matrix"
+    assert events[1][1] == {"movie_id": movie.id}
+
+
+@pytest.mark.asyncio
+async def test_events_endpoint_subscriber_limit(client: AsyncClient, monkeypatch):
+    """Verifica que con demasiados suscriptores se responde 503."""
+    monkeypatch.setattr(event_bus, "_max_subscribers", 0)
+    response = await client.get("/api/v1/movies/events")
+    assert response.status_code == 503
@@ -0,0 +1,138 @@
+import asyncio
+import time
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from app import health
+from app.auth import create_access_token
+from app.models import User
+from app.runtime import LoopLagMonitor, ReadinessCheck, pool_status
+
+
+@pytest.fixture
+def health_engine(async_engine, monkeypatch):
+    """Los endpoints de salud usan el motor de la base de prueba y una comprobación sin caché previa."""
+    monkeypatch.setattr(health, "get_engine", lambda: async_engine)
+    monkeypatch.setattr(health, "get_read_engine", lambda: None)
+    health.get_readiness_check.cache_clear()
+    yield async_engine
+    health.get_readiness_check.cache_clear()
+
+
+async def user_headers(session, username: str, is_admin: bool) -> dict:
+    session.add(User(username=username, hashed_password="x", is_admin=is_admin))
+    await session.commit()
+    return {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+
+@pytest.mark.asyncio
+async def test_healthz(client: AsyncClient):
+    """Verifica que la sonda de liveness responde sin dependencias."""
+    response = await client.get("/healthz")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+@pytest.mark.asyncio
+async def test_readyz(client: AsyncClient, health_engine):
+    """Verifica que la sonda de readiness comprueba la base de datos."""
+    response = await client.get("/readyz")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok", "database": "ok"}
+
+
+@pytest.mark.asyncio
+async def test_readiness_check_is_cached(tmp_path):
+    """Verifica que el resultado se reutiliza durante el ttl y que una base caída da no listo."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'movies.db'}")
+    check = ReadinessCheck(ttl=60)
+    try:
+        assert not await check.check(engine)
+        assert check.error
+        (tmp_path / "missing").mkdir()
+        # Sigue sin comprobarse de nuevo hasta que caduque el resultado
+        assert not await check.check(engine)
+        check.ttl = 0
+        assert await check.check(engine)
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_readyz_hides_database_errors(client: AsyncClient, tmp_path, monkeypatch):
+    """Verifica que la sonda responde 503 sin mostrar el error del driver."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'movies.db'}")
+    monkeypatch.setattr(health, "get_engine", lambda: engine)
+    health.get_readiness_check.cache_clear()
+    try:
+        response = await client.get("/readyz")
+        assert response.status_code == 503
+        assert response.json() == {"status": "unavailable", "database": "unavailable"}
+        assert health.get_readiness_check().error
+    finally:
+        health.get_readiness_check.cache_clear()
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_readiness_check_times_out(async_engine, monkeypatch):
+    """Verifica que una base de datos que no responde (pool agotado) da no listo sin bloquear las sondas."""
+    check = ReadinessCheck(ttl=0, timeout=0.05)
+
+    async def hang(engine):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(check, "_ping", hang)
+    start = time.perf_counter()
+    results = await asyncio.gather(check.check(async_engine), check.check(async_engine))
+    assert results == [False, False]
+    assert "no response" in check.error
+    assert time.perf_counter() - start < 1
+
+
+@pytest.mark.asyncio
+async def test_debug_runtime_requires_admin(client: AsyncClient, test_session, health_engine):
+    """Verifica que /debug/runtime exige un usuario administrador."""
+    assert (await client.get("/debug/runtime")).status_code == 401
+
+    headers = await user_headers(test_session, "regular", is_admin=False)
+    assert (await client.get("/debug/runtime", headers=headers)).status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_debug_runtime(client: AsyncClient, test_session, health_engine):
+    """Verifica el contenido del diagnóstico del proceso."""
+    headers = await user_headers(test_session, "admin", is_admin=True)
+    response = await client.get("/debug/runtime", headers=headers)
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["pool"]["primary"]["class"]
+    assert data["pool"]["replica"] is None
+    assert data["tasks"]["total"] >= 1
+    assert data["omdb"]["calls_in_flight"] == 0
+    assert data["jobs"]["pending"] == 0
+    assert set(data["caches"]) >= {"title_index", "prefix_index", "plot_index", "rate_limit_clients"}
+
+
+def test_pool_status_queue_pool(tmp_path):
+    """Verifica los contadores de un pool con tamaño fijo."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'movies.db'}", pool_size=3)
+    status = pool_status(engine)
+    assert status["checkedout"] == 0
+    assert status["size"] == 3
+
+
+@pytest.mark.asyncio
+async def test_loop_lag_monitor_detects_blocking():
+    """Verifica que el monitor detecta código que bloquea el event loop."""
+    monitor = LoopLagMonitor(interval=0.01)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)
+        await asyncio.sleep(0.03)
+    finally:
+        await monitor.stop()
+
+    assert monitor.as_dict()["max_ms"] >= 50
@@ -0,0 +1,163 @@
+import pytest
+from datetime import timedelta
+from unittest.mock import patch
+import httpx
+from httpx import AsyncClient
+from sqlmodel import func, select
+from app.idempotency import IDEMPOTENCY_HEADER, REPLAYED_HEADER
+from app.jobs import job_queue
+from app.models import IdempotencyKey, Movie, utcnow
+from app.services.movie_service import insert_movie
+from app.services.omdb_service import movie_from_details
+from .fixtures.mock_responses import MOCK_MOVIE_DETAILS
+from .test_metrics import sample
+from .test_timing import mock_omdb_client
+
+
+async def count_movies(session) -> int:
+    return await session.scalar(select(func.count()).select_from(Movie))
+
+
+@pytest.mark.asyncio
+async def test_insert_movie_ignores_duplicates(test_session):
+    """Verifica que el upsert inserta la película una vez y devuelve None si ya existe."""
+    movie = await insert_movie(test_session, movie_from_details(MOCK_MOVIE_DETAILS))
+    await test_session.commit()
+    assert movie.id is not None
+    assert movie.year_start == 1999
+
+    assert await insert_movie(test_session, movie_from_details(MOCK_MOVIE_DETAILS)) is None
+    await test_session.commit()
+    assert await count_movies(test_session) == 1
+
+
+@pytest.mark.asyncio
+async def test_create_movie_duplicate(client: AsyncClient):
+    """Verifica que crear una película que ya existe responde 400 con una sola llamada a OMDB (la búsqueda)."""
+    omdb_client = mock_omdb_client()
+    omdb_get = omdb_client.__aenter__.return_value.get
+    with patch("httpx.AsyncClient", return_value=omdb_client):
+        first = await client.post("/api/v1/movies/", json={"title": "The Matrix"})
+        calls = omdb_get.await_count
+        second = await client.post("/api/v1/movies/", json={"title": "The Matrix"})
+
+    assert first.status_code == 200
+    assert second.status_code == 400
+    assert "already exists" in second.json()["detail"]
+    assert omdb_get.await_count == calls + 1
+
+
+@pytest.mark.asyncio
+async def test_idempotency_key_replays_response(client: AsyncClient, test_session):
+    """Verifica que un reintento con la misma clave repite la respuesta sin volver a llamar a OMDB."""
+    headers = {IDEMPOTENCY_HEADER: "create-matrix-1"}
+    hits = sample("cache_requests_total", cache="idempotency", result="hit")
+    omdb_client = mock_omdb_client()
+    with patch("httpx.AsyncClient", return_value=omdb_client):
+        first = await client.post("/api/v1/movies/", json={"title": "The Matrix"}, headers=headers)
+        calls = omdb_client.__aenter__.return_value.get.await_count
+        retry = await client.post("/api/v1/movies/", json={"title": "The Matrix"}, headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers[REPLAYED_HEADER] == "true"
+    assert REPLAYED_HEADER not in first.headers
+    assert omdb_client.__aenter__.return_value.get.await_count == calls
+    assert await count_movies(test_session) == 1
+    assert sample("cache_requests_total", cache="idempotency", result="hit") == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_idempotency_key_replays_errors(client: AsyncClient):
+    """Verifica que también se repiten los errores definitivos (4xx)."""
+    not_found = {"Response": "False", "Error": "Movie not found!"}
+    headers = {IDEMPOTENCY_HEADER: "missing-movie"}
+
+    with patch("app.services.omdb_service.OMDBService.search_movies", return_value=not_found) as search:
+        first = await client.post("/api/v1/movies/", json={"title": "Nothing"}, headers=headers)
+        retry = await client.post("/api/v1/movies/", json={"title": "Nothing"}, headers=headers)
+
+    assert first.status_code == retry.status_code == 404
+    assert retry.json() == {"detail": "Movie not found!"}
+    assert search.await_count == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("search_result, expected_status", [
+    (None, 502),
+    ({"Response": "False", "Error": "Request limit reached!"}, 503),
+])
+async def test_idempotency_key_does_not_store_omdb_outages(client: AsyncClient, search_result, expected_status):
+    """Verifica que un fallo de OMDB no se guarda: el reintento con la misma clave vuelve a consultar OMDB."""
+    headers = {IDEMPOTENCY_HEADER: "omdb-down"}
+
+    with patch("app.services.omdb_service.OMDBService.search_movies", return_value=search_result) as search:
+        first = await client.post("/api/v1/movies/", json={"title": "The Matrix"}, headers=headers)
+    assert first.status_code == expected_status
+
+    with patch("httpx.AsyncClient", return_value=mock_omdb_client()):
+        retry = await client.post("/api/v1/movies/", json={"title": "The Matrix"}, headers=headers)
+    assert search.await_count == 1
+    assert retry.status_code == 200
+    assert REPLAYED_HEADER not in retry.headers
+
+
+@pytest.mark.asyncio
+async def test_details_connection_error_is_bad_gateway(client: AsyncClient, test_session):
+    """Verifica que un error de red al pedir los detalles responde 502 y no se guarda con la clave."""
+    headers = {IDEMPOTENCY_HEADER: "details-down"}
+    with patch("httpx.AsyncClient", return_value=mock_omdb_client()), \
+            patch(
+                "app.services.omdb_service.OMDBService.get_movie_details",
+                side_effect=httpx.ConnectError("connection refused")
+            ):
+        response = await client.post("/api/v1/movies/", json={"title": "The Matrix"}, headers=headers)
+
+    assert response.status_code == 502
+    assert await count_movies(test_session) == 0
+    assert await test_session.get(IdempotencyKey, "details-down") is None
+
+@pytest.mark.asyncio
+async def test_idempotency_key_reused_for_other_request(client: AsyncClient):
+    """Verifica que reutilizar la clave con otro cuerpo responde 422."""
+    headers = {IDEMPOTENCY_HEADER: "reused"}
+    with patch("httpx.AsyncClient", return_value=mock_omdb_client()):
+        await client.post("/api/v1/movies/", json={"title": "The Matrix"}, headers=headers)
+        response = await client.post("/api/v1/movies/", json={"title": "Alien"}, headers=headers)
+
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_idempotency_key_in_progress(client: AsyncClient, test_session):
+    """Verifica que mientras la primera petición sigue en curso el reintento recibe 409, salvo si se abandonó."""
+    headers = {IDEMPOTENCY_HEADER: "in-progress"}
+    with patch("httpx.AsyncClient", return_value=mock_omdb_client()):
+        await client.post("/api/v1/movies/", json={"title": "The Matrix"}, headers=headers)
+        record = await test_session.get(IdempotencyKey, "in-progress")
+        record.status_code, record.body = None, None
+        await test_session.commit()
+
+        response = await client.post("/api/v1/movies/", json={"title": "The Matrix"}, headers=headers)
+        assert response.status_code == 409
+
+        record.created_at = utcnow() - timedelta(minutes=5)
+        await test_session.commit()
+        response = await client.post("/api/v1/movies/", json={"title": "The Matrix"}, headers=headers)
+        # La película ya existe: el reintento la encuentra y la respuesta nueva se guarda
+        assert response.status_code == 400
+        assert REPLAYED_HEADER not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_idempotency_key_async_creation(client: AsyncClient):
+    """Verifica que un reintento de la creación en segundo plano devuelve el mismo trabajo."""
+    headers = {IDEMPOTENCY_HEADER: "async-matrix"}
+    with patch("httpx.AsyncClient", return_value=mock_omdb_client()):
+        first = await client.post("/api/v1/movies/?async=true", json={"title": "The Matrix"}, headers=headers)
+        await job_queue.join()
+        retry = await client.post("/api/v1/movies/?async=true", json={"title": "The Matrix"}, headers=headers)
+
+    assert first.status_code == retry.status_code == 202
+    assert retry.json()["id"] == first.json()["id"]
+    assert retry.headers["location"] == first.headers["location"]
@@ -0,0 +1,162 @@
+import asyncio
+import pytest
+from datetime import timedelta
+from unittest.mock import patch
+from httpx import AsyncClient
+from sqlmodel import select
+from app.jobs import DatabaseJobStore, InMemoryJobStore, JobFailed, JobQueue, JobQueueFull, job_queue
+from app.models import Job, Movie, utcnow
+from .test_timing import mock_omdb_client
+
+
+async def wait_for_job(client: AsyncClient, location: str) -> dict:
+    # Sin sondear mientras el worker trabaja: la base de los tests comparte una
+    # única conexión y el rollback de una sesión deshace lo que hace la otra
+    await job_queue.join()
+    response = await client.get(location)
+    return response.json()
+
+
+@pytest.mark.asyncio
+async def test_create_movie_async(client: AsyncClient, test_session):
+    """Test para crear una película en segundo plano y consultar el trabajo."""
+    with patch("httpx.AsyncClient", return_value=mock_omdb_client()):
+        response = await client.post("/api/v1/movies/?async=true", json={"title": "The Matrix"})
+        assert response.status_code == 202
+        job = response.json()
+        assert job["status"] == "queued"
+        assert response.headers["location"].endswith(f"/api/v1/jobs/{job['id']}")
+
+        job = await wait_for_job(client, f"/api/v1/jobs/{job['id']}")
+
+    assert job["status"] == "succeeded"
+    assert job["result"]["imdb_id"] == "tt0133093"
+    result = await test_session.execute(select(Movie).where(Movie.imdb_id == "tt0133093"))
+    assert result.scalar_one_or_none() is not None
+
+
+@pytest.mark.asyncio
+async def test_create_movie_async_failure(client: AsyncClient):
+    """Test para un trabajo que falla con el mismo error que la petición síncrona."""
+    not_found = {"Response": "False", "Error": "Movie not found!"}
+
+    async def search_movies(*args, **kwargs):
+        return not_found
+
+    with patch("app.services.omdb_service.OMDBService.search_movies", side_effect=search_movies):
+        response = await client.post("/api/v1/movies/?async=true", json={"title": "Nothing"})
+        job = await wait_for_job(client, response.headers["location"])
+
+    assert job["status"] == "failed"
+    assert job["error"] == {"status_code": 404, "detail": "Movie not found!"}
+
+
+@pytest.mark.asyncio
+async def test_job_not_found(client: AsyncClient):
+    """Test para consultar un trabajo inexistente."""
+    response = await client.get("/api/v1/jobs/unknown")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_queue_full(client: AsyncClient, test_job_queue, monkeypatch):
+    """Test para rechazar trabajos cuando la cola está llena."""
+    release = asyncio.Event()
+
+    async def blocked(payload, session, **context):
+        await release.wait()
+
+    queue = JobQueue(workers=1, max_size=1, store=InMemoryJobStore())
+    queue.register("blocked", blocked)
+    await queue.submit("blocked", {})
+    await asyncio.sleep(0.01)  # el worker toma el primero
+    await queue.submit("blocked", {})
+    with pytest.raises(JobQueueFull):
+        await queue.submit("blocked", {})
+    release.set()
+    await queue.join()
+    await queue.stop()
+
+    async def full(*args, **kwargs):
+        raise JobQueueFull()
+
+    monkeypatch.setattr(test_job_queue, "submit", full)
+    response = await client.post("/api/v1/movies/?async=true", json={"title": "The Matrix"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+
+
+@pytest.mark.asyncio
+async def test_queue_full_with_concurrent_submits():
+    """Test para envíos simultáneos con la cola casi llena: los que no caben fallan sin dejar trabajos guardados."""
+    release = asyncio.Event()
+
+    async def blocked(payload, session, **context):
+        await release.wait()
+
+    class SlowStore(InMemoryJobStore):
+        async def create(self, job):
+            await asyncio.sleep(0.01)
+            await super().create(job)
+
+    queue = JobQueue(workers=1, max_size=1, store=SlowStore())
+    queue.register("blocked", blocked)
+    await queue.submit("blocked", {})
+    await asyncio.sleep(0.01)  # el worker toma el primero
+
+    results = await asyncio.gather(*(queue.submit("blocked", {}) for _ in range(3)), return_exceptions=True)
+    assert sum(isinstance(result, Job) for result in results) == 1
+    assert sum(isinstance(result, JobQueueFull) for result in results) == 2
+    assert len(queue.store._jobs) == 2
+
+    release.set()
+    await queue.join()
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_in_memory_store():
+    """Verifica el almacén en memoria y los errores esperados de los trabajos."""
+    async def handler(payload, session, **context):
+        if payload.get("fail"):
+            raise JobFailed(409, "Conflict")
+        return {"echo": payload["value"], "context": context.get("extra")}
+
+    queue = JobQueue(workers=2, max_size=10, store=InMemoryJobStore())
+    queue.register("echo", handler)
+    ok = await queue.submit("echo", {"value": 1}, extra="in-memory")
+    failed = await queue.submit("echo", {"fail": True})
+    await queue.join()
+
+    assert (await queue.store.get(ok.id)).result == {"echo": 1, "context": "in-memory"}
+    assert (await queue.store.get(failed.id)).error == {"status_code": 409, "detail": "Conflict"}
+    assert await queue.store.prune(utcnow() + timedelta(seconds=1)) == 2
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_database_store_recovers_pending_jobs(test_session, test_job_queue):
+    """Verifica que al arrancar se reanudan los trabajos pendientes y los abandonados."""
+    stale = utcnow() - timedelta(hours=1)
+    test_session.add_all([
+        Job(id="pending", kind="echo", payload={"value": 1}),
+        Job(id="abandoned", kind="echo", status="running", payload={"value": 2}, updated_at=stale),
+        Job(id="in-progress", kind="echo", status="running", payload={"value": 3})
+    ])
+    await test_session.commit()
+
+    async def handler(payload, session, **context):
+        return payload["value"]
+
+    # Un solo worker: la base en memoria de los tests comparte una única conexión
+    queue = JobQueue(workers=1, max_size=10)
+    queue.session_factory = test_job_queue.session_factory
+    queue.store = DatabaseJobStore(queue.session_factory)
+    queue.register("echo", handler)
+    await queue.start()
+    await queue.join()
+
+    assert (await queue.store.get("pending")).result == 1
+    assert (await queue.store.get("abandoned")).result == 2
+    assert (await queue.store.get("in-progress")).status == "running"
+    await queue.stop()
@@ -0,0 +1,94 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from httpx import AsyncClient
+from prometheus_client import REGISTRY
+from sqlmodel import select
+from app.metrics import instrument_engine, record_cache_lookup
+from app.models import Movie
+from app.services.omdb_service import OMDBService
+from .fixtures.mock_responses import MOCK_SEARCH_RESPONSE
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_route_latency(client: AsyncClient):
+    """Verifica que /metrics expone la latencia por plantilla de ruta."""
+    labels = {"method": "GET", "route": "/api/v1/movies/{movie_id}", "status": "404"}
+    before = sample("http_request_duration_seconds_count", **labels)
+
+    await client.get("/api/v1/movies/999")
+
+    assert sample("http_request_duration_seconds_count", **labels) == before + 1
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert "http_requests_in_flight" in response.text
+
+
+@pytest.mark.asyncio
+async def test_engine_query_metrics(async_engine, test_session):
+    """Verifica que los eventos del motor cuentan las consultas SQL."""
+    instrument_engine(async_engine)
+    before = sample("db_queries_total", operation="SELECT")
+
+    await test_session.execute(select(Movie))
+
+    assert sample("db_queries_total", operation="SELECT") == before + 1
+    assert sample("db_query_duration_seconds_count", operation="SELECT") > 0
+
+
+@pytest.mark.asyncio
+async def test_omdb_call_metrics():
+    """Verifica que las llamadas a OMDB se cuentan por endpoint y resultado."""
+    service = OMDBService(api_key="test_key")
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = MOCK_SEARCH_RESPONSE
+    mock_client = AsyncMock()
+    mock_client.__aenter__.return_value.get.return_value = mock_response
+
+    before_ok = sample("omdb_requests_total", endpoint="search", outcome="ok")
+    with patch("httpx.AsyncClient", return_value=mock_client):
+        await service.search_movies("Matrix")
+    assert sample("omdb_requests_total", endpoint="search", outcome="ok") == before_ok + 1
+
+    mock_response.status_code = 401
+    mock_response.json.return_value = {"Response": "False", "Error": "Request limit reached!"}
+    before_quota = sample("omdb_requests_total", endpoint="details", outcome="quota_exceeded")
+    with patch("httpx.AsyncClient", return_value=mock_client):
+        assert await service.get_movie_details("tt0133093") is None
+    assert sample("omdb_requests_total", endpoint="details", outcome="quota_exceeded") == before_quota + 1
+
+
+def test_cache_hit_ratio():
+    """Verifica que el ratio de aciertos de caché se actualiza."""
+    record_cache_lookup("test_cache", hit=True)
+    record_cache_lookup("test_cache", hit=False)
+    record_cache_lookup("test_cache", hit=True)
+
+    assert sample("cache_requests_total", cache="test_cache", result="hit") == 2
+    assert sample("cache_hit_ratio", cache="test_cache") == pytest.approx(2 / 3)
+
+
+@pytest.mark.asyncio
+async def test_cache_lookups_are_recorded(client: AsyncClient, test_session):
+    """Verifica que las cachés en memoria registran aciertos y fallos."""
+    test_session.add(Movie(title="The Matrix", year="1999", imdb_id="tt0133093"))
+    await test_session.commit()
+    hits = sample("cache_requests_total", cache="title_index", result="hit")
+    misses = sample("cache_requests_total", cache="title_index", result="miss")
+
+    assert (await client.get("/api/v1/movies/title/The Matrix")).status_code == 200
+    assert (await client.get("/api/v1/movies/title/Nothing like it")).status_code == 404
+
+    assert sample("cache_requests_total", cache="title_index", result="hit") == hits + 1
+    assert sample("cache_requests_total", cache="title_index", result="miss") == misses + 1
+
+    hits = sample("cache_requests_total", cache="readiness", result="hit")
+    misses = sample("cache_requests_total", cache="readiness", result="miss")
+    await client.get("/readyz")
+    await client.get("/readyz")
+    assert sample("cache_requests_total", cache="readiness", result="hit") \
+        + sample("cache_requests_total", cache="readiness", result="miss") == hits + misses + 2
@@ -0,0 +1,101 @@
+import pytest
+import httpx
+from unittest.mock import patch
+from httpx import AsyncClient, ASGITransport
+from omdb_simulator import SimulatorConfig, create_app
+from omdb_simulator.corpus import PAGE_SIZE
+from app.services.omdb_service import OMDBService
+
+SIMULATOR_URL = "http://omdb-simulator/"
+
+
+def simulator_client(config: SimulatorConfig) -> AsyncClient:
+    return AsyncClient(transport=ASGITransport(app=create_app(config)), base_url=SIMULATOR_URL)
+
+
+@pytest.mark.asyncio
+async def test_search_pagination():
+    """Verifica que la búsqueda pagina de 10 en 10 e informa del total."""
+    async with simulator_client(SimulatorConfig(corpus_size=500)) as client:
+        first = (await client.get("/", params={"apikey": "k", "s": "Matrix"})).json()
+        total = int(first["totalResults"])
+        assert first["Response"] == "True"
+        assert total > PAGE_SIZE
+        assert len(first["Search"]) == PAGE_SIZE
+
+        last_page = (total + PAGE_SIZE - 1) // PAGE_SIZE
+        last = (await client.get("/", params={"apikey": "k", "s": "Matrix", "page": last_page})).json()
+        assert len(last["Search"]) == total - (last_page - 1) * PAGE_SIZE
+
+        beyond = (await client.get("/", params={"apikey": "k", "s": "Matrix", "page": last_page + 1})).json()
+        assert beyond == {"Response": "False", "Error": "Movie not found!"}
+
+
+@pytest.mark.asyncio
+async def test_details_by_imdb_id():
+    """Verifica que los detalles incluyen el registro completo del corpus."""
+    async with simulator_client(SimulatorConfig(corpus_size=10)) as client:
+        search = (await client.get("/", params={"apikey": "k", "s": "Matrix"})).json()
+        imdb_id = search["Search"][0]["imdbID"]
+
+        details = (await client.get("/", params={"apikey": "k", "i": imdb_id})).json()
+        assert details["imdbID"] == imdb_id
+        assert {"Genre", "Director", "Runtime", "imdbRating", "Type"} <= details.keys()
+
+        missing = (await client.get("/", params={"apikey": "k", "i": "tt0000000"})).json()
+        assert missing["Error"] == "Incorrect IMDb ID."
+
+
+@pytest.mark.asyncio
+async def test_quota_per_key():
+    """Verifica que al agotar la cuota se responde 'Request limit reached!'."""
+    async with simulator_client(SimulatorConfig(corpus_size=10, quota_per_key=2)) as client:
+        for _ in range(2):
+            response = await client.get("/", params={"apikey": "k1", "s": "Matrix"})
+            assert response.status_code == 200
+
+        response = await client.get("/", params={"apikey": "k1", "s": "Matrix"})
+        assert response.status_code == 401
+        assert response.json()["Error"] == "Request limit reached!"
+
+        # Otra key tiene su propia cuota
+        response = await client.get("/", params={"apikey": "k2", "s": "Matrix"})
+        assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_runtime_config_update():
+    """Verifica que la configuración se puede cambiar en caliente y se valida."""
+    async with simulator_client(SimulatorConfig(corpus_size=10)) as client:
+        response = await client.put("/_simulator/config", json={"error_rate": 1.0})
+        assert response.status_code == 200
+
+        response = await client.get("/", params={"apikey": "k", "s": "Matrix"})
+        assert response.status_code in (500, 502, 503)
+
+        response = await client.put("/_simulator/config", json={"error_rate": 2.0})
+        assert response.status_code == 422
+        config = (await client.get("/_simulator/config")).json()
+        assert config["error_rate"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_omdb_service_against_simulator():
+    """Verifica que OMDBService funciona contra el simulador a través de base_url."""
+    config = SimulatorConfig(corpus_size=50)
+    app = create_app(config)
+    real_client = httpx.AsyncClient
+
+    def client_factory(*args, **kwargs):
+        return real_client(transport=ASGITransport(app=app))
+
+    service = OMDBService(api_key="test_key", base_url=SIMULATOR_URL)
+    with patch("httpx.AsyncClient", side_effect=client_factory):
+        result = await service.search_movies("Matrix")
+        assert result["Response"] == "True"
+
+        details = await service.get_movie_details(result["Search"][0]["imdbID"])
+        assert details["Title"] == result["Search"][0]["Title"]
+
+        config.error_rate = 1.0
+        assert await service.search_movies("Matrix") is None
@@ -0,0 +1,184 @@
+import json
+import numpy as np
+import pytest
+from httpx import AsyncClient
+from app.models import Movie
+from app.services.plot_index import PlotIndex, embed_text, plot_index, stem
+
+
+PLOTS = {
+    "The Matrix": ("A computer hacker learns that reality is a simulation run by machines "
+                   "and joins a rebellion against them.", "Action, Sci-Fi"),
+    "The Matrix Reloaded": ("The rebellion against the machines continues as the hacker "
+                            "fights inside the simulation.", "Action, Sci-Fi"),
+    "Titanic": ("A young aristocrat falls in love with a poor artist aboard the ill-fated "
+                "ship.", "Drama, Romance"),
+    "The Notebook": ("A poor young man falls in love with a rich young woman during the "
+                     "summer.", "Drama, Romance"),
+    "No Plot": (None, "Drama")
+}
+
+
+@pytest.fixture
+async def plot_movies(test_session) -> dict:
+    """Fixture con películas con argumento, por título."""
+    movies = {
+        title: Movie(title=title, year="2000", imdb_id=f"tt{i:07d}", plot=plot, genre=genre)
+        for i, (title, (plot, genre)) in enumerate(PLOTS.items())
+    }
+    test_session.add_all(movies.values())
+    await test_session.commit()
+    return movies
+
+
+def test_embed_text_is_deterministic_and_normalized():
+    """Verifica que los vectores son estables y de norma 1."""
+    a = embed_text("Hackers discover reality is simulated", dim=64)
+    b = embed_text("hackers DISCOVER reality, is simulated!", dim=64)
+    assert np.array_equal(a.indices, b.indices) and np.array_equal(a.values, b.values)
+    assert np.linalg.norm(a.values) == pytest.approx(1.0)
+    assert not embed_text("the and of", dim=64).any()
+
+
+def test_nearest_with_incremental_changes():
+    """Verifica el top-k vectorizado con altas, bajas y exclusiones."""
+    index = PlotIndex(dim=256)
+    index.add(1, embed_text("hacker simulation machines rebellion", dim=256))
+    index.add(2, embed_text("machines rebellion hacker", dim=256))
+    index.add(3, embed_text("love story on a ship", dim=256))
+
+    query = embed_text("hacker machines", dim=256)
+    assert [movie_id for movie_id, _ in index.nearest(query, limit=2)] == [2, 1]
+    assert [movie_id for movie_id, _ in index.nearest(query, exclude={2})] == [1]
+
+    index.remove(2)
+    assert [movie_id for movie_id, _ in index.nearest(query)] == [1]
+    assert 2 not in index
+
+
+def test_snapshot_roundtrip(tmp_path):
+    """Verifica que la instantánea se guarda y se abre con memory-map."""
+    index = PlotIndex(directory=str(tmp_path), dim=64)
+    index.add(1, embed_text("hacker simulation", dim=64))
+    index.add(2, embed_text("love ship", dim=64))
+    index.save_snapshot()
+    index.remove(2)
+
+    reopened = PlotIndex(directory=str(tmp_path), dim=64)
+    assert reopened.open_snapshot()
+    assert isinstance(reopened._base.arrays["col_rows"], np.memmap)
+    assert len(reopened) == 2
+    assert np.array_equal(reopened.vector(1).indices, index.vector(1).indices)
+    assert np.allclose(reopened.vector(1).values, index.vector(1).values)
+
+    # Con otra dimensión la instantánea no es válida
+    assert not PlotIndex(directory=str(tmp_path), dim=32).open_snapshot()
+
+
+@pytest.mark.asyncio
+async def test_sync_with_database(tmp_path, test_session, plot_movies):
+    """Verifica que el arranque vectoriza lo que falta y guarda la instantánea."""
+    index = PlotIndex(directory=str(tmp_path), dim=128)
+    await index.sync(test_session)
+    assert len(index) == 4
+    assert index.pending_changes == 0
+
+    await test_session.delete(plot_movies["Titanic"])
+    await test_session.commit()
+
+    restarted = PlotIndex(directory=str(tmp_path), dim=128)
+    await restarted.sync(test_session)
+    assert len(restarted) == 3
+    assert plot_movies["Titanic"].id not in restarted
+
+
+@pytest.mark.asyncio
+async def test_sync_reembeds_movies_changed_after_snapshot(tmp_path, test_session, plot_movies):
+    """Verifica que al arrancar se vuelven a vectorizar los argumentos cambiados desde la instantánea."""
+    index = PlotIndex(directory=str(tmp_path), dim=128)
+    await index.sync(test_session)
+    generation = json.loads((tmp_path / "meta.json").read_text())["generation"]
+
+    # Cambio sin efecto en el vector: solo avanza `synced_until`, sin reescribir las matrices
+    plot_movies["The Matrix"].imdb_rating = 8.7
+    await test_session.commit()
+    restarted = PlotIndex(directory=str(tmp_path), dim=128)
+    await restarted.sync(test_session)
+    meta = json.loads((tmp_path / "meta.json").read_text())
+    assert meta["generation"] == generation
+    assert meta["synced_until"] is not None
+
+    # El refresco cambia el argumento con el proceso parado: el cambio en memoria se habría perdido
+    titanic = plot_movies["Titanic"]
+    titanic.plot = "A computer hacker joins a rebellion against the machines."
+    await test_session.commit()
+    restarted = PlotIndex(directory=str(tmp_path), dim=128)
+    await restarted.sync(test_session)
+    expected = embed_text(titanic.plot, ["drama", "romance"], dim=128)
+    assert np.array_equal(restarted.vector(titanic.id).indices, expected.indices)
+    assert json.loads((tmp_path / "meta.json").read_text())["generation"] != generation
+
+    # Y queda en la instantánea para los siguientes arranques
+    reopened = PlotIndex(directory=str(tmp_path), dim=128)
+    assert reopened.open_snapshot()
+    assert np.array_equal(reopened.vector(titanic.id).indices, expected.indices)
+
+
+@pytest.mark.asyncio
+async def test_similar_movies_endpoint(client: AsyncClient, plot_movies):
+    """Test para obtener películas similares ordenadas por similitud."""
+    matrix = plot_movies["The Matrix"]
+    response = await client.get(f"/api/v1/movies/{matrix.id}/similar", params={"limit": 2})
+    assert response.status_code == 200
+
+    # Solo se devuelven películas con algo en común
+    data = response.json()
+    assert [m["title"] for m in data] == ["The Matrix Reloaded"]
+    assert 0 < data[0]["score"] <= 1
+
+    titanic = plot_movies["Titanic"]
+    response = await client.get(f"/api/v1/movies/{titanic.id}/similar", params={"limit": 1})
+    assert [m["title"] for m in response.json()] == ["The Notebook"]
+
+
+@pytest.mark.asyncio
+async def test_similar_movies_not_in_index(client: AsyncClient, plot_movies):
+    """Test para películas que el índice no conoce y películas sin argumento."""
+    plot_index.clear()
+    response = await client.get(f"/api/v1/movies/{plot_movies['Titanic'].id}/similar")
+    assert response.status_code == 200
+    assert response.json() == []
+
+    response = await client.get(f"/api/v1/movies/{plot_movies['No Plot'].id}/similar")
+    assert response.json() == []
+
+    response = await client.get("/api/v1/movies/999/similar")
+    assert response.status_code == 404
+
+
+def test_stem_groups_variants():
+    """Verifica que las variantes de una palabra comparten raíz."""
+    assert stem("hackers") == stem("hacker")
+    assert stem("simulated") == stem("simulation") == stem("simulates")
+    assert stem("machines") == stem("machine")
+    assert stem("war") == "war"
+
+
+@pytest.mark.asyncio
+async def test_search_movies_by_plot(client: AsyncClient, plot_movies):
+    """Test para la búsqueda por argumento con texto libre."""
+    response = await client.get(
+        "/api/v1/movies/search/plot",
+        params={"q": "hackers discover reality is simulated"}
+    )
+    assert response.status_code == 200
+
+    data = response.json()
+    assert [m["title"] for m in data] == ["The Matrix", "The Matrix Reloaded"]
+    assert data[0]["score"] > data[1]["score"]
+
+    response = await client.get("/api/v1/movies/search/plot", params={"q": "poor man in love", "limit": 1})
+    assert [m["title"] for m in response.json()] == ["The Notebook"]
+
+    response = await client.get("/api/v1/movies/search/plot", params={"q": "the of and"})
+    assert response.json() == []
@@ -0,0 +1,164 @@
+import asyncio
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.requests import HTTPConnection
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from app.auth import create_access_token
+from app.rate_limit import (
+    AUTH, MAX_RETRY_AFTER, READ, WRITE, Limits, RateLimiter, RateLimitMiddleware, TokenBucket,
+    rate_limiter, request_client, route_category
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_limiter(clock, read=Limits(60, 2, 10), write=Limits(6, 1, 1), auth=Limits(6, 1, 10)) -> RateLimiter:
+    return RateLimiter(limits={READ: read, WRITE: write, AUTH: auth}, enabled=True, clock=clock)
+
+
+def test_token_bucket_refills():
+    """Verifica que el bucket admite la ráfaga y luego una petición por intervalo de recarga."""
+    bucket = TokenBucket(capacity=2, now=0.0)
+    assert bucket.take(rate=1.0, capacity=2, now=0.0) == 0
+    assert bucket.take(rate=1.0, capacity=2, now=0.0) == 0
+    assert bucket.take(rate=1.0, capacity=2, now=0.0) == pytest.approx(1.0)
+    assert bucket.take(rate=1.0, capacity=2, now=0.5) == pytest.approx(0.5)
+    assert bucket.take(rate=1.0, capacity=2, now=1.0) == 0
+
+
+def test_route_category():
+    """Verifica la clasificación de rutas en lectura, escritura y autenticación."""
+    assert route_category("GET", "/api/v1/movies/") == READ
+    assert route_category("POST", "/api/v1/movies/") == WRITE
+    assert route_category("DELETE", "/api/v1/movies/1") == WRITE
+    assert route_category("POST", "/api/v1/token") == AUTH
+    assert route_category("POST", "/api/v1/token/refresh") == AUTH
+    assert route_category("POST", "/api/v1/users/") == AUTH
+    assert route_category("GET", "/metrics") is None
+
+
+def test_request_client_uses_jwt_subject():
+    """Verifica que se identifica al cliente por el usuario del token y, si no, por la IP."""
+    token = create_access_token({"sub": "alice"})
+
+    def connection(authorization=None):
+        headers = [(b"authorization", authorization.encode())] if authorization else []
+        return HTTPConnection({"type": "http", "headers": headers, "client": ("10.0.0.1", 1)})
+
+    assert request_client(connection(f"Bearer {token}")) == "user:alice"
+    assert request_client(connection("Bearer not-a-token")) == "ip:10.0.0.1"
+    assert request_client(connection()) == "ip:10.0.0.1"
+
+
+def limited_app(limiter: RateLimiter, release: asyncio.Event = None) -> Starlette:
+    async def endpoint(request):
+        if release is not None:
+            await release.wait()
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/api/v1/movies/", endpoint, methods=["GET", "POST"])])
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_returns_429_with_retry_after():
+    """Verifica que un cliente que agota su ráfaga recibe 429 hasta que se recarga el bucket."""
+    clock = FakeClock()
+    transport = ASGITransport(app=limited_app(make_limiter(clock)))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.get("/api/v1/movies/")).status_code == 200
+        assert (await client.get("/api/v1/movies/")).status_code == 200
+        response = await client.get("/api/v1/movies/")
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "1"
+
+        # Las escrituras tienen su propio presupuesto
+        assert (await client.post("/api/v1/movies/")).status_code == 200
+
+        clock.now = 1.0
+        assert (await client.get("/api/v1/movies/")).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_zero_rate_caps_retry_after():
+    """Verifica que con un límite de 0 por minuto se rechaza con un Retry-After finito."""
+    limiter = make_limiter(FakeClock(), read=Limits(0, 1, 10))
+    transport = ASGITransport(app=limited_app(limiter))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.get("/api/v1/movies/")).status_code == 200
+        response = await client.get("/api/v1/movies/")
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == str(MAX_RETRY_AFTER)
+
+@pytest.mark.asyncio
+async def test_clients_have_separate_buckets():
+    """Verifica que un cliente que abusa no consume el presupuesto de otro."""
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    for _ in range(2):
+        assert limiter.check(READ, "ip:10.0.0.1") == 0
+    assert limiter.check(READ, "ip:10.0.0.1") > 0
+    assert limiter.check(READ, "ip:10.0.0.2") == 0
+
+
+@pytest.mark.asyncio
+async def test_overload_sheds_with_503():
+    """Verifica que se rechaza con 503 cuando hay demasiadas peticiones en curso."""
+    clock = FakeClock()
+    limiter = make_limiter(clock, write=Limits(600, 100, 1))
+    release = asyncio.Event()
+    transport = ASGITransport(app=limited_app(limiter, release))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        first = asyncio.create_task(client.post("/api/v1/movies/"))
+        await asyncio.sleep(0.01)
+        response = await client.post("/api/v1/movies/")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+
+        release.set()
+        assert (await first).status_code == 200
+    assert limiter.in_flight(WRITE) == 0
+
+
+@pytest.mark.asyncio
+async def test_streams_do_not_hold_concurrency_slots():
+    """Verifica que un stream abierto (SSE) no ocupa hueco de concurrencia."""
+    limiter = make_limiter(FakeClock(), read=Limits(600, 100, 1))
+    release = asyncio.Event()
+    seen = []
+
+    async def events(request):
+        seen.append(limiter.in_flight(READ))
+        await release.wait()
+        return PlainTextResponse("")
+
+    app = Starlette(routes=[Route("/api/v1/movies/events", events)])
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        streams = [asyncio.create_task(client.get("/api/v1/movies/events")) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        release.set()
+        assert [(await stream).status_code for stream in streams] == [200, 200]
+    assert seen == [0, 0]
+
+
+@pytest.mark.asyncio
+async def test_app_rate_limits_login(client: AsyncClient, monkeypatch):
+    """Verifica que la aplicación limita los intentos de login por cliente."""
+    monkeypatch.setattr(rate_limiter, "_limits", {**rate_limiter.limits, AUTH: Limits(1, 2, 10)})
+
+    statuses = [
+        (await client.post("/api/v1/token", data={"username": "nobody", "password": "x"})).status_code
+        for _ in range(3)
+    ]
+    assert statuses == [401, 401, 429]
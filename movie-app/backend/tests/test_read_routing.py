@@ -0,0 +1,113 @@
+import pytest
+import time
+from unittest.mock import patch
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.requests import Request
+import app.read_routing as read_routing
+from app.read_routing import PIN_COOKIE, ReadRouter
+from .test_timing import mock_omdb_client
+
+
+def make_request(client_host: str = "10.0.0.1", cookie: str = "") -> Request:
+    headers = [(b"cookie", cookie.encode())] if cookie else []
+    return Request({"type": "http", "headers": headers, "client": (client_host, 1234)})
+
+
+@pytest.fixture
+async def replica_engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    yield engine
+    await engine.dispose()
+
+
+def make_router(replica, **overrides) -> ReadRouter:
+    options = {"max_lag": 5.0, "check_interval": 0.0, "pin_seconds": 5.0}
+    options.update(overrides)
+    return ReadRouter(replica=replica, **options)
+
+
+@pytest.mark.asyncio
+async def test_reads_use_primary_without_replica():
+    """Verifica que sin réplica configurada todo se lee del primario."""
+    assert await make_router(None).route(make_request()) == (None, "no_replica")
+
+
+@pytest.mark.asyncio
+async def test_reads_use_replica(replica_engine):
+    """Verifica que las lecturas van a la réplica si está al día."""
+    assert await make_router(replica_engine).route(make_request()) == (replica_engine, "replica")
+
+
+@pytest.mark.asyncio
+async def test_read_your_writes_pinning(replica_engine):
+    """Verifica que quien acaba de escribir lee del primario y solo durante la ventana."""
+    router = make_router(replica_engine, pin_seconds=0.05)
+    router.pin("10.0.0.1")
+
+    assert await router.route(make_request("10.0.0.1")) == (None, "pinned")
+    assert (await router.route(make_request("10.0.0.2")))[1] == "replica"
+    time.sleep(0.06)
+    assert (await router.route(make_request("10.0.0.1")))[1] == "replica"
+
+
+@pytest.mark.asyncio
+async def test_pin_cookie(replica_engine):
+    """Verifica que la cookie de pinning manda al primario también desde otros workers."""
+    router = make_router(replica_engine)
+    pinned = make_request(cookie=f"{PIN_COOKIE}={time.time() + 5}")
+    expired = make_request(cookie=f"{PIN_COOKIE}={time.time() - 5}")
+    invalid = make_request(cookie=f"{PIN_COOKIE}=nonsense")
+
+    assert (await router.route(pinned))[1] == "pinned"
+    assert (await router.route(expired))[1] == "replica"
+    assert (await router.route(invalid))[1] == "replica"
+
+
+@pytest.mark.asyncio
+async def test_lagging_replica_falls_back_to_primary(replica_engine, monkeypatch):
+    """Verifica que una réplica retrasada se evita hasta que se pone al día."""
+    router = make_router(replica_engine, max_lag=2.0)
+    monkeypatch.setattr(read_routing, "replica_lag", lambda connection: 10.0)
+    assert await router.route(make_request()) == (None, "lagging")
+
+    monkeypatch.setattr(read_routing, "replica_lag", lambda connection: 0.5)
+    assert (await router.route(make_request()))[1] == "replica"
+
+
+@pytest.mark.asyncio
+async def test_lag_check_is_cached(replica_engine, monkeypatch):
+    """Verifica que el retraso no se consulta en cada petición."""
+    calls = []
+
+    def lag(connection):
+        calls.append(1)
+        return 0.0
+
+    monkeypatch.setattr(read_routing, "replica_lag", lag)
+    router = make_router(replica_engine, check_interval=60.0)
+    for _ in range(5):
+        await router.route(make_request())
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_unreachable_replica_falls_back_to_primary(tmp_path):
+    """Verifica que si la réplica no responde se lee del primario."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    try:
+        assert await make_router(engine).route(make_request()) == (None, "lagging")
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_create_movie_pins_reads(client: AsyncClient, replica_engine, monkeypatch):
+    """Verifica que crear una película deja la cookie de read-your-writes."""
+    monkeypatch.setattr(read_routing, "get_read_router", lambda: make_router(replica_engine))
+
+    with patch("httpx.AsyncClient", return_value=mock_omdb_client()):
+        response = await client.post("/api/v1/movies/", json={"title": "The Matrix"})
+
+    assert response.status_code == 200
+    assert float(response.cookies[PIN_COOKIE]) > time.time()
@@ -0,0 +1,163 @@
+import copy
+import pytest
+from datetime import timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+from app.models import Movie, MovieGenre, utcnow
+from app.services.omdb_service import genre_links, movie_from_details
+from app.services.refresher import MovieRefresher, refresh_batch
+from app.services.title_search import load_title_indexes, title_index
+from .fixtures.mock_responses import MOCK_MOVIE_DETAILS
+
+
+class FakeOMDB:
+    """Devuelve los detalles configurados por imdb_id y cuenta las llamadas."""
+
+    def __init__(self, details):
+        self.details = details
+        self.calls = []
+
+    async def get_movie_details(self, imdb_id):
+        self.calls.append(imdb_id)
+        return self.details.get(imdb_id)
+
+
+def details_for(imdb_id, **changes):
+    details = copy.deepcopy(MOCK_MOVIE_DETAILS)
+    details.update({"imdbID": imdb_id, "Title": f"Movie {imdb_id}", **changes})
+    return details
+
+
+async def add_movies(session, imdb_ids, fetched_days_ago=None):
+    for index, imdb_id in enumerate(imdb_ids):
+        movie = movie_from_details(details_for(imdb_id))
+        movie.source_fetched_at = (
+            None if fetched_days_ago is None else utcnow() - timedelta(days=fetched_days_ago[index])
+        )
+        session.add(movie)
+        await session.flush()
+        session.add_all(genre_links(movie))
+    await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_refresh_updates_only_changed_movies(test_session):
+    """Verifica que solo se reescriben las películas que cambian en OMDB."""
+    await add_movies(test_session, ["tt1", "tt2"], fetched_days_ago=[40, 40])
+    before = {m.imdb_id: m.updated_at for m in (await test_session.execute(select(Movie))).scalars()}
+    omdb = FakeOMDB({
+        "tt1": details_for("tt1", imdbRating="9.1", Genre="Drama"),
+        "tt2": details_for("tt2"),
+    })
+
+    stats = await refresh_batch(test_session, omdb, utcnow() - timedelta(days=30), limit=10)
+
+    assert (stats.checked, stats.changed, stats.failed) == (2, 1, 0)
+    movies = {m.imdb_id: m for m in (await test_session.execute(select(Movie))).scalars()}
+    assert movies["tt1"].imdb_rating == 9.1
+    assert movies["tt1"].updated_at > before["tt1"]
+    assert movies["tt2"].updated_at == before["tt2"]
+    # Todas quedan contrastadas, cambien o no
+    assert all(m.source_fetched_at > utcnow() - timedelta(minutes=1) for m in movies.values())
+    genres = await test_session.execute(
+        select(MovieGenre.genre).where(MovieGenre.movie_id == movies["tt1"].id)
+    )
+    assert genres.scalars().all() == ["drama"]
+
+
+@pytest.mark.asyncio
+async def test_refresh_ignores_volatile_omdb_fields(test_session):
+    """Verifica que los votos o el Metascore por sí solos no reescriben la película."""
+    await add_movies(test_session, ["tt1", "tt2"], fetched_days_ago=[40, 40])
+    before = {m.imdb_id: m.updated_at for m in (await test_session.execute(select(Movie))).scalars()}
+    omdb = FakeOMDB({
+        "tt1": details_for("tt1", imdbVotes="1,900,000", Metascore="75"),
+        "tt2": details_for("tt2", imdbVotes="1,900,000", Awards="Won 5 Oscars"),
+    })
+
+    stats = await refresh_batch(test_session, omdb, utcnow() - timedelta(days=30), limit=10)
+
+    assert (stats.checked, stats.changed) == (2, 1)
+    movies = {m.imdb_id: m for m in (await test_session.execute(select(Movie))).scalars()}
+    assert movies["tt1"].updated_at == before["tt1"]
+    assert movies["tt1"].extra["imdbVotes"] == details_for("tt1")["imdbVotes"]
+    # Si cambia otra cosa se guardan también los volátiles
+    assert movies["tt2"].extra["Awards"] == "Won 5 Oscars"
+    assert movies["tt2"].extra["imdbVotes"] == "1,900,000"
+
+
+@pytest.mark.asyncio
+async def test_refresh_walks_stalest_first(test_session):
+    """Verifica que se contrastan primero las nunca refrescadas y luego las más antiguas."""
+    await add_movies(test_session, ["tt1", "tt2", "tt3"], fetched_days_ago=[35, 90, 1])
+    await add_movies(test_session, ["tt4"])
+    omdb = FakeOMDB({imdb_id: details_for(imdb_id) for imdb_id in ("tt1", "tt2", "tt3", "tt4")})
+
+    await refresh_batch(test_session, omdb, utcnow() - timedelta(days=30), limit=10)
+
+    # tt3 es reciente y no se consulta
+    assert omdb.calls == ["tt4", "tt2", "tt1"]
+
+
+@pytest.mark.asyncio
+async def test_refresh_respects_budget(async_engine, test_session):
+    """Verifica que una pasada no supera el presupuesto de llamadas a OMDB."""
+    imdb_ids = [f"tt{i}" for i in range(7)]
+    await add_movies(test_session, imdb_ids)
+    omdb = FakeOMDB({imdb_id: details_for(imdb_id) for imdb_id in imdb_ids})
+    refresher = MovieRefresher(interval=0, max_age=timedelta(days=30), batch_size=2, budget=5)
+    refresher.session_factory = lambda: AsyncSession(async_engine, expire_on_commit=False)
+
+    stats = await refresher.run_once(omdb)
+    assert stats.checked == 5
+    assert len(omdb.calls) == 5
+
+    # La siguiente pasada sigue por las que faltan
+    stats = await refresher.run_once(omdb)
+    assert stats.checked == 2
+    assert sorted(omdb.calls) == sorted(imdb_ids)
+
+
+@pytest.mark.asyncio
+async def test_refresh_aborts_when_omdb_fails(test_session):
+    """Verifica que se abandona la pasada tras varios fallos seguidos de OMDB."""
+    await add_movies(test_session, [f"tt{i}" for i in range(5)])
+    omdb = FakeOMDB({})
+
+    stats = await refresh_batch(test_session, omdb, utcnow() - timedelta(days=30), limit=10)
+
+    assert stats.aborted
+    assert len(omdb.calls) == 3
+    # Las que fallan siguen caducadas: la siguiente pasada las vuelve a pedir
+    movies = (await test_session.execute(select(Movie))).scalars().all()
+    assert all(movie.source_fetched_at is None for movie in movies)
+
+
+@pytest.mark.asyncio
+async def test_refresh_retries_failures_in_next_pass_only(async_engine, test_session):
+    """Verifica que una película que falla no se vuelve a pedir en la misma pasada pero sí en la siguiente."""
+    await add_movies(test_session, ["tt1", "tt2", "tt3"])
+    omdb = FakeOMDB({"tt2": details_for("tt2"), "tt3": details_for("tt3")})
+    refresher = MovieRefresher(interval=0, max_age=timedelta(days=30), batch_size=1, budget=10)
+    refresher.session_factory = lambda: AsyncSession(async_engine, expire_on_commit=False)
+
+    stats = await refresher.run_once(omdb)
+    assert (stats.checked, stats.failed) == (3, 1)
+    assert omdb.calls == ["tt1", "tt2", "tt3"]
+
+    omdb.details["tt1"] = details_for("tt1")
+    stats = await refresher.run_once(omdb)
+    assert (stats.checked, stats.failed) == (1, 0)
+    assert omdb.calls[3:] == ["tt1"]
+
+
+@pytest.mark.asyncio
+async def test_refresh_updates_title_index(test_session):
+    """Verifica que un título cambiado en OMDB llega a los índices en memoria."""
+    await add_movies(test_session, ["tt1"])
+    await load_title_indexes(test_session)
+    omdb = FakeOMDB({"tt1": details_for("tt1", Title="Completely Renamed")})
+
+    await refresh_batch(test_session, omdb, utcnow(), limit=10)
+
+    assert title_index.search("Completely Renamed")[0].title == "Completely Renamed"
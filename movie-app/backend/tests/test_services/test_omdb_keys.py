@@ -0,0 +1,76 @@
+import pytest
+import httpx
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from httpx import ASGITransport
+from prometheus_client import REGISTRY
+from omdb_simulator import SimulatorConfig, create_app
+from app.services.omdb_keys import OMDBKeyPool, key_label, parse_api_keys
+from app.services.omdb_service import OMDBService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = datetime(2025, 2, 10, 12, 0, tzinfo=timezone.utc)
+
+    def __call__(self):
+        return self.now
+
+
+def test_parse_api_keys():
+    """Verifica que se aceptan varias keys separadas por comas."""
+    assert parse_api_keys("key1, key2,,key1") == ["key1", "key2"]
+    assert parse_api_keys("") == []
+
+
+def test_pool_rotates_and_disables_exhausted_keys():
+    """Verifica que se alternan las keys, se salta la agotada y se reactiva al día siguiente."""
+    clock = FakeClock()
+    pool = OMDBKeyPool(["key-a", "key-b"], daily_quota=3, clock=clock)
+
+    assert [pool.acquire() for _ in range(4)] == ["key-a", "key-b", "key-a", "key-b"]
+
+    pool.exhausted("key-a")
+    assert [pool.acquire() for _ in range(2)] == ["key-b", None]
+    assert pool.status()["0"] == {"used": 2, "remaining": 0, "exhausted": True}
+
+    clock.now += timedelta(days=1)
+    assert pool.acquire() == "key-a"
+    assert pool.status()["1"]["remaining"] == 3
+
+
+def test_pool_quota_metric():
+    """Verifica que la cuota restante de cada key se expone como métrica sin mostrar la key."""
+    pool = OMDBKeyPool(["abcdef123456"], daily_quota=10)
+    label = key_label(0)
+    assert label == "0"
+
+    pool.acquire()
+    assert REGISTRY.get_sample_value("omdb_key_quota_remaining", {"key": label}) == 9
+    pool.exhausted("abcdef123456")
+    assert REGISTRY.get_sample_value("omdb_key_quota_remaining", {"key": label}) == 0
+
+
+@pytest.mark.asyncio
+async def test_service_fails_over_to_next_key():
+    """Verifica que cuando OMDB rechaza una key por cuota se repite la llamada con otra."""
+    app = create_app(SimulatorConfig(corpus_size=10, quota_per_key=2))
+    real_client = httpx.AsyncClient
+
+    def client_factory(*args, **kwargs):
+        return real_client(transport=ASGITransport(app=app))
+
+    service = OMDBService(api_key="k1,k2", base_url="http://omdb-simulator/")
+    with patch("httpx.AsyncClient", side_effect=client_factory):
+        # Otro proceso ya gastó la cuota de k1
+        async with client_factory() as client:
+            for _ in range(2):
+                await client.get("http://omdb-simulator/", params={"apikey": "k1", "s": "Matrix"})
+
+        assert (await service.search_movies("Matrix"))["Response"] == "True"
+        assert service.key_pool.status()["0"]["exhausted"]
+
+        assert (await service.search_movies("Matrix"))["Response"] == "True"
+        # Ambas agotadas: la llamada falla sin reintentar más
+        assert await service.search_movies("Matrix") is None
+        assert service.key_pool.acquire() is None
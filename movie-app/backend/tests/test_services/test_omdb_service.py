@@ -1,5 +1,6 @@
 import pytest
 import asyncio
+from contextlib import aclosing
 from unittest.mock import AsyncMock, patch, MagicMock
 import httpx
 from app.services.omdb_service import OMDBService
@@ -155,4 +156,86 @@ async def test_fetch_initial_movies_db_not_empty(omdb_service, test_session):
             assert len(movies) == 1
             
         except asyncio.TimeoutError:
-            pytest.fail("fetch_initial_movies timed out after 5 seconds")
\ No newline at end of file
+            pytest.fail("fetch_initial_movies timed out after 5 seconds")
+
+def test_movie_from_details():
+    from app.services.omdb_service import movie_from_details, parse_genres
+
+    movie = movie_from_details(MOCK_MOVIE_DETAILS)
+    assert movie.title == "The Matrix"
+    assert movie.genre == "Action, Sci-Fi"
+    assert movie.director == "Lana Wachowski, Lilly Wachowski"
+    assert movie.runtime == 136
+    assert movie.imdb_rating == 8.7
+    assert movie.type == "movie"
+    assert movie.extra["Ratings"][0]["Value"] == "8.7/10"
+    assert movie.extra["Website"] == "N/A"
+    assert "Plot" not in movie.extra
+
+    unknown = movie_from_details({
+        "Title": "Unknown", "Year": "2024", "imdbID": "tt0000001",
+        "Runtime": "N/A", "imdbRating": "N/A", "Genre": "N/A", "Poster": "N/A"
+    })
+    assert unknown.runtime is None
+    assert unknown.imdb_rating is None
+    assert unknown.poster is None
+    assert parse_genres(unknown.genre) == []
+    assert parse_genres("Drama, Sci-Fi, drama") == ["drama", "sci-fi"]
+
+def paged_search(total: int, delay: float = 0.0, calls: list = None, active: list = None):
+    """search_movies simulado: `total` resultados en páginas de 10, con un retraso por llamada."""
+    async def search(term, page=1):
+        if calls is not None:
+            calls.append(page)
+        if active is not None:
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            if active is not None:
+                active[0] -= 1
+        start = (page - 1) * 10
+        return {
+            "Search": [{"imdbID": f"tt{i:07d}", "Title": f"Movie {i}"} for i in range(start, min(start + 10, total))],
+            "totalResults": str(total),
+            "Response": "True"
+        }
+    return search
+
+@pytest.mark.asyncio
+async def test_iter_search_all_pages_concurrently(omdb_service):
+    """Verifica que se recorren todas las páginas en orden, pidiendo el resto a la vez con un límite."""
+    active = [0, 0]
+    with patch.object(omdb_service, "search_movies", side_effect=paged_search(45, delay=0.05, active=active)):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        results = [movie["imdbID"] async for movie in omdb_service.iter_search("Matrix", concurrency=4)]
+        elapsed = loop.time() - start
+
+    assert results == [f"tt{i:07d}" for i in range(45)]
+    # Página 1 y luego las 4 restantes en paralelo: unas dos idas y vueltas, no cinco
+    assert elapsed < 0.2
+    assert active[1] == 4
+
+@pytest.mark.asyncio
+async def test_iter_search_respects_max_pages_and_stops_early(omdb_service):
+    """Verifica el límite de páginas y que al dejar de iterar no se piden más páginas."""
+    calls = []
+    with patch.object(omdb_service, "search_movies", side_effect=paged_search(1000, calls=calls)):
+        results = [movie async for movie in omdb_service.iter_search("Matrix", max_pages=3)]
+        assert len(results) == 30
+
+        calls.clear()
+        async with aclosing(omdb_service.iter_search("Matrix", concurrency=2)) as search:
+            async for movie in search:
+                break
+    # La primera página y, como mucho, las dos que ya se habían pedido por adelantado
+    assert calls[0] == 1
+    assert len(calls) <= 3
+
+@pytest.mark.asyncio
+async def test_iter_search_no_results(omdb_service):
+    """Verifica que una búsqueda sin resultados no produce nada."""
+    with patch.object(omdb_service, "search_movies", return_value=MOCK_ERROR_RESPONSE):
+        assert [movie async for movie in omdb_service.iter_search("Nothing")] == []
@@ -0,0 +1,64 @@
+import pytest
+from loguru import logger
+from sqlmodel import select
+from app.config import get_settings
+from app.models import Movie
+from app.sql_diagnostics import (
+    install_query_diagnostics,
+    parameter_shape,
+    statement_shape,
+    track_queries
+)
+
+
+@pytest.fixture
+def captured_logs():
+    """Captura los mensajes de loguru emitidos durante el test."""
+    messages = []
+    handler_id = logger.add(lambda message: messages.append(message.record["message"]), level="DEBUG")
+    yield messages
+    logger.remove(handler_id)
+
+
+def test_statement_shape_collapses_in_lists():
+    """Verifica que las listas IN de distinta longitud comparten forma."""
+    short = statement_shape("SELECT * FROM movie\n WHERE id IN (?, ?)")
+    long = statement_shape("SELECT * FROM movie WHERE id IN (?, ?, ?, ?)")
+    assert short == long == "SELECT * FROM movie WHERE id IN (?)"
+
+
+def test_parameter_shape_hides_values():
+    """Verifica que solo se registran los tipos de los parámetros."""
+    assert parameter_shape(("tt0133093", 10)) == "(str, int)"
+    assert parameter_shape({"imdb_id": "tt0133093"}) == "{imdb_id: str}"
+    assert parameter_shape([("a",), ("b",)], executemany=True) == "2 x (str)"
+
+
+@pytest.mark.asyncio
+async def test_n_plus_one_detection(async_engine, test_session, captured_logs, monkeypatch):
+    """Verifica que se avisa cuando la misma consulta se repite más del umbral."""
+    install_query_diagnostics(async_engine)
+    monkeypatch.setattr(get_settings(), "n_plus_one_threshold", 3)
+
+    with track_queries("test loop") as stats:
+        for i in range(5):
+            await test_session.execute(select(Movie).where(Movie.imdb_id == f"tt{i:07d}"))
+
+    assert stats.count == 5
+    assert stats.total_time > 0
+    warnings = [m for m in captured_logs if m.startswith("Possible N+1 in test loop")]
+    assert len(warnings) == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_query_log(async_engine, test_session, captured_logs, monkeypatch):
+    """Verifica que las consultas que superan el umbral se registran con la forma de sus parámetros."""
+    install_query_diagnostics(async_engine)
+    monkeypatch.setattr(get_settings(), "slow_query_threshold_ms", 0.0)
+
+    await test_session.execute(select(Movie).where(Movie.imdb_id == "tt0133093"))
+
+    slow = [m for m in captured_logs if m.startswith("Slow query")]
+    assert slow
+    assert "tt0133093" not in slow[0]
+    assert "(str" in slow[0]
@@ -0,0 +1,74 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from httpx import AsyncClient
+from loguru import logger
+from app.auth import get_password_hash
+from app.models import User
+from app.sql_diagnostics import install_query_diagnostics
+from app.timing import server_timing_header
+from .fixtures.mock_responses import MOCK_MOVIE_DETAILS, MOCK_SEARCH_RESPONSE
+
+
+def parse_server_timing(header: str) -> dict:
+    phases = {}
+    for entry in header.split(","):
+        name, dur = entry.strip().split(";dur=")
+        phases[name] = float(dur)
+    return phases
+
+
+def mock_omdb_client() -> AsyncMock:
+    """Cliente httpx simulado que responde a búsquedas y detalles según los parámetros."""
+    async def get(url, params=None):
+        response = MagicMock()
+        response.status_code = 200
+        response.json.return_value = MOCK_SEARCH_RESPONSE if "s" in params else MOCK_MOVIE_DETAILS
+        return response
+
+    mock_client = AsyncMock()
+    mock_client.__aenter__.return_value.get.side_effect = get
+    return mock_client
+
+
+def test_server_timing_header_format():
+    """Verifica el formato de la cabecera Server-Timing."""
+    header = server_timing_header({"db": 1.234, "omdb-search": 20.0}, 30.0)
+    assert header == "db;dur=1.2, omdb-search;dur=20.0, total;dur=30.0"
+
+
+@pytest.mark.asyncio
+async def test_create_movie_phase_breakdown(client: AsyncClient, async_engine):
+    """Verifica que POST /movies/ desglosa OMDB, upsert, commit y serialización."""
+    install_query_diagnostics(async_engine)
+
+    with patch("httpx.AsyncClient", return_value=mock_omdb_client()):
+        response = await client.post("/api/v1/movies/", json={"title": "The Matrix"})
+
+    assert response.status_code == 200
+    phases = parse_server_timing(response.headers["server-timing"])
+    for name in ("omdb-search", "omdb-details", "upsert", "commit", "db", "serialize", "total"):
+        assert name in phases, f"Missing phase {name}"
+    assert phases["total"] >= phases["omdb-search"]
+
+
+@pytest.mark.asyncio
+async def test_login_auth_phase_and_access_log(client: AsyncClient, test_session):
+    """Verifica la fase de autenticación y la línea de access log estructurada."""
+    test_session.add(User(username="timinguser", hashed_password=get_password_hash("secret")))
+    await test_session.commit()
+
+    lines = []
+    handler_id = logger.add(lambda message: lines.append(message.record["message"]), level="INFO")
+    try:
+        response = await client.post("/api/v1/token", data={"username": "timinguser", "password": "secret"})
+    finally:
+        logger.remove(handler_id)
+
+    assert response.status_code == 200
+    assert "auth" in parse_server_timing(response.headers["server-timing"])
+
+    access = [json.loads(line[len("access "):]) for line in lines if line.startswith("access ")]
+    assert access[-1]["path"] == "/api/v1/token"
+    assert access[-1]["status"] == 200
+    assert "auth" in access[-1]["phases_ms"]
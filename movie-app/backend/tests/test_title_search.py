@@ -0,0 +1,185 @@
+import random
+import pytest
+from httpx import AsyncClient
+from app.models import Movie
+from app.services.title_search import (
+    EXACT,
+    FUZZY,
+    PREFIX,
+    PrefixIndex,
+    TitleIndex,
+    normalize_title,
+    rank_title,
+    title_index
+)
+
+
+@pytest.fixture
+async def matrix_movies(test_session) -> list:
+    """Fixture con títulos que comparten prefijo."""
+    movies = [
+        Movie(title="The Matrix Revolutions", year="2003", imdb_id="tt0242653"),
+        Movie(title="The Matrix Reloaded", year="2003", imdb_id="tt0234215"),
+        Movie(title="The Matrix", year="1999", imdb_id="tt0133093"),
+        Movie(title="Amélie", year="2001", imdb_id="tt0211915")
+    ]
+    test_session.add_all(movies)
+    await test_session.commit()
+    return movies
+
+
+def test_normalize_title():
+    """Verifica que se ignoran mayúsculas, acentos y puntuación."""
+    assert normalize_title("  Amélie!  ") == "amelie"
+    assert normalize_title("Star Wars: Episode IV") == "star wars episode iv"
+    # Los títulos sin letras latinas no se quedan vacíos
+    assert normalize_title("千と千尋の神隠し") == "千と千尋の神隠し"
+    assert normalize_title("Война и мир!") == "война и мир"
+
+
+def test_index_ranking_and_incremental_updates():
+    """Verifica el orden exacta > prefijo > aproximada y las altas y bajas incrementales."""
+    index = TitleIndex()
+    index.rebuild([(1, "The Matrix Revolutions"), (2, "The Matrix"), (3, "Matrix Reloaded")])
+
+    matches = index.search("matrix")
+    assert [m.movie_id for m in matches] == [2, 3, 1]
+    assert matches[0].level == EXACT
+    assert matches[1].level == PREFIX
+
+    # Errata: solo coincidencia por trigramas
+    assert index.search("matirx revolution")[0].movie_id == 1
+    assert index.search("matirx revolution")[0].level == FUZZY
+
+    index.remove(2)
+    assert [m.movie_id for m in index.search("matrix")] == [3, 1]
+    index.add(4, "Matrix")
+    assert index.search("the matrix")[0].movie_id == 4
+    assert index.search("zzzz") == []
+
+
+
+def test_index_prefilter_matches_full_scan(monkeypatch):
+    """Verifica que leer solo los trigramas más raros da los mismos resultados que puntuar todo el catálogo."""
+    rng = random.Random(7)
+    words = ["Matrix", "Star", "Lord", "Rings", "Dark", "Knight", "Alien", "Ghost", "Up", "It"]
+    titles = {
+        movie_id: f"{' '.join(rng.sample(words, rng.randint(1, 3)))} {movie_id}"
+        for movie_id in range(1, 2001)
+    }
+    index = TitleIndex()
+    index.rebuild(titles.items())
+
+    for query in ["Matrix 42", "the dark knight 1999", "atri", "Ghots Lord", "Up 7", "ring", "1234"]:
+        expected = sorted(
+            (match for match in (rank_title(query, title, movie_id) for movie_id, title in titles.items()) if match),
+            key=lambda match: match.sort_key
+        )
+        assert index.search(query, limit=20) == expected[:20], query
+
+    # Con el tope alcanzado se siguen encontrando las coincidencias exactas
+    monkeypatch.setattr("app.services.title_search.MAX_CANDIDATES", 50)
+    assert index.search(titles[1500])[0].movie_id == 1500
+
+
+@pytest.mark.asyncio
+async def test_get_movie_by_title_prefers_exact_match(client: AsyncClient, matrix_movies):
+    """Test para obtener la coincidencia exacta antes que las secuelas."""
+    assert len(title_index) == 4
+
+    response = await client.get("/api/v1/movies/title/matrix")
+    assert response.status_code == 200
+    assert response.json()["title"] == "The Matrix"
+
+    response = await client.get("/api/v1/movies/title/Matrix Relo")
+    assert response.json()["title"] == "The Matrix Reloaded"
+
+    response = await client.get("/api/v1/movies/title/amelie")
+    assert response.json()["title"] == "Amélie"
+
+
+@pytest.mark.asyncio
+async def test_get_movie_by_title_fuzzy(client: AsyncClient, matrix_movies):
+    """Test para tolerar erratas en el título."""
+    response = await client.get("/api/v1/movies/title/The Matirx Revolutions")
+    assert response.status_code == 200
+    assert response.json()["title"] == "The Matrix Revolutions"
+
+
+@pytest.mark.asyncio
+async def test_get_movie_by_title_falls_back_to_database(client: AsyncClient, matrix_movies):
+    """Test para encontrar películas que el índice de este proceso no conoce."""
+    title_index.clear()
+
+    response = await client.get("/api/v1/movies/title/Matrix")
+    assert response.status_code == 200
+    assert response.json()["title"] == "The Matrix"
+
+
+@pytest.mark.asyncio
+async def test_get_movie_by_title_non_latin(client: AsyncClient, test_session):
+    """Verifica que se encuentran los títulos sin letras latinas, por el índice y por la base de datos."""
+    test_session.add(Movie(title="千と千尋の神隠し", year="2001", imdb_id="tt0245429"))
+    await test_session.commit()
+
+    response = await client.get("/api/v1/movies/title/千と千尋")
+    assert response.status_code == 200
+    assert response.json()["imdb_id"] == "tt0245429"
+
+    # Película que el índice aún no conoce: la encuentra la consulta a la base de datos
+    title_index.clear()
+    response = await client.get("/api/v1/movies/title/千と千尋の神隠し")
+    assert response.status_code == 200
+    assert response.json()["imdb_id"] == "tt0245429"
+
+
+@pytest.mark.asyncio
+async def test_title_index_follows_deletes(client: AsyncClient, test_session, matrix_movies):
+    """Verifica que el índice se actualiza cuando se elimina una película."""
+    await test_session.delete(matrix_movies[2])
+    await test_session.commit()
+
+    assert len(title_index) == 3
+    response = await client.get("/api/v1/movies/title/matrix")
+    assert response.json()["title"] == "The Matrix Reloaded"
+
+
+@pytest.mark.asyncio
+async def test_title_index_ignores_rolled_back_changes(test_session):
+    """Verifica que los cambios deshechos con rollback no llegan al índice."""
+    test_session.add(Movie(title="Never Saved", year="2020", imdb_id="tt9999999"))
+    await test_session.flush()
+    await test_session.rollback()
+
+    assert title_index.search("never saved") == []
+
+
+def test_prefix_index_suggest():
+    """Verifica el autocompletado por prefijo y las actualizaciones incrementales."""
+    index = PrefixIndex()
+    index.rebuild([(1, "The Matrix"), (2, "Matrix Reloaded"), (3, "Mad Max"), (4, "Alien")])
+
+    assert index.suggest("matr") == [(1, "The Matrix"), (2, "Matrix Reloaded")]
+    assert index.suggest("THE m") == [(1, "The Matrix")]
+    assert index.suggest("m", limit=2) == [(3, "Mad Max"), (1, "The Matrix")]
+
+    index.remove(1)
+    index.add(5, "Matrix")
+    assert index.suggest("matr") == [(5, "Matrix"), (2, "Matrix Reloaded")]
+    assert index.suggest("zz") == []
+
+
+@pytest.mark.asyncio
+async def test_suggest_endpoint(client: AsyncClient, test_session, matrix_movies):
+    """Test para el endpoint de autocompletado, que sigue las altas y bajas."""
+    response = await client.get("/api/v1/movies/suggest", params={"prefix": "the matrix re", "limit": 5})
+    assert response.status_code == 200
+    assert [s["title"] for s in response.json()] == ["The Matrix Reloaded", "The Matrix Revolutions"]
+
+    await test_session.delete(matrix_movies[1])
+    await test_session.commit()
+    response = await client.get("/api/v1/movies/suggest", params={"prefix": "matrix re"})
+    assert [s["title"] for s in response.json()] == ["The Matrix Revolutions"]
+
+    response = await client.get("/api/v1/movies/suggest", params={"prefix": ""})
+    assert response.status_code == 422
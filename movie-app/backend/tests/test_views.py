@@ -0,0 +1,157 @@
+import asyncio
+import pytest
+from httpx import AsyncClient
+from sqlmodel import select
+from app.auth import create_access_token
+from app.models import Movie, MovieViews, User
+from app.services.views import add_views
+
+
+async def add_movie(session, title: str, imdb_id: str) -> Movie:
+    movie = Movie(title=title, year="1999", imdb_id=imdb_id)
+    session.add(movie)
+    await session.commit()
+    return movie
+
+
+async def stored_views(session) -> dict:
+    rows = (await session.execute(select(MovieViews))).scalars().all()
+    return {row.movie_id: row.views for row in rows}
+
+
+@pytest.mark.asyncio
+async def test_views_are_counted_in_memory_and_flushed_in_batch(client: AsyncClient, test_session, test_view_counter):
+    """Verifica que leer una película no escribe en la base de datos hasta el volcado."""
+    matrix = await add_movie(test_session, "The Matrix", "tt0133093")
+    alien = await add_movie(test_session, "Alien", "tt0078748")
+
+    for movie_id in (matrix.id, alien.id, alien.id, alien.id):
+        assert (await client.get(f"/api/v1/movies/{movie_id}")).status_code == 200
+    assert (await client.get("/api/v1/movies/999")).status_code == 404
+
+    assert test_view_counter.pending == 4
+    assert await stored_views(test_session) == {}
+
+    assert await test_view_counter.flush() == 4
+    assert test_view_counter.pending == 0
+    assert await stored_views(test_session) == {matrix.id: 1, alien.id: 3}
+
+    # El siguiente volcado suma a lo ya guardado
+    test_view_counter.record(matrix.id)
+    await test_view_counter.flush()
+    assert await stored_views(test_session) == {matrix.id: 2, alien.id: 3}
+
+
+@pytest.mark.asyncio
+async def test_popular_is_served_from_ranking_refreshed_on_flush(client: AsyncClient, test_session, test_view_counter):
+    """Test para el ranking de populares: ordenado por visitas y recalculado en cada volcado."""
+    matrix = await add_movie(test_session, "The Matrix", "tt0133093")
+    alien = await add_movie(test_session, "Alien", "tt0078748")
+    await add_movie(test_session, "Heat", "tt0113277")
+    await add_views(test_session, {matrix.id: 5, alien.id: 2})
+    await test_session.commit()
+
+    # Antes del primer volcado el ranking está vacío: no se consulta la base de datos
+    assert (await client.get("/api/v1/movies/popular")).json() == []
+
+    await test_view_counter.flush()
+    popular = (await client.get("/api/v1/movies/popular")).json()
+    assert [(movie["title"], movie["views"]) for movie in popular] == [("The Matrix", 5), ("Alien", 2)]
+
+    for _ in range(4):
+        test_view_counter.record(alien.id)
+    await test_view_counter.flush()
+    popular = (await client.get("/api/v1/movies/popular", params={"limit": 1})).json()
+    assert [(movie["title"], movie["views"]) for movie in popular] == [("Alien", 6)]
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_pending_views(test_session, test_view_counter):
+    """Verifica que si el volcado falla las visitas se conservan para el siguiente."""
+    matrix = await add_movie(test_session, "The Matrix", "tt0133093")
+    test_view_counter.record(matrix.id)
+    test_view_counter.record(matrix.id)
+
+    original_factory = test_view_counter.session_factory
+
+    def broken_factory():
+        raise RuntimeError("database down")
+
+    test_view_counter.session_factory = broken_factory
+    with pytest.raises(RuntimeError):
+        await test_view_counter.flush()
+    assert test_view_counter.pending == 2
+
+    test_view_counter.session_factory = original_factory
+    test_view_counter.record(matrix.id)
+    assert await test_view_counter.flush() == 3
+    assert await stored_views(test_session) == {matrix.id: 3}
+
+
+@pytest.mark.asyncio
+async def test_ranking_follows_catalog_changes(client: AsyncClient, test_session, test_view_counter):
+    """Verifica que el ranking refleja modificaciones y bajas sin esperar al siguiente volcado."""
+    matrix = await add_movie(test_session, "The Matrix", "tt0133093")
+    alien = await add_movie(test_session, "Alien", "tt0078748")
+    await add_views(test_session, {matrix.id: 5, alien.id: 2})
+    await test_session.commit()
+    await test_view_counter.flush()
+
+    matrix.plot = "Neo wakes up"
+    await test_session.commit()
+    popular = (await client.get("/api/v1/movies/popular")).json()
+    assert popular[0]["plot"] == "Neo wakes up"
+    assert popular[0]["views"] == 5
+
+    test_session.add(User(username="editor", hashed_password="unused", is_active=True))
+    await test_session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'editor'})}"}
+    assert (await client.delete(f"/api/v1/movies/{matrix.id}", headers=headers)).status_code == 204
+    popular = (await client.get("/api/v1/movies/popular")).json()
+    assert [movie["title"] for movie in popular] == ["Alien"]
+    assert await stored_views(test_session) == {alien.id: 2}
+
+
+@pytest.mark.asyncio
+async def test_cancelled_flush_keeps_pending_views(test_session, test_view_counter):
+    """Verifica que cancelar un volcado en curso (al parar) no pierde las visitas."""
+    matrix = await add_movie(test_session, "The Matrix", "tt0133093")
+    test_view_counter.record(matrix.id)
+    original_factory = test_view_counter.session_factory
+    started = asyncio.Event()
+
+    class SlowSession:
+        async def __aenter__(self):
+            started.set()
+            await asyncio.sleep(10)
+
+        async def __aexit__(self, *exc_info):
+            return False
+
+    test_view_counter.session_factory = SlowSession
+    flush = asyncio.create_task(test_view_counter.flush())
+    await started.wait()
+    flush.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await flush
+    assert test_view_counter.pending == 1
+
+    test_view_counter.session_factory = original_factory
+    assert await test_view_counter.flush() == 1
+    assert await stored_views(test_session) == {matrix.id: 1}
+
+
+@pytest.mark.asyncio
+async def test_flush_skips_deleted_movies(test_session, test_view_counter):
+    """Verifica que las visitas pendientes de una película borrada no vuelven a crear su fila."""
+    matrix = await add_movie(test_session, "The Matrix", "tt0133093")
+    alien = await add_movie(test_session, "Alien", "tt0078748")
+    test_view_counter.record(matrix.id)
+    test_view_counter.record(alien.id)
+
+    await test_session.delete(matrix)
+    await test_session.commit()
+
+    assert await test_view_counter.flush() == 2
+    assert test_view_counter.pending == 0
+    assert await stored_views(test_session) == {alien.id: 1}